@@ -0,0 +1,103 @@
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from iom_verifier import main as verifier_main
+from iom_verifier import probes
+
+# Runs one verifier invocation for the benchmark harness:
+#   python -m benchmarks.child <stats.json> <iom_verifier arguments...>
+# Every network probe is timed at the probe layer (after deduplication, so
+# coalesced and memoized lookups are not counted), and the latencies plus
+# the wall time of the run are written to <stats.json>. --processes workers
+# are spawned fresh, so they install the timers again in setup_worker and
+# leave their latencies in <stats.json>.<pid> for the parent to add up.
+
+STATS_ENV = "IOM_BENCH_STATS"
+
+latencies: Dict[str, List[float]] = {"http": [], "tcp": []}
+_setup_worker = verifier_main.setup_worker
+
+
+def _timed_http(request):
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return request(*args, **kwargs)
+        finally:
+            latencies["http"].append(time.perf_counter() - started)
+    return timed
+
+
+def _timed_http_async(request):
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            latencies["http"].append(time.perf_counter() - started)
+    return timed
+
+
+def _timed_tcp(submit):
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        future = submit(*args, **kwargs)
+        future.add_done_callback(lambda _: latencies["tcp"].append(time.perf_counter() - started))
+        return future
+    return timed
+
+
+def _install_timers():
+    probes._http_request = _timed_http(probes._http_request)
+    probes._http_request_async = _timed_http_async(probes._http_request_async)
+    probes._submit_tcp = _timed_tcp(probes._submit_tcp)
+
+
+def setup_worker(args):
+    # Stands in for main.setup_worker, so it runs in every --processes worker
+    _install_timers()
+    prepare, process, close = _setup_worker(args)
+
+    def close_timed():
+        stats = close()
+        with open(f"{os.environ[STATS_ENV]}.{os.getpid()}", 'w', encoding='utf-8') as f:
+            json.dump(latencies, f)
+        return stats
+
+    return prepare, process, close_timed
+
+
+def _collect_workers(stats_path: str):
+    for path in glob.glob(glob.escape(stats_path) + ".*"):
+        with open(path, encoding='utf-8') as f:
+            for kind, values in json.load(f).items():
+                latencies[kind].extend(values)
+        os.remove(path)
+
+
+def main():
+    stats_path = sys.argv[1]
+    sys.argv = ["iom_verifier"] + sys.argv[2:]
+    os.environ[STATS_ENV] = stats_path
+    _install_timers()
+    verifier_main.setup_worker = setup_worker
+
+    started = time.perf_counter()
+    code = 0
+    try:
+        verifier_main.main()
+    except SystemExit as e:
+        code = e.code or 0
+    finally:
+        _collect_workers(stats_path)
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            json.dump({"seconds": time.perf_counter() - started, "latencies": latencies}, f)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import asyncio
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# Local stand-ins for the endpoints the verifiers probe.
+#
+# One HTTP/1.1 server plays S3, GCS, Azure Blob and generic service
+# endpoints. The probe layer reaches it through an endpoint map that
+# rewrites e.g. http://<bucket>.s3.amazonaws.com/ to
+# http://127.0.0.1:<port>/<bucket>.s3.amazonaws.com/, so the original host
+# is the first path segment.
+#
+# Outcomes are encoded in the generated names: a "-s403" token makes the
+# target answer 403, "-s200-eu-west-1" makes an S3 bucket public and live
+# in eu-west-1. Names without a token get a status from `status_mix`.
+#
+# TCP targets are routed by hostname to three listeners: one that accepts
+# (open), a bound port nobody listens on (closed, refused at once), and one
+# whose accept queue is full so SYNs are dropped (filtered, times out).
+
+OUTCOME_TOKEN = re.compile(r"-s(\d{3})(?:-([a-z]{2}-[a-z]+-\d))?(?=$|[./?-])")
+S3_HOST = re.compile(r"^(?P<bucket>.+?)\.s3(?:\.(?P<region>[a-z0-9-]+))?\.amazonaws\.com$")
+DEFAULT_REGION = "us-east-1"
+DEFAULT_STATUS_MIX = {200: 0.1, 403: 0.7, 404: 0.2}
+TCP_DOMAIN = "bench.test"
+
+_BODY = b'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult><IsTruncated>false</IsTruncated></ListBucketResult>'
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class FakeCloud:
+    """
+    Runs the stand-in servers on a private event loop in a background thread.
+    """
+
+    def __init__(self, latency_ms: float = 20.0, jitter_ms: float = 10.0,
+                 status_mix: Optional[Dict[int, float]] = None, throttle_rate: float = 0.0,
+                 seed: int = 1):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.status_mix = status_mix or dict(DEFAULT_STATUS_MIX)
+        self.throttle = _TokenBucket(throttle_rate)
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.http_port = 0
+        self.tcp_ports: Dict[str, int] = {}
+        self._sockets: List[socket.socket] = []
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-cloud", daemon=True)
+
+    # Lifecycle
+
+    def start(self) -> "FakeCloud":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        for sock in self._sockets:
+            sock.close()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_http, "127.0.0.1", 0, backlog=4096)
+        )
+        self.http_port = server.sockets[0].getsockname()[1]
+        open_server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_open, "127.0.0.1", 0, backlog=4096)
+        )
+        self.tcp_ports["open"] = open_server.sockets[0].getsockname()[1]
+        self.tcp_ports["closed"] = self._closed_port()
+        self.tcp_ports["filtered"] = self._filtered_port()
+        self._ready.set()
+        self._loop.run_forever()
+        server.close()
+        open_server.close()
+
+    def _closed_port(self) -> int:
+        # Bound but not listening: connections are refused, and the port stays ours
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self._sockets.append(sock)
+        return sock.getsockname()[1]
+
+    def _filtered_port(self) -> int:
+        # Listening with a full accept queue that is never drained: new SYNs are dropped
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(0)
+        port = sock.getsockname()[1]
+        self._sockets.append(sock)
+        for _ in range(4):
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            filler.connect_ex(("127.0.0.1", port))
+            self._sockets.append(filler)
+        time.sleep(0.1)
+        return port
+
+    def endpoint_map(self) -> Dict[str, Dict[str, str]]:
+        """
+        The --endpoint-map contents that route every verifier here.
+        """
+        base = f"http://127.0.0.1:{self.http_port}/{{host}}{{path}}"
+        return {
+            "http": {
+                "amazonaws.com": base,
+                "storage.googleapis.com": base,
+                "blob.core.windows.net": base,
+                TCP_DOMAIN: base,
+            },
+            "tcp": {
+                f"*.{kind}.{TCP_DOMAIN}": f"127.0.0.1:{port}" for kind, port in self.tcp_ports.items()
+            },
+        }
+
+    # TCP
+
+    async def _serve_open(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.close()
+
+    # HTTP
+
+    def _mixed_status(self, name: str) -> int:
+        # Deterministic per target, so duplicates and reruns agree
+        point = (zlib.crc32(name.encode()) % 10000) / 10000.0
+        total = 0.0
+        for status, weight in self.status_mix.items():
+            total += weight
+            if point < total:
+                return status
+        return 404
+
+    def _respond(self, method: str, target: str):
+        """
+        Returns (status, headers) for a request to /<original host><path>.
+        """
+        host, _, path = target.lstrip("/").partition("/")
+        token = OUTCOME_TOKEN.search(f"{host}/{path}")
+        status = int(token.group(1)) if token else self._mixed_status(f"{host}/{path}")
+        headers = {}
+
+        s3 = S3_HOST.match(host)
+        if s3:
+            region = (token.group(2) if token else None) or DEFAULT_REGION
+            # The global endpoint serves us-east-1 and redirects the rest, like S3 does
+            asked = s3.group("region") or DEFAULT_REGION
+            if status != 404:
+                headers["x-amz-bucket-region"] = region
+                if asked != region:
+                    return 301, headers
+        return status, headers
+
+    async def _serve_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode("iso-8859-1").split("\r\n")
+                method, target = lines[0].split(" ")[:2]
+                close = any(line.lower() == "connection: close" for line in lines[1:])
+                self.requests += 1
+
+                delay = self.latency + self.random.uniform(0, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if not self.throttle.take():
+                    self.throttled += 1
+                    status, headers = 503, {"Retry-After": "0"}
+                else:
+                    status, headers = self._respond(method, target)
+
+                body = _BODY if status == 200 else b""
+                response = [f"HTTP/1.1 {status} Bench", f"Content-Length: {len(body)}"]
+                response += [f"{name}: {value}" for name, value in headers.items()]
+                if close:
+                    response.append("Connection: close")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode("ascii"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if close:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
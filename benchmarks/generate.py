@@ -0,0 +1,179 @@
+import argparse
+import csv
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+from iom_verifier.verifiers.azure_storage import AzureStorageVerifier
+from iom_verifier.verifiers.gcp_storage import GCPStorageVerifier
+from iom_verifier.verifiers.manual import ManualVerifier
+from iom_verifier.verifiers.networking import NetworkingVerifier
+from iom_verifier.verifiers.registry import DISPATCH_INDEX
+from iom_verifier.verifiers.s3 import S3Verifier
+from iom_verifier.verifiers.services import ServicesVerifier
+
+from .fake_cloud import TCP_DOMAIN
+
+# Synthetic IoM exports for the benchmark suite. Rule names come from the
+# *-iom-names.txt lists and are grouped by the verifier they route to.
+# Every generated target encodes its outcome for the fake cloud (see
+# fake_cloud.py), so a given file always produces the same results.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NAME_FILES = {
+    'AWS': 'aws-iom-names.txt',
+    'Azure': 'azure-iom-names.txt',
+    'GCP': 'gcp-iom-names.txt',
+}
+
+FAMILIES = {
+    's3': S3Verifier,
+    'gcs': GCPStorageVerifier,
+    'azure': AzureStorageVerifier,
+    'http': ServicesVerifier,
+    'tcp': NetworkingVerifier,
+    'manual': ManualVerifier,
+}
+MIXED_WEIGHTS = {'s3': 0.25, 'gcs': 0.1, 'azure': 0.1, 'http': 0.1, 'tcp': 0.35, 'manual': 0.1}
+
+DEFAULT_STATUS_MIX = {200: 0.1, 403: 0.7, 404: 0.2}
+DEFAULT_TCP_MIX = {'open': 0.2, 'closed': 0.7, 'filtered': 0.1}
+S3_REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-2']
+SEVERITIES = ['Critical', 'High', 'Medium', 'Low', 'Informational']
+
+
+def parse_mix(spec: str, key=str) -> Dict:
+    """
+    Parses "200=0.1,403=0.7" into {200: 0.1, 403: 0.7}.
+    """
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        mix[key(name.strip())] = float(weight)
+    return mix
+
+
+def _pick(rng: random.Random, mix: Dict):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def read_header() -> List[str]:
+    with open(os.path.join(REPO_ROOT, 'test_input.csv'), newline='', encoding='utf-8') as f:
+        return next(csv.reader(f))
+
+
+class TargetFactory:
+    """
+    Builds the family-specific columns of one row.
+    """
+
+    def __init__(self, rng: random.Random, status_mix: Dict[int, float], tcp_mix: Dict[str, float]):
+        self.rng = rng
+        self.status_mix = status_mix
+        self.tcp_mix = tcp_mix
+
+    def _token(self) -> str:
+        return f"s{_pick(self.rng, self.status_mix)}"
+
+    def columns(self, family: str, i: int) -> Dict[str, str]:
+        token = self._token()
+        if family == 's3':
+            region = self.rng.choice(S3_REGIONS)
+            # Most buckets live in the region the export says, some elsewhere
+            bucket_region = region if self.rng.random() < 0.8 else self.rng.choice(S3_REGIONS)
+            return {'Resource ID': f"arn:aws:s3:::bench-{i}-{token}-{bucket_region}", 'Region': region,
+                    'Findings': 'Bucket policy allows public access'}
+        if family == 'gcs':
+            return {'Resource ID': f"gs://bench-{i}-{token}", 'Findings': "allUsers has READER"}
+        if family == 'azure':
+            return {'Resource ID': f"/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/bench/"
+                                   f"providers/Microsoft.Storage/storageAccounts/acct{i}/blobServices/default/"
+                                   f"containers/c{i}-{token}",
+                    'Findings': 'Container public access level is Container'}
+        if family == 'http':
+            return {'Resource ID': f"svc-{i}", 'Findings': f"Public endpoint: http://svc-{i}-{token}.{TCP_DOMAIN}/"}
+        if family == 'tcp':
+            return {'Resource ID': f"h{i}.{_pick(self.rng, self.tcp_mix)}.{TCP_DOMAIN}",
+                    'Findings': 'Ingress from 0.0.0.0/0'}
+        return {'Resource ID': f"resource-{i}", 'Findings': 'Configuration finding'}
+
+
+def probeable_rules(header: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    (cloud provider, rule name) per family, keeping only rules whose
+    verifier can build a probe for a generated row.
+    """
+    factory = TargetFactory(random.Random(0), {200: 1.0}, {'open': 1.0})
+    rules: Dict[str, List[Tuple[str, str]]] = {family: [] for family in FAMILIES}
+    for provider, filename in NAME_FILES.items():
+        with open(os.path.join(REPO_ROOT, filename), encoding='utf-8') as f:
+            names = [line.strip() for line in f if line.strip()]
+        for name in names:
+            verifier = DISPATCH_INDEX.lookup(name)
+            for family, cls in FAMILIES.items():
+                if type(verifier) is not cls:
+                    continue
+                sample = dict.fromkeys(header, '')
+                sample.update(factory.columns(family, 0), **{'Rule Name': name})
+                if family == 'manual' or verifier.probe_target(sample):
+                    rules[family].append((provider, name))
+    return rules
+
+
+def generate(path: str, rows: int, family: str, duplicates: float = 0.1,
+             status_mix: Optional[Dict[int, float]] = None, tcp_mix: Optional[Dict[str, float]] = None,
+             seed: int = 1):
+    """
+    Writes `rows` synthetic rows of one family ("mixed" for all of them).
+    A `duplicates` fraction of rows repeat an earlier row's target.
+    """
+    rng = random.Random(seed)
+    header = read_header()
+    rules = probeable_rules(header)
+    factory = TargetFactory(rng, status_mix or DEFAULT_STATUS_MIX, tcp_mix or DEFAULT_TCP_MIX)
+    weights = MIXED_WEIGHTS if family == 'mixed' else {family: 1.0}
+    seen: List[Tuple[str, Dict[str, str]]] = []
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        for i in range(1, rows + 1):
+            if seen and rng.random() < duplicates:
+                row_family, columns = rng.choice(seen)
+            else:
+                row_family = _pick(rng, weights)
+                columns = factory.columns(row_family, i)
+                if len(seen) < 100000:
+                    seen.append((row_family, columns))
+            provider, rule = rng.choice(rules[row_family])
+            row = {
+                'ID': i, 'Cloud Provider': provider, 'Region': 'us-east-1', 'Account ID': '123456789012',
+                'Account Name': 'bench', 'Resource Type': row_family, 'Status': 'Open',
+                'Severity': rng.choice(SEVERITIES), 'Violation Type': 'Public Access',
+                'Rule ID': f"BENCH-{row_family}", 'Rule Name': rule, 'Rule Origin': 'Benchmark',
+            }
+            row.update(columns)
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic IoM export for benchmarking")
+    parser.add_argument("--output", required=True, help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--family", choices=list(FAMILIES) + ['mixed'], default='mixed')
+    parser.add_argument("--duplicates", type=float, default=0.1,
+                        help="Fraction of rows that repeat an earlier target")
+    parser.add_argument("--status-mix", default="200=0.1,403=0.7,404=0.2",
+                        help="HTTP status weights for storage and service targets")
+    parser.add_argument("--tcp-mix", default="open=0.2,closed=0.7,filtered=0.1",
+                        help="Port state weights for TCP targets")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    generate(args.output, args.rows, args.family, args.duplicates,
+             parse_mix(args.status_mix, int), parse_mix(args.tcp_mix), args.seed)
+    print(f"Wrote {args.rows} {args.family} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
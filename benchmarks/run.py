@@ -0,0 +1,217 @@
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from .fake_cloud import FakeCloud
+from .generate import DEFAULT_STATUS_MIX, DEFAULT_TCP_MIX, FAMILIES, generate, parse_mix
+
+# Benchmark harness. Starts the fake cloud, generates (or reuses) synthetic
+# inputs, and runs the verifier once per (rows, family, engine setting) in
+# a child process, reporting rows/s, probe latency percentiles and the
+# child's peak RSS. Nothing leaves the machine, so runs are reproducible.
+#
+#   python -m benchmarks.run --rows 1k,100k --families s3,tcp,mixed \
+#       --engines 'threads:32;asyncio:500' --json results.json
+#
+# A case fails if the verifier exits non-zero, writes Error rows or sends
+# no probes at all (a broken probe path finishes very fast). With
+# --compare, rows/s is also checked against an earlier --json file and the
+# run fails if any case got slower than the tolerance allows.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def engine_args(spec: str) -> List[str]:
+    """
+    "threads:32" or "asyncio:500", optionally followed by extra verifier
+    flags after a space, e.g. "asyncio:500 --preserve-order".
+    """
+    setting, *extra = spec.split()
+    engine, _, width = setting.partition(':')
+    if engine == 'threads':
+        args = ['--engine', 'threads', '--threads', width or '10']
+    elif engine == 'asyncio':
+        args = ['--engine', 'asyncio', '--concurrency', width or '200']
+    else:
+        raise ValueError(f"Unknown engine setting: {spec}")
+    return args + extra
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def count_errors(output: str) -> int:
+    """
+    Rows of a verifier output whose execution or exploit status is Error.
+    """
+    if not os.path.exists(output):
+        return 0
+    with open(output, newline='', encoding='utf-8-sig') as f:
+        return sum(1 for row in csv.DictReader(f)
+                   if "Error" in (row.get('Verify_Execution'), row.get('Verify_Exploit')))
+
+
+def run_case(work_dir: str, input_path: str, rows: int, engine: str, map_path: str,
+             extra: List[str]) -> Dict[str, Any]:
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    label = engine.replace(':', '').replace(' ', '').replace('-', '')
+    output = os.path.join(work_dir, f"{name}.{label}.out.csv")
+    stats_path = os.path.join(work_dir, f"{name}.{label}.stats.json")
+    log_path = os.path.join(work_dir, f"{name}.{label}.log")
+    command = [sys.executable, '-m', 'benchmarks.child', stats_path,
+               '--input', input_path, '--output', output, '--stream',
+               '--endpoint-map', map_path] + engine_args(engine) + extra
+
+    started = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        child = subprocess.Popen(command, cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 rather than wait() so we get the child's own resource usage
+        _, status, usage = os.wait4(child.pid, 0)
+        child.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - started
+
+    stats = {"seconds": wall, "latencies": {"http": [], "tcp": []}}
+    if os.path.exists(stats_path):
+        with open(stats_path, encoding='utf-8') as f:
+            stats = json.load(f)
+    probe_latencies = stats["latencies"]["http"] + stats["latencies"]["tcp"]
+    return {
+        "case": f"{name} {engine}",
+        "rows": rows,
+        "exit_code": child.returncode,
+        "seconds": stats["seconds"],
+        "rows_per_second": rows / stats["seconds"] if stats["seconds"] else 0.0,
+        "probes": len(probe_latencies),
+        "errors": count_errors(output),
+        "p50_ms": percentile(probe_latencies, 0.50) * 1000,
+        "p99_ms": percentile(probe_latencies, 0.99) * 1000,
+        "peak_rss_mb": usage.ru_maxrss / 1024,  # KiB on Linux
+        "log": log_path,
+    }
+
+
+def case_problem(result: Dict[str, Any]) -> str:
+    """
+    Why a case failed, or "" if it did not.
+    """
+    if result["exit_code"]:
+        return f"exit code {result['exit_code']}"
+    if result["errors"]:
+        return f"{result['errors']} Error rows"
+    if not result["probes"]:
+        return "no probes were sent"
+    return ""
+
+
+def print_results(results: List[Dict[str, Any]]):
+    width = max([len(r["case"]) for r in results] + [4])
+    print(f"{'case':<{width}} {'rows':>8} {'rows/s':>10} {'probes':>8} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+    for r in results:
+        problem = case_problem(r)
+        failed = f"  ({problem}, see {r['log']})" if problem else ""
+        print(f"{r['case']:<{width}} {r['rows']:>8} {r['rows_per_second']:>10.1f} {r['probes']:>8} {r['errors']:>7} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['peak_rss_mb']:>8.1f}{failed}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Cases whose rows/s dropped by more than `tolerance` against the baseline.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r["case"]: r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        before = baseline.get(r["case"])
+        if before and r["rows_per_second"] < before["rows_per_second"] * (1 - tolerance):
+            regressions.append(f"{r['case']}: {r['rows_per_second']:.1f} rows/s, "
+                               f"was {before['rows_per_second']:.1f}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline throughput benchmarks for the IoM verifier")
+    parser.add_argument("--rows", default="1k", help="Comma-separated input sizes, e.g. 1k,100k,1m")
+    parser.add_argument("--families", default="s3,gcs,azure,http,tcp,mixed",
+                        help=f"Comma-separated row families: {', '.join(FAMILIES)}, mixed")
+    parser.add_argument("--engines", default="threads:32;asyncio:500",
+                        help="Semicolon-separated engine settings, e.g. 'threads:32;asyncio:500 --preserve-order'")
+    parser.add_argument("--work-dir", default="bench-work", help="Where inputs, outputs and logs are kept")
+    parser.add_argument("--duplicates", type=float, default=0.1,
+                        help="Fraction of rows that repeat an earlier target")
+    parser.add_argument("--status-mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_STATUS_MIX.items()))
+    parser.add_argument("--tcp-mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_TCP_MIX.items()),
+                        help="open/closed/filtered weights; filtered ports are blackholed and time out")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake server response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Extra random latency, up to this much")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Requests per second the fake cloud serves before answering 503 (0 = unlimited)")
+    parser.add_argument("--verifier-args", default="",
+                        help="Extra flags passed to every verifier run, e.g. '--tcp-batch 500'")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    parser.add_argument("--compare", default=None, help="Earlier --json results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed rows/s drop against --compare before failing")
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    status_mix = parse_mix(args.status_mix, int)
+    tcp_mix = parse_mix(args.tcp_mix)
+
+    cloud = FakeCloud(args.latency_ms, args.jitter_ms, throttle_rate=args.throttle_rate).start()
+    map_path = os.path.join(work_dir, "endpoints.json")
+    with open(map_path, 'w', encoding='utf-8') as f:
+        json.dump(cloud.endpoint_map(), f, indent=2)
+
+    results = []
+    try:
+        for size in args.rows.split(','):
+            rows = parse_size(size)
+            for family in args.families.split(','):
+                input_path = os.path.join(work_dir, f"{family}-{size.strip().lower()}.csv")
+                if not os.path.exists(input_path):
+                    print(f"Generating {rows} {family} rows...")
+                    generate(input_path, rows, family, args.duplicates, status_mix, tcp_mix)
+                for engine in args.engines.split(';'):
+                    print(f"Running {family} x {rows} on {engine}...")
+                    results.append(run_case(work_dir, input_path, rows, engine.strip(), map_path,
+                                            args.verifier_args.split()))
+    finally:
+        cloud.stop()
+
+    print()
+    print_results(results)
+    print(f"Fake cloud served {cloud.requests} requests ({cloud.throttled} throttled).")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+    if any(case_problem(r) for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from . import async_http
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ADMIT_POLL_INTERVAL = 0.01
+# Rows taken from the input iterator per trip to the reader thread
+PULL_BATCH = 512
+
+
+def raise_fd_limit(wanted: int):
+    """
+    Each in-flight probe holds a socket, so lift the soft open-file limit
+    towards the hard limit when the requested concurrency needs it.
+    """
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def read_ahead(concurrency: int) -> int:
+    """
+    Rows read from the input but not yet taken by a worker, at most: a full
+    queue plus the chunk the feeder is putting into it.
+    """
+    return max(concurrency, PULL_BATCH) + PULL_BATCH
+
+
+async def _run(rows: Iterable[Dict[str, Any]],
+               process: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+               on_result: Callable[[Dict[str, Any]], None],
+               concurrency: int,
+               threads: int,
+               admit: Optional[Callable[[], bool]]):
+    loop = asyncio.get_running_loop()
+    # Sync-only verifiers fall back to this pool through BaseVerifier.verify_async
+    executor = ThreadPoolExecutor(max_workers=threads)
+    loop.set_default_executor(executor)
+
+    # A fixed set of workers takes rows from one shared queue, so at most
+    # `concurrency` rows (and their sockets) are alive at any time. Reading
+    # the input may block (DNS pre-resolution and TCP prefetch batches), so
+    # a feeder reads it on a thread of its own, PULL_BATCH rows at a time,
+    # keeping the queue filled ahead of the workers and the event loop free.
+    iterator = iter(rows)
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="row-reader")
+    ready: asyncio.Queue = asyncio.Queue(maxsize=read_ahead(concurrency) - PULL_BATCH)
+    active = 0
+
+    async def feed():
+        while True:
+            chunk = await loop.run_in_executor(reader, lambda: list(itertools.islice(iterator, PULL_BATCH)))
+            if not chunk:
+                break
+            for row in chunk:
+                await ready.put(row)
+        for _ in range(concurrency):
+            await ready.put(None)
+
+    async def worker():
+        nonlocal active
+        while True:
+            # With nothing in flight the next row is the one holding back the writer
+            while admit is not None and not admit() and active:
+                await asyncio.sleep(ADMIT_POLL_INTERVAL)
+            row = await ready.get()
+            if row is None:
+                return
+            active += 1
+            try:
+                result = await process(row)
+            finally:
+                active -= 1
+            on_result(result)
+
+    try:
+        await asyncio.gather(feed(), *(worker() for _ in range(concurrency)))
+    finally:
+        reader.shutdown(wait=False)
+        executor.shutdown(wait=False)
+
+
+def run(rows: Iterable[Dict[str, Any]],
+        process: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        on_result: Callable[[Dict[str, Any]], None],
+        concurrency: int = 1000,
+        threads: int = 5,
+        admit: Optional[Callable[[], bool]] = None):
+    """
+    Runs `process` over every row on a single event loop, calling
+    `on_result` with each processed row as it completes. Workers wait
+    before pulling new rows while `admit` returns False.
+    """
+    raise_fd_limit(concurrency + 256)
+    async_http.configure(concurrency)
+    asyncio.run(_run(rows, process, on_result, max(1, concurrency), threads, admit))
@@ -0,0 +1,243 @@
+import asyncio
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, urljoin
+
+from . import dns_cache, metrics
+
+# Minimal non-blocking HTTP/1.1 client for the asyncio engine.
+# Verifiers mostly need only the status line and headers of a handful of
+# GETs, so this avoids pulling in a full async HTTP stack. When a body is
+# asked for, at most `max_body` bytes of it are read (see probes.body_limit).
+#
+# Host names are resolved before a hop's timeout starts, on a resolver pool
+# of their own (the loop's default executor runs sync-only verifiers and is
+# sized by --threads), and concurrent lookups of one name share a query.
+
+USER_AGENT = "iom-verifier"
+MAX_REDIRECTS = 10
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+BODY_CHUNK = 8192
+DEFAULT_RESOLVER_THREADS = 64
+MAX_RESOLVER_THREADS = 512
+
+_ssl_context: Optional[ssl.SSLContext] = None
+_resolver_threads = DEFAULT_RESOLVER_THREADS
+_resolver_pool: Optional[ThreadPoolExecutor] = None
+_resolver_lock = threading.Lock()
+_lookups: Dict[Tuple[str, int], "asyncio.Future"] = {}
+
+
+class HTTPError(Exception):
+    """Malformed or unexpected HTTP response."""
+
+
+def configure(concurrency: int):
+    """
+    Sizes the resolver pool for `concurrency` requests in flight. Must be
+    called before the first request.
+    """
+    global _resolver_threads
+    _resolver_threads = max(1, min(concurrency, MAX_RESOLVER_THREADS))
+
+
+def _resolver() -> ThreadPoolExecutor:
+    global _resolver_pool
+    if _resolver_pool is None:
+        with _resolver_lock:
+            if _resolver_pool is None:
+                _resolver_pool = ThreadPoolExecutor(max_workers=_resolver_threads, thread_name_prefix="async-dns")
+    return _resolver_pool
+
+
+async def resolve(hostname: str, port: int) -> str:
+    """
+    An address to connect to for hostname: pre-resolved (dns_cache) if
+    possible, otherwise looked up on the resolver pool.
+    """
+    address = dns_cache.cached_address(hostname)
+    if address or dns_cache.is_ip(hostname):
+        return address or hostname
+    key = (hostname, port)
+    lookup = _lookups.get(key)
+    if lookup is None:
+        loop = asyncio.get_running_loop()
+        lookup = loop.run_in_executor(_resolver(), socket.getaddrinfo, hostname, port, 0, socket.SOCK_STREAM)
+        _lookups[key] = lookup
+        lookup.add_done_callback(lambda _: _lookups.pop(key, None))
+    started = time.perf_counter()
+    try:
+        # shield: a caller timing out must not cancel the lookup the others wait on
+        infos = await asyncio.shield(lookup)
+    finally:
+        metrics.phase("dns", started)
+    return infos[0][4][0]
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def _parse_head(raw: bytes) -> Tuple[int, Dict[str, str]]:
+    lines = raw.decode('iso-8859-1').split('\r\n')
+    parts = lines[0].split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise HTTPError(f"Invalid status line: {lines[0]!r}")
+    try:
+        status = int(parts[1])
+    except ValueError:
+        raise HTTPError(f"Invalid status code: {parts[1]!r}")
+
+    # Header names are lowercased so lookups work like requests' CaseInsensitiveDict
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line or ':' not in line:
+            continue
+        name, value = line.split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def _open_timed(hostname: str, address: str, port: int, secure: bool):
+    """
+    open_connection split into its TCP and TLS steps so each can be timed.
+    """
+    started = time.perf_counter()
+    if secure and not hasattr(asyncio.StreamWriter, "start_tls"):
+        # Python < 3.11 cannot upgrade a stream, so TLS is counted in the connect time
+        reader, writer = await asyncio.open_connection(address, port, ssl=_get_ssl_context(),
+                                                       server_hostname=hostname)
+        metrics.phase("connect", started)
+        return reader, writer
+    reader, writer = await asyncio.open_connection(address, port)
+    metrics.phase("connect", started)
+    if secure:
+        started = time.perf_counter()
+        try:
+            await writer.start_tls(_get_ssl_context(), server_hostname=hostname)
+        except BaseException:
+            writer.close()
+            raise
+        metrics.phase("tls", started)
+    return reader, writer
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str], limit: int) -> Tuple[bytes, bool]:
+    """
+    Reads up to `limit` bytes of the body, decoding chunked transfer
+    encoding. Returns (body, whether that is the whole body).
+    """
+    parts, size = [], 0
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        while size < limit:
+            line = await reader.readuntil(b'\r\n')
+            try:
+                chunk_size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(f"Invalid chunk size line: {line[:40]!r}")
+            if chunk_size == 0:
+                return b"".join(parts), True
+            take = min(chunk_size, limit - size)
+            parts.append(await reader.readexactly(take))
+            size += take
+            if take < chunk_size:
+                break
+            await reader.readexactly(2)  # CRLF closing the chunk
+        return b"".join(parts), False
+
+    try:
+        length: Optional[int] = int(headers.get('content-length', ''))
+    except ValueError:
+        length = None
+    if length is not None:
+        return await reader.readexactly(min(length, limit)), length <= limit
+    # No length: the body runs to the end of the connection (we send Connection: close)
+    while size <= limit:
+        data = await reader.read(min(BODY_CHUNK, limit + 1 - size))
+        if not data:
+            return b"".join(parts), True
+        parts.append(data)
+        size += len(data)
+    return b"".join(parts)[:limit], False
+
+
+def _split(url: str):
+    """
+    Returns (url parts, https?, port).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise HTTPError(f"Unsupported URL: {url}")
+    secure = parts.scheme == 'https'
+    return parts, secure, parts.port or (443 if secure else 80)
+
+
+async def _request_once(method: str, url: str, address: str,
+                        max_body: int = 0) -> Tuple[int, Dict[str, str], bytes, bool]:
+    parts, secure, port = _split(url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    if metrics.active is None:
+        reader, writer = await asyncio.open_connection(
+            address, port,
+            ssl=_get_ssl_context() if secure else None,
+            server_hostname=parts.hostname if secure else None,
+        )
+    else:
+        reader, writer = await _open_timed(parts.hostname, address, port, secure)
+    try:
+        request = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: */*\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(request.encode('ascii'))
+        await writer.drain()
+        sent = time.perf_counter()
+        # The body is not needed to classify a response: stop after the headers
+        # unless a 2xx body was asked for
+        raw = await reader.readuntil(b'\r\n\r\n')
+        metrics.phase("ttfb", sent)
+        status, headers = _parse_head(raw[:-4])
+        if max_body <= 0 or method == "HEAD" or not 200 <= status < 300 or status == 204:
+            return status, headers, b"", False
+        body, complete = await _read_body(reader, headers, max_body)
+        return status, headers, body, complete
+    except asyncio.IncompleteReadError:
+        raise HTTPError("Connection closed before the response was received")
+    finally:
+        writer.close()
+
+
+async def request(method: str, url: str, timeout: float, follow_redirects: bool = True,
+                  max_body: int = 0) -> Tuple[int, Dict[str, str], str, bytes, bool]:
+    """
+    Performs a request following redirects like requests.get does
+    (or not, like requests.head). Returns (status_code, headers, final_url,
+    body, body_complete); the body is the first `max_body` bytes of a 2xx
+    response, empty otherwise. `timeout` applies per hop, and separately to
+    resolving the hop's host name.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts, _, port = _split(url)
+        address = await asyncio.wait_for(resolve(parts.hostname, port), timeout)
+        status, headers, body, complete = await asyncio.wait_for(
+            _request_once(method, url, address, max_body), timeout)
+        location = headers.get('location')
+        if not follow_redirects or status not in REDIRECT_CODES or not location:
+            return status, headers, url, body, complete
+        url = urljoin(url, location)
+        if status == 303:
+            method = 'GET'
+    raise HTTPError(f"Exceeded {MAX_REDIRECTS} redirects.")
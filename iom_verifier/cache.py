@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .verifiers.base import BaseVerifier, VerificationResult
+
+# Seconds a cached result stays valid, per exploit status. Exploitable
+# findings expire quickly so remediation shows up on the next run; Errors
+# are never cached, and neither are transient results (an Unknown because of
+# a reset, a DNS timeout or a 5xx), which say nothing about the target.
+DEFAULT_TTLS = {
+    "Exploitable": 3600,
+    "Secure": 86400,
+    "Unknown": 6 * 3600,
+    "Error": 0,
+}
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 100000
+COMMIT_EVERY = 100
+BUSY_TIMEOUT = 30.0    # Seconds to wait for another process holding the write lock
+EVICT_EVERY = 10000
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> int:
+    """
+    Parses '90', '90s', '15m', '6h' or '2d' into seconds.
+    """
+    text = text.strip().lower()
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(float(text))
+
+
+def parse_ttls(spec: Optional[str]) -> Dict[str, int]:
+    """
+    Parses a --cache-ttl value like 'Exploitable=1h,Secure=2d' over the defaults.
+    """
+    ttls = dict(DEFAULT_TTLS)
+    if not spec:
+        return ttls
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        if '=' not in item:
+            raise ValueError(f"Invalid TTL '{item}', expected STATUS=DURATION")
+        status, duration = item.split('=', 1)
+        ttls[status.strip()] = parse_duration(duration)
+    return ttls
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of verification results keyed by verifier and probe
+    target, shared across runs. One connection is shared by all workers
+    behind a lock; writes are committed every `commit_every` writes (1 when
+    several processes write to the same file).
+    """
+
+    def __init__(self, cache_dir: str, ttls: Optional[Dict[str, int]] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, refresh: bool = False,
+                 commit_every: int = COMMIT_EVERY):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "results.sqlite3")
+        self.ttls = ttls or dict(DEFAULT_TTLS)
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.commit_every = max(1, commit_every)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " execution_status TEXT NOT NULL,"
+            " exploit_status TEXT NOT NULL,"
+            " message TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+        self._conn.commit()
+
+    def ttl_for(self, exploit_status: str) -> int:
+        return self.ttls.get(exploit_status, DEFAULT_TTL)
+
+    @staticmethod
+    def key_for(verifier: BaseVerifier, row: Dict[str, Any]) -> Optional[str]:
+        target = verifier.probe_target(row)
+        if target is None:
+            return None
+        return json.dumps([type(verifier).__name__, *target])
+
+    def get(self, key: str) -> Optional[VerificationResult]:
+        if self.refresh:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT execution_status, exploit_status, message, created FROM results WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if found is None:
+                self.misses += 1
+                return None
+
+            execution_status, exploit_status, message, created = found
+            if now - created > self.ttl_for(exploit_status):
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._note_write()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._note_write()
+            self.hits += 1
+
+        checked_at = datetime.fromtimestamp(created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return VerificationResult(
+            execution_status=execution_status,
+            exploit_status=exploit_status,
+            message=f"{message} [cached result from {checked_at}]",
+            checked_at=created
+        )
+
+    def contains(self, key: str) -> bool:
+        """
+        True if get() would return a result for key. Does not count as a hit
+        or refresh the entry.
+        """
+        if self.refresh:
+            return False
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT exploit_status, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return found is not None and time.time() - found[1] <= self.ttl_for(found[0])
+
+    def put(self, key: str, result: VerificationResult):
+        if result.transient or self.ttl_for(result.exploit_status) <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result.execution_status, result.exploit_status, result.message, now, now)
+            )
+            self.stored += 1
+            self._note_write()
+            if self.max_entries > 0 and self.stored % EVICT_EVERY == 0:
+                self._evict()
+
+    def _note_write(self):
+        # Caller holds the lock
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+        return max(excess, 0)
+
+    def close(self) -> int:
+        """
+        Commits pending writes and trims the cache to max_entries.
+        Returns the number of evicted entries.
+        """
+        with self._lock:
+            evicted = self._evict() if self.max_entries > 0 else 0
+            self._commit()
+            self._conn.close()
+        return evicted
+
+    def lookup(self, verifier: BaseVerifier, row: Dict[str, Any]) -> Tuple[Optional[str], Optional[VerificationResult]]:
+        """
+        Returns (cache key, cached result). The key is None for rows that need no network access.
+        """
+        key = self.key_for(verifier, row)
+        if key is None:
+            return None, None
+        return key, self.get(key)
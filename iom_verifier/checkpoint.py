@@ -0,0 +1,101 @@
+import os
+import zlib
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# Append-only record of completed rows, written next to the output CSV.
+#
+# Each line is "<row hash>\t<output size>\t<crc32>\n" and is appended (one
+# write() per row or per batch) only after the rows have been flushed to the output,
+# so the journal never claims more than the output holds. A line torn by a
+# crash fails its checksum and everything from that point on is ignored.
+# On resume the output is truncated back to the last journaled size, which
+# also drops rows that reached the output but not the journal. Entries
+# past the output's actual size (its tail was lost, e.g. to a power cut
+# without --fsync) are ignored, so the output is never extended.
+#
+# With fsync the output is fsynced before each journal append, and the
+# journal after it.
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def journal_path(output_path: str) -> str:
+    return output_path + JOURNAL_SUFFIX
+
+
+def _checksum(key: str, offset: int) -> str:
+    return format(zlib.crc32(f"{key}\t{offset}".encode('ascii')), '08x')
+
+
+def load_journal(path: str, output_size: Optional[int] = None) -> Tuple[Counter, int, int]:
+    """
+    Returns (completed row hashes with multiplicity, output size at the last
+    checkpoint, length of the intact part of the journal in bytes). With
+    `output_size`, entries claiming more output than that are not trusted.
+    """
+    completed = Counter()
+    offset = 0
+    valid = 0
+    if not os.path.exists(path):
+        return completed, offset, valid
+
+    with open(path, 'rb') as journal:
+        for raw in journal:
+            if not raw.endswith(b'\n'):
+                break
+            parts = raw[:-1].decode('ascii', errors='replace').split('\t')
+            if len(parts) != 3:
+                break
+            key, size, crc = parts
+            try:
+                size = int(size)
+            except ValueError:
+                break
+            if crc != _checksum(key, size) or size < offset:
+                break
+            if output_size is not None and size > output_size:
+                break
+            completed[key] += 1
+            offset = size
+            valid += len(raw)
+    return completed, offset, valid
+
+
+class CheckpointJournal:
+    """
+    Appends completed rows to the journal. `keep_bytes` is the intact
+    length reported by load_journal when resuming; any torn tail beyond it
+    is cut off first. A fresh run starts from an empty journal.
+    """
+
+    def __init__(self, path: str, keep_bytes: int = 0, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.ftruncate(self._fd, keep_bytes)
+
+    def record(self, key: str, offset: int):
+        """
+        Marks a row as completed once the output has been flushed up to `offset` bytes.
+        """
+        os.write(self._fd, f"{key}\t{offset}\t{_checksum(key, offset)}\n".encode('ascii'))
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def record_many(self, entries: List[Tuple[str, int]]):
+        """
+        Records a flushed batch of (key, offset) rows with a single write.
+        """
+        os.write(self._fd, "".join(
+            f"{key}\t{offset}\t{_checksum(key, offset)}\n" for key, offset in entries
+        ).encode('ascii'))
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def close(self, remove: bool = False):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,210 @@
+import ipaddress
+import itertools
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+# Bulk DNS pre-resolution. Before a batch of rows is verified, every
+# hostname those rows will contact is resolved concurrently and kept with
+# its TTL. Probes then connect to the cached address, and rows whose
+# hostnames do not exist (NXDOMAIN) finish without a network probe instead
+# of paying a full connection timeout. The next batch is resolved in the
+# background while the current one is being verified.
+#
+# dnspython is imported by the first DNSCache, so runs without
+# --pre-resolve never load it.
+
+DEFAULT_NEGATIVE_TTL = 300
+DEFAULT_LOOKUP_TIMEOUT = 3.0
+DEFAULT_WORKERS = 64
+DEFAULT_BATCH = 5000
+
+T = TypeVar("T")
+
+
+class DNSEntry:
+    __slots__ = ("addresses", "expires", "error")
+
+    def __init__(self, addresses: List[str], expires: float, error: Optional[str] = None):
+        self.addresses = addresses
+        self.expires = expires
+        self.error = error  # Set for negative entries, e.g. "NXDOMAIN"
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _negative_ttl(exc: Exception, default: int) -> int:
+    # RFC 2308: negative answers live for min(SOA TTL, SOA MINIMUM)
+    import dns.rdatatype
+    try:
+        for response in exc.responses().values():
+            for rrset in response.authority:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    return min(rrset.ttl, rrset[0].minimum)
+    except Exception:
+        pass
+    return default
+
+
+class DNSCache:
+    def __init__(self, negative_ttl: int = DEFAULT_NEGATIVE_TTL,
+                 timeout: float = DEFAULT_LOOKUP_TIMEOUT, workers: int = DEFAULT_WORKERS):
+        import dns.resolver
+        self.resolver = dns.resolver.Resolver()
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.workers = workers
+        self._entries: Dict[str, DNSEntry] = {}
+        self._lock = threading.Lock()
+        self.resolved = 0
+        self.negative = 0
+        self.failed = 0
+
+    def _query(self, host: str) -> Optional[DNSEntry]:
+        """
+        Resolves one name. Returns None when the outcome is inconclusive
+        (timeouts, unreachable servers), so probes fall back to the system resolver.
+        """
+        import dns.exception
+        import dns.resolver
+        now = time.time()
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = self.resolver.resolve(host, rdtype, lifetime=self.timeout, search=False)
+            except dns.resolver.NXDOMAIN as e:
+                return DNSEntry([], now + _negative_ttl(e, self.negative_ttl), "NXDOMAIN")
+            except dns.resolver.NoAnswer:
+                continue
+            except (dns.exception.DNSException, OSError):
+                return None
+            addresses = [rdata.address for rdata in answer]
+            return DNSEntry(addresses, now + answer.rrset.ttl)
+        return DNSEntry([], now + self.negative_ttl, "no address records")
+
+    def _confirm_negative(self, host: str, entry: DNSEntry) -> DNSEntry:
+        # dnspython only speaks DNS. Names served by /etc/hosts or other NSS
+        # sources would look non-existent, so ask the system resolver before
+        # trusting a negative answer.
+        try:
+            infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        except OSError:
+            return entry
+        # IPv4 first, matching the A-before-AAAA order of _query
+        addresses = sorted(dict.fromkeys(info[4][0] for info in infos), key=lambda addr: ":" in addr)
+        return DNSEntry(addresses, time.time() + self.negative_ttl)
+
+    def _resolve_one(self, host: str):
+        entry = self._query(host)
+        if entry is not None and entry.error:
+            entry = self._confirm_negative(host, entry)
+        with self._lock:
+            if entry is None:
+                self.failed += 1
+                return
+            self._entries[host] = entry
+            if entry.error:
+                self.negative += 1
+            else:
+                self.resolved += 1
+
+    def resolve_all(self, hosts: Iterable[str]):
+        """
+        Resolves every name not already cached (or expired), concurrently.
+        """
+        now = time.time()
+        names = {host.lower().rstrip(".") for host in hosts if host and not is_ip(host)}
+        with self._lock:
+            pending = [
+                host for host in names
+                if host not in self._entries or self._entries[host].expires <= now
+            ]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+            list(executor.map(self._resolve_one, pending))
+
+    def lookup(self, host: str) -> Optional[DNSEntry]:
+        entry = self._entries.get((host or "").lower().rstrip("."))
+        if entry is None or entry.expires <= time.time():
+            return None
+        return entry
+
+    def address(self, host: str, ipv4: bool = False) -> Optional[str]:
+        """
+        A cached address for host, or None if it is not (positively) cached.
+        """
+        entry = self.lookup(host)
+        if entry is None or entry.error:
+            return None
+        for addr in entry.addresses:
+            if not ipv4 or ":" not in addr:
+                return addr
+        return None
+
+    def unresolvable(self, hosts: Iterable[str]) -> Optional[str]:
+        """
+        If every host has a cached negative answer, returns a description
+        like "example.invalid (NXDOMAIN)"; otherwise None.
+        """
+        failures = []
+        for host in hosts:
+            entry = self.lookup(host)
+            if entry is None or not entry.error:
+                return None
+            failures.append(f"{host} ({entry.error})")
+        return ", ".join(failures) or None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"resolved": self.resolved, "negative": self.negative, "failed": self.failed}
+
+
+# The cache consulted by the probe layer, set by install()
+active: Optional[DNSCache] = None
+
+
+def install(cache: Optional[DNSCache]):
+    global active
+    active = cache
+
+
+def cached_address(host: str, ipv4: bool = False) -> Optional[str]:
+    if active is None or not host or is_ip(host):
+        return None
+    return active.address(host, ipv4=ipv4)
+
+
+def resolve_ahead(rows: Iterable[T], hosts_for: Callable[[T], Iterable[str]],
+                  cache: DNSCache, batch_size: int = DEFAULT_BATCH) -> Iterator[T]:
+    """
+    Passes rows through unchanged, resolving the hostnames of each batch
+    of `batch_size` rows before any row of that batch is released. While a
+    batch is released the next one is read and resolved on a background
+    thread, so at most two batches are held.
+    """
+    iterator = iter(rows)
+
+    def start(batch: List[T]) -> Future:
+        hosts = [host for item in batch for host in hosts_for(item)]
+        return background.submit(cache.resolve_all, hosts)
+
+    background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dns-ahead")
+    try:
+        batch = list(itertools.islice(iterator, batch_size))
+        resolving = start(batch) if batch else None
+        while batch:
+            following = list(itertools.islice(iterator, batch_size))
+            resolving_next = start(following) if following else None
+            resolving.result()
+            yield from batch
+            batch, resolving = following, resolving_next
+    finally:
+        background.shutdown(wait=False)
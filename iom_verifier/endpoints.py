@@ -0,0 +1,101 @@
+import fnmatch
+import json
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+# Destination families group probes by the provider infrastructure that
+# serves them, so throttling and health tracking can be applied per family
+# (e.g. every bucket host under s3.amazonaws.com) as well as per host.
+
+S3 = "s3"
+GCS = "gcs"
+AZURE_BLOB = "azure-blob"
+HTTP = "http"
+TCP = "tcp"
+
+
+def host_family(host: str) -> str:
+    """
+    Family for an HTTP(S) destination host.
+    """
+    host = (host or "").lower().rstrip(".")
+    if host.endswith(".amazonaws.com") and (".s3." in f".{host}" or host.startswith("s3.")):
+        return S3
+    if host == "storage.googleapis.com" or host.endswith(".storage.googleapis.com"):
+        return GCS
+    if host.endswith(".blob.core.windows.net"):
+        return AZURE_BLOB
+    return HTTP
+
+
+def shared_host(host: str) -> bool:
+    """
+    True for provider hosts that serve many buckets path-style
+    (https://storage.googleapis.com/<bucket>/, https://s3.amazonaws.com/<bucket>).
+    """
+    host = (host or "").lower().rstrip(".")
+    if host == "storage.googleapis.com":
+        return True
+    return host.endswith(".amazonaws.com") and (host.startswith("s3.") or host.startswith("s3-"))
+
+
+def url_destination(url: str):
+    """
+    Returns (family, destination) for a URL. The destination is the host,
+    or host/bucket on a shared path-style host, so per-destination limits
+    and health apply to one tenant rather than the whole provider endpoint.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    destination = host
+    if shared_host(host):
+        bucket = parts.path.lstrip("/").split("/", 1)[0]
+        if bucket:
+            destination = f"{host}/{bucket}"
+    return host_family(host), destination
+
+
+# Endpoint overrides send probes somewhere other than the real provider
+# hosts, e.g. to the local stand-in servers of the benchmark suite. Rules
+# are checked in order; families and rate limiting still use the original host.
+_http_overrides: List[Tuple[str, str]] = []  # (host suffix, URL template)
+_tcp_overrides: List[Tuple[str, str]] = []   # (host glob, "address:port")
+
+
+def load_overrides(path: str):
+    """
+    Reads a JSON file like:
+      {"http": {"s3.amazonaws.com": "http://127.0.0.1:9000/{host}{path}"},
+       "tcp": {"*.open.example.test": "127.0.0.1:9001"}}
+    URL templates may use {scheme}, {host}, {port} and {path} (which
+    includes the query string) of the original URL.
+    """
+    global _http_overrides, _tcp_overrides
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    _http_overrides = [(suffix.lower().strip("."), template) for suffix, template in spec.get("http", {}).items()]
+    _tcp_overrides = [(pattern.lower(), address) for pattern, address in spec.get("tcp", {}).items()]
+
+
+def rewrite_url(url: str) -> str:
+    if not _http_overrides:
+        return url
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    for suffix, template in _http_overrides:
+        if host == suffix or host.endswith("." + suffix):
+            path = parts.path or "/"
+            if parts.query:
+                path = f"{path}?{parts.query}"
+            return template.format(scheme=parts.scheme, host=host, port=parts.port or "", path=path)
+    return url
+
+
+def rewrite_tcp(host: str, port: int) -> Tuple[str, int]:
+    if not _tcp_overrides:
+        return host, port
+    for pattern, address in _tcp_overrides:
+        if fnmatch.fnmatchcase(host.lower(), pattern):
+            target_host, _, target_port = address.rpartition(":")
+            return target_host, int(target_port)
+    return host, port
@@ -0,0 +1,314 @@
+import ipaddress
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from . import dns_cache
+from .endpoints import HTTP, TCP
+
+# Destination health: latency-derived timeouts and circuit breakers.
+#
+# Timeouts. Each endpoint family keeps a window of recent latencies of
+# probes that got an answer; its timeout is TIMEOUT_MULTIPLIER x their 99th
+# percentile, clamped to a floor and a ceiling (by default the fixed
+# timeouts used before). Timed-out probes are not samples: a filtered port
+# times out whatever the limit, so they say nothing about how long an
+# answer takes. The multiplier leaves room for latency to drift up, and
+# slower answers that still arrive raise the percentile as they come in.
+#
+# Circuit breakers. Consecutive connection failures (HTTP timeouts, resets,
+# unreachable networks, refused HTTP connections; not DNS or TLS errors,
+# which say something about the target rather than the path to it, nor a
+# refused or timed-out TCP port, which is how closed and filtered ports
+# answer) are counted per destination: the exact host or IP address, or
+# host/bucket on a shared provider host (see endpoints.url_destination).
+# Hosts under one provider domain are separate tenants, so one of them
+# failing says nothing about the others. After `failures` in a row the
+# breaker opens and probes to it fail at once. After a cooldown one probe
+# is let through (half-open): success closes the breaker, failure
+# re-opens it with twice the cooldown.
+#
+# Group breakers. A blackholed provider range or a broken egress path fails
+# a different host on almost every row, which no per-host breaker notices.
+# Each outcome therefore also counts toward a group: the provider for
+# storage families, the /24 (/64) around an IP address, otherwise the
+# family (http, tcp). When at least GROUP_FAILURE_RATE of the last
+# GROUP_WINDOW outcomes of a group failed, across GROUP_MIN_HOSTS hosts or
+# more, the group's breaker opens like a host breaker. TCP connect timeouts
+# count here: one filtered port is an answer, nearly all of them timing
+# out is a broken path.
+
+LATENCY_WINDOW = 512
+MIN_SAMPLES = 20
+RECOMPUTE_EVERY = 16
+TIMEOUT_PERCENTILE = 0.99
+TIMEOUT_MULTIPLIER = 3.0
+DEFAULT_TIMEOUT_FLOOR = 1.0
+DEFAULT_BREAKER_COOLDOWN = 10.0
+MAX_BREAKER_COOLDOWN = 300.0
+MAX_BREAKERS = 10000
+GROUP_WINDOW = 50
+GROUP_FAILURE_RATE = 0.9
+GROUP_MIN_HOSTS = 10
+
+
+def breaker_key(family: str, host: str) -> str:
+    """
+    What a failure is blamed on: the destination itself.
+    """
+    return (host or "").lower().rstrip(".") or family
+
+
+def group_key(family: str, host: str) -> str:
+    """
+    The wider destination a failure also counts against, see the module comment.
+    """
+    if family not in (HTTP, TCP):
+        return family
+    host = (host or "").lower().rstrip(".")
+    address = host if dns_cache.is_ip(host) else dns_cache.cached_address(host)
+    if not address:
+        return family
+    address = ipaddress.ip_address(address)
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class _Latency:
+    __slots__ = ("samples", "timeout", "fresh")
+
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.timeout: Optional[float] = None
+        self.fresh = 0  # Samples since the timeout was last computed
+
+
+class _Breaker:
+    __slots__ = ("failures", "opened_at", "cooldown", "trial")
+
+    def __init__(self, cooldown: float):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.cooldown = cooldown
+        self.trial = False  # A half-open probe is out
+
+
+class _Group(_Breaker):
+    __slots__ = ("outcomes",)
+
+    def __init__(self, cooldown: float):
+        super().__init__(cooldown)
+        self.outcomes: Deque[Tuple[str, bool]] = deque(maxlen=GROUP_WINDOW)  # (host, failed)
+
+    def failing(self) -> bool:
+        if len(self.outcomes) < GROUP_WINDOW:
+            return False
+        failed_hosts = [host for host, failed in self.outcomes if failed]
+        return (len(failed_hosts) >= GROUP_FAILURE_RATE * len(self.outcomes)
+                and len(set(failed_hosts)) >= GROUP_MIN_HOSTS)
+
+
+class Health:
+    enabled = True
+
+    def __init__(self, adaptive_timeouts: bool = False, floor: float = DEFAULT_TIMEOUT_FLOOR,
+                 ceiling: Optional[float] = None, failures: int = 0,
+                 cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        self.adaptive_timeouts = adaptive_timeouts
+        self.floor = floor
+        self.ceiling = ceiling
+        self.failures = failures
+        self.cooldown = cooldown
+        self._latency: Dict[str, _Latency] = {}
+        self._breakers: Dict[str, _Breaker] = {}
+        self._groups: Dict[str, _Group] = {}
+        self._trips: Dict[str, int] = {}       # Survive pruning, for the summary
+        self._rejected: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # Timeouts
+
+    def timeout(self, family: str, default: float) -> float:
+        """
+        The timeout to use for the next probe of `family`; `default` is the
+        fixed timeout used without --adaptive-timeouts.
+        """
+        if not self.adaptive_timeouts:
+            return default
+        ceiling = self.ceiling or default
+        latency = self._latency.get(family)
+        if latency is None or latency.timeout is None:
+            return ceiling
+        return min(max(latency.timeout, self.floor), ceiling)
+
+    def _observe(self, family: str, seconds: float):
+        # Caller holds the lock
+        latency = self._latency.get(family)
+        if latency is None:
+            latency = self._latency[family] = _Latency()
+        latency.samples.append(seconds)
+        latency.fresh += 1
+        if len(latency.samples) >= MIN_SAMPLES and latency.fresh >= RECOMPUTE_EVERY:
+            ordered = sorted(latency.samples)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * TIMEOUT_PERCENTILE))]
+            latency.timeout = p99 * TIMEOUT_MULTIPLIER
+            latency.fresh = 0
+
+    # Circuit breakers
+
+    def check(self, family: str, host: str) -> Optional[str]:
+        """
+        Returns why a probe must not be sent, or None to go ahead. While a
+        breaker is half-open only the first caller gets through.
+        """
+        if not self.failures:
+            return None
+        key = breaker_key(family, host)
+        group = group_key(family, host)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is not None and breaker.opened_at is not None:
+                return self._refuse(key, breaker, f"{breaker.failures} consecutive connection failures")
+            breaker = self._groups.get(group)
+            if breaker is not None and breaker.opened_at is not None:
+                return self._refuse(f"{group} (group)", breaker, "most recent probes across its hosts failed")
+            return None
+
+    def _refuse(self, key: str, breaker: _Breaker, why: str) -> Optional[str]:
+        # Caller holds the lock
+        now = time.monotonic()
+        waited = now - breaker.opened_at
+        if waited >= breaker.cooldown:
+            # Half-open: this probe is the trial. The cooldown restarts, so if
+            # it ends without a verdict (e.g. a DNS error) another follows later.
+            breaker.opened_at = now
+            breaker.trial = True
+            return None
+        self._rejected[key] = self._rejected.get(key, 0) + 1
+        return f"circuit open for {key} after {why}; not probed, next retry in {max(0.0, breaker.cooldown - waited):.0f}s"
+
+    def succeeded(self, family: str, host: str, seconds: float):
+        """
+        The destination answered (any HTTP status, an open or refused port).
+        """
+        with self._lock:
+            if self.adaptive_timeouts:
+                self._observe(family, seconds)
+            if self.failures:
+                # A closed breaker with no failures need not be kept at all
+                self._breakers.pop(breaker_key(family, host), None)
+                self._group_outcome(family, host, False)
+
+    def failed(self, family: str, host: str):
+        """
+        A connection failure: an HTTP timeout, a reset, an unreachable
+        network, or a connection refused by an HTTP endpoint.
+        """
+        if not self.failures:
+            return
+        with self._lock:
+            key = breaker_key(family, host)
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                if len(self._breakers) >= MAX_BREAKERS:
+                    self._prune()
+                breaker = self._breakers[key] = _Breaker(self.cooldown)
+            breaker.failures += 1
+            self._count_failure(key, breaker, breaker.failures >= self.failures)
+            self._group_outcome(family, host, True)
+
+    def timed_out(self, family: str, host: str):
+        """
+        A TCP connect timeout: a filtered port is an answer for that host,
+        so only the group (see the module comment) counts it.
+        """
+        if not self.failures:
+            return
+        with self._lock:
+            self._group_outcome(family, host, True)
+
+    def _count_failure(self, key: str, breaker: _Breaker, tripped: bool):
+        # Caller holds the lock
+        now = time.monotonic()
+        if breaker.trial:
+            # The half-open probe failed too: back off further
+            breaker.trial = False
+            breaker.opened_at = now
+            breaker.cooldown = min(breaker.cooldown * 2, MAX_BREAKER_COOLDOWN)
+        elif breaker.opened_at is None and tripped:
+            breaker.opened_at = now
+            self._trips[key] = self._trips.get(key, 0) + 1
+
+    def _group_outcome(self, family: str, host: str, failed: bool):
+        # Caller holds the lock. There are few groups, so they are never pruned.
+        group = group_key(family, host)
+        breaker = self._groups.get(group)
+        if breaker is None:
+            breaker = self._groups[group] = _Group(self.cooldown)
+        breaker.outcomes.append(((host or "").lower(), failed))
+        if not failed:
+            if breaker.trial:
+                # The trial got through: close and start over with a clean window
+                breaker.trial = False
+                breaker.opened_at = None
+                breaker.cooldown = self.cooldown
+                breaker.outcomes.clear()
+            return
+        breaker.failures += 1
+        self._count_failure(f"{group} (group)", breaker, breaker.failing())
+
+    def _prune(self):
+        # Caller holds the lock. Forget closed breakers; open ones must stay.
+        for key in [key for key, breaker in self._breakers.items() if breaker.opened_at is None]:
+            del self._breakers[key]
+
+    # Reporting
+
+    def _is_open(self, key: str) -> bool:
+        if key.endswith(" (group)"):
+            breaker = self._groups.get(key[:-len(" (group)")])
+        else:
+            breaker = self._breakers.get(key)
+        return breaker is not None and breaker.opened_at is not None
+
+    def summary(self, default_for: Callable[[str], float]) -> Dict[str, Dict[str, Any]]:
+        """
+        Current timeout per family that has enough samples (`default_for`
+        gives a family's fixed timeout), and every breaker that tripped.
+        """
+        with self._lock:
+            timeouts = {family: round(self.timeout(family, default_for(family)), 3)
+                        for family, latency in sorted(self._latency.items()) if latency.timeout is not None}
+            breakers = {
+                key: {"trips": trips, "rejected": self._rejected.get(key, 0),
+                      "open": self._is_open(key)}
+                for key, trips in sorted(self._trips.items())
+            }
+        return {"timeouts": timeouts, "breakers": breakers}
+
+
+class NullHealth:
+    """
+    Stand-in used when neither adaptive timeouts nor breakers are enabled.
+    """
+
+    enabled = False
+
+    def timeout(self, family: str, default: float) -> float:
+        return default
+
+    def check(self, family: str, host: str) -> Optional[str]:
+        return None
+
+    def succeeded(self, family: str, host: str, seconds: float):
+        pass
+
+    def failed(self, family: str, host: str):
+        pass
+
+    def timed_out(self, family: str, host: str):
+        pass
+
+    def summary(self, default_for: Callable[[str], float]) -> Dict[str, Dict[str, Any]]:
+        return {"timeouts": {}, "breakers": {}}
@@ -0,0 +1,108 @@
+import socket
+import time
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import dns_cache, metrics
+from .sessions import stats
+
+# The requests adapter behind sessions.SessionPool: urllib3 connections
+# that connect to pre-resolved addresses and time each probe phase, in
+# pools that count requests and new connections. Imported with the first
+# session, see sessions.py.
+
+
+class _ResolvingConnectionMixin:
+    # Set once the TCP connection is up; the rest of connect() is the TLS handshake
+    _tls_started: Optional[float] = None
+
+    def _new_conn(self):
+        # Connect to the pre-resolved address, if any. _dns_host is restored
+        # right away so the Host header, SNI and certificate checks keep the name.
+        address = dns_cache.cached_address(self.host)
+        if not address and metrics.active is not None and not dns_cache.is_ip(self.host):
+            address = self._timed_resolve()
+        if not address:
+            return self._timed_connect()
+        original = self._dns_host
+        self._dns_host = address
+        try:
+            return self._timed_connect()
+        finally:
+            self._dns_host = original
+
+    def _timed_resolve(self) -> Optional[str]:
+        # With metrics on, resolve here so DNS time is measured apart from the connect
+        started = time.perf_counter()
+        try:
+            return socket.getaddrinfo(self._dns_host, self.port, type=socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            return None  # The connect below fails with the usual error
+        finally:
+            metrics.phase("dns", started)
+
+    def _timed_connect(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        metrics.phase("connect", started)
+        self._tls_started = time.perf_counter()
+        return sock
+
+    def connect(self):
+        super().connect()
+        if isinstance(self, HTTPSConnection) and self._tls_started is not None:
+            metrics.phase("tls", self._tls_started)
+
+    def getresponse(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        metrics.phase("ttfb", started)
+        return response
+
+
+class _ResolvingHTTPConnection(_ResolvingConnectionMixin, HTTPConnection):
+    pass
+
+
+class _ResolvingHTTPSConnection(_ResolvingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _ResolvingHTTPConnection
+
+    def _new_conn(self):
+        stats.note_new_connection()
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        stats.note_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _ResolvingHTTPSConnection
+
+    def _new_conn(self):
+        stats.note_new_connection()
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        stats.note_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools count new connections and requests.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
@@ -0,0 +1,147 @@
+import calendar
+import hashlib
+import os
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .record import RESULT_COLUMNS, Row, RowSchema, read_records, values_hash
+
+# Carrying results forward from a previous report (--incremental-from).
+#
+# Daily exports are mostly the same rows as the day before. The previous
+# output is indexed by finding identity, (ID, Resource ID, Rule Name), and
+# a row whose input columns are unchanged since then gets that report's
+# result columns instead of being verified again. New and changed rows,
+# rows that ended in an Error and, with `max_age`, results older than that
+# are verified as usual. Rows of a report written before Verify_Timestamp
+# existed (or with the column empty) are dated by the report's modification
+# time, the latest their results can have been established.
+#
+# The index holds two integers per row: a 64-bit digest of the identity
+# mapped to a 64-bit digest of the row contents and the record's byte
+# offset in the previous report. The result columns are read back from
+# the file only for rows that are carried forward.
+
+IDENTITY_COLUMNS = ('ID', 'Resource ID', 'Rule Name')
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+_OFFSET_BITS = 48
+
+
+def format_timestamp(seconds: float) -> str:
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+def parse_timestamp(text: str) -> Optional[float]:
+    try:
+        return float(calendar.timegm(time.strptime(text, TIMESTAMP_FORMAT)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _identity(values: Sequence[str], positions: Dict[str, int]) -> int:
+    parts = [values[positions[name]] if name in positions and positions[name] < len(values) else ''
+             for name in IDENTITY_COLUMNS]
+    return _digest('\x1f'.join(parts))
+
+
+def _byte_records(file: BinaryIO, offset: int = 0) -> Iterator[Tuple[int, List[str], str]]:
+    """
+    CSV records as (byte offset, values, raw text), starting at `offset`.
+    """
+    position = offset
+
+    def lines():
+        nonlocal position
+        for line in file:
+            position += len(line)
+            yield line.decode('utf-8')
+
+    start = offset
+    for values, raw in read_records(lines()):
+        yield start, values, raw
+        start = position
+
+
+class PreviousReport:
+    """
+    Index of a previous output file, see the module comment.
+    """
+
+    def __init__(self, path: str, max_age: Optional[float] = None):
+        self.path = path
+        self.max_age = max_age
+        self.carried = 0
+        self.changed = 0     # Known finding, different input columns
+        self.new = 0
+        self.stale = 0       # Unchanged, but the result is an Error or older than max_age
+        self._index: Dict[int, int] = {}
+        self._file: BinaryIO = open(path, 'rb')
+        self.written_at = format_timestamp(os.fstat(self._file.fileno()).st_mtime)
+        try:
+            self._load()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _load(self):
+        bom = self._file.read(3)
+        if bom != b'\xef\xbb\xbf':
+            self._file.seek(0)
+        records = _byte_records(self._file, self._file.tell())
+        header = next(records, None)
+        if header is None:
+            raise ValueError(f"{self.path} is empty")
+        names = header[1]
+        # Reports from before Verify_Timestamp existed are accepted; their results have no age
+        missing = [name for name in RESULT_COLUMNS if name not in names and name != 'Verify_Timestamp']
+        if missing:
+            raise ValueError(f"{self.path} is not a verifier output (no {', '.join(missing)} column)")
+        self.schema = RowSchema(names)
+        self._results = [names.index(name) if name in names else None for name in RESULT_COLUMNS]
+        for offset, values, _ in records:
+            kept = [value for i, value in enumerate(values) if i not in self.schema.dropped]
+            kept = (kept + [''] * len(self.schema.fieldnames))[:len(self.schema.fieldnames)]
+            content = int(values_hash(kept)[:16], 16)
+            self._index[_identity(kept, self.schema.positions)] = (content << _OFFSET_BITS) | offset
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _read_results(self, offset: int) -> List[str]:
+        self._file.seek(offset)
+        values = next(_byte_records(self._file, offset))[1]
+        return [values[i] if i is not None and i < len(values) else '' for i in self._results]
+
+    def carry(self, row: Row) -> bool:
+        """
+        Fills in the row's results from the previous report if it can be
+        carried forward; returns whether it was.
+        """
+        values = row.values()
+        entry = self._index.get(_identity(values, row.schema.positions))
+        if entry is None:
+            self.new += 1
+            return False
+        if entry >> _OFFSET_BITS != int(values_hash(values)[:16], 16):
+            self.changed += 1
+            return False
+        results = self._read_results(entry & ((1 << _OFFSET_BITS) - 1))
+        execution, exploit, _, checked = results
+        if not checked:
+            results[3] = checked = self.written_at
+        checked_at = parse_timestamp(checked)
+        if "Error" in (execution, exploit) or (
+                self.max_age is not None and (checked_at is None or time.time() - checked_at > self.max_age)):
+            self.stale += 1
+            return False
+        row.results = results
+        self.carried += 1
+        return True
+
+    def close(self):
+        self._file.close()
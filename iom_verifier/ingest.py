@@ -0,0 +1,145 @@
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .record import CSVLine, Row, RowSchema, read_records
+
+# Parallel ingestion for very large exports. The input is memory-mapped,
+# cut into chunks that end on record boundaries, and each chunk is parsed
+# into rows by a worker process. Chunks are handed back in file order, so
+# rows reach the engine in the same order a sequential read would produce.
+#
+# A newline only ends a record when it is outside a quoted field. Quotes
+# inside quoted fields are doubled (""), so a position is inside a quoted
+# field exactly when an odd number of quotes precede it; boundaries are
+# found by tracking that parity across the file.
+
+DEFAULT_CHUNK_SIZE = 8 << 20
+BOM = b'\xef\xbb\xbf'
+
+
+def _quotes_odd(mm: mmap.mmap, start: int, end: int) -> bool:
+    return mm[start:end].count(b'"') % 2 == 1
+
+
+def _record_end(mm: mmap.mmap, pos: int, inside: bool) -> int:
+    """
+    The offset just past the first newline at or after `pos` that is
+    outside quotes, given whether `pos` itself is inside a quoted field.
+    """
+    size = len(mm)
+    while True:
+        newline = mm.find(b'\n', pos)
+        if newline == -1:
+            return size
+        if _quotes_odd(mm, pos, newline):
+            inside = not inside
+        pos = newline + 1
+        if not inside:
+            return pos
+
+
+def chunk_boundaries(mm: mmap.mmap, start: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits mm[start:] into (begin, end) ranges of roughly chunk_size bytes
+    that each hold whole records.
+    """
+    size = len(mm)
+    chunks = []
+    pos = start
+    while pos < size:
+        target = pos + chunk_size
+        if target >= size:
+            chunks.append((pos, size))
+            break
+        end = _record_end(mm, target, _quotes_odd(mm, pos, target))
+        chunks.append((pos, end))
+        pos = end
+    return chunks
+
+
+def _parse_chunk(path: str, begin: int, end: int, fieldnames: List[str]):
+    # Runs in a worker process. Returns the packed rows and the time spent parsing.
+    started = time.perf_counter()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[begin:end].decode('utf-8')
+    schema = RowSchema(fieldnames)
+    line = CSVLine()
+    rows = [schema.make_row(values, raw, line) for values, raw in read_records(io.StringIO(text, newline=''))]
+    return schema.pack(rows), time.perf_counter() - started
+
+
+class ParallelReader:
+    """
+    Iterates the rows of a CSV file parsed by `processes` worker
+    processes. At most two chunks per worker are parsed ahead of the
+    consumer, which bounds memory for streaming runs.
+    """
+
+    def __init__(self, path: str, processes: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.processes = max(1, processes)
+        self.chunk_size = max(1, chunk_size)
+        self.schema: Optional[RowSchema] = None
+        self.bytes_parsed = 0
+        self.parse_seconds = 0.0  # Summed over workers
+
+    def read_fieldnames(self) -> List[str]:
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fieldnames, _ = self._read_header(mm)
+        return fieldnames
+
+    def _read_header(self, mm: mmap.mmap) -> Tuple[List[str], int]:
+        start = len(BOM) if mm[:len(BOM)] == BOM else 0
+        end = _record_end(mm, start, False)
+        header = mm[start:end].decode('utf-8')
+        return next(csv.reader(io.StringIO(header, newline='')), []), end
+
+    def __iter__(self) -> Iterator[Row]:
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fieldnames, body = self._read_header(mm)
+                chunks = chunk_boundaries(mm, body, self.chunk_size)
+        if not fieldnames:
+            return
+        self.schema = RowSchema(fieldnames)
+
+        # "spawn" like process_engine: the writer, connector and resolver threads
+        # already run here and would be inherited broken by a forked child
+        with ProcessPoolExecutor(max_workers=self.processes,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = deque()
+            chunks = deque(chunks)
+            while chunks or pending:
+                while chunks and len(pending) < self.processes * 2:
+                    begin, end = chunks.popleft()
+                    pending.append((end - begin, executor.submit(_parse_chunk, self.path, begin, end, fieldnames)))
+                size, future = pending.popleft()
+                packed, seconds = future.result()
+                self.bytes_parsed += size
+                self.parse_seconds += seconds
+                yield from self.schema.unpack(*packed)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Parse throughput per worker and for all workers together. Measured
+        inside the workers, so a slow consumer does not lower it.
+        """
+        per_process = self.bytes_parsed / 1e6 / self.parse_seconds if self.parse_seconds else 0.0
+        return {
+            "megabytes": self.bytes_parsed / 1e6,
+            "processes": self.processes,
+            "mb_per_second": per_process,
+            "aggregate_mb_per_second": per_process * self.processes,
+        }
@@ -0,0 +1,90 @@
+import xml.etree.ElementTree as ET
+from typing import List, Optional
+
+# Evidence from a public bucket or container listing: S3 and GCS
+# <ListBucketResult>, Azure Blob <EnumerationResults>. Only the start of
+# the listing is downloaded (see probes.body_limit), and it is parsed
+# incrementally, stopping once the first EVIDENCE_KEYS names and whether
+# the listing continues on another page are known.
+
+EVIDENCE_KEYS = 5
+MAX_KEY_LENGTH = 200
+FEED_BYTES = 4096
+
+LISTING_ROOTS = ("ListBucketResult", "EnumerationResults")
+
+
+class Listing:
+    def __init__(self):
+        self.keys: List[str] = []            # The first EVIDENCE_KEYS names
+        self.seen = 0                        # Names in the part of the listing that was read
+        self.truncated: Optional[bool] = None  # More keys on further pages; None if not reached
+        self.complete = False                # The whole listing page was read
+
+    def describe(self) -> str:
+        if not self.keys:
+            return "The listing is empty." if self.complete else ""
+        count = f"{self.seen}" if self.complete else f"at least {self.seen}"
+        text = f"Listing shows {count} keys, first: {', '.join(self.keys)}."
+        if self.truncated:
+            text += " The listing is truncated (more keys on further pages)."
+        return text
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def parse(body: bytes, limit: int = EVIDENCE_KEYS) -> Optional[Listing]:
+    """
+    Reads key names and the truncation flag from the start of a listing
+    (`body` may be cut off anywhere). Returns None if it is not a bucket
+    or container listing.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    listing = Listing()
+    path: List[str] = []
+    found = False
+    for offset in range(0, len(body), FEED_BYTES):
+        try:
+            parser.feed(body[offset:offset + FEED_BYTES])
+            events = list(parser.read_events())
+        except ET.ParseError:
+            break
+        for event, element in events:
+            name = _local(element.tag)
+            if event == "start":
+                if not path:
+                    if name not in LISTING_ROOTS:
+                        return None
+                    found = True
+                path.append(name)
+                continue
+            path.pop()
+            parent = path[-1] if path else None
+            if (name == "Key" and parent == "Contents") or (name == "Name" and parent == "Blob"):
+                listing.seen += 1
+                if len(listing.keys) < limit:
+                    listing.keys.append((element.text or "")[:MAX_KEY_LENGTH])
+            elif name == "IsTruncated":
+                listing.truncated = (element.text or "").strip().lower() == "true"
+            elif name == "NextMarker" and parent == "EnumerationResults":
+                listing.truncated = bool((element.text or "").strip())
+            elif name in ("Contents", "Blob"):
+                element.clear()
+            elif not path:
+                listing.complete = True
+        if len(listing.keys) >= limit and listing.truncated is not None:
+            # S3 and GCS report IsTruncated before the keys; nothing more is needed
+            break
+    return listing if found else None
+
+
+def evidence(body: bytes) -> str:
+    """
+    Sentence describing the listing in `body`, prefixed with a space so it
+    can be appended to a result message; empty if there is nothing to report.
+    """
+    listing = parse(body) if body else None
+    text = listing.describe() if listing else ""
+    return f" {text}" if text else ""
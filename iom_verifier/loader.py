@@ -1,37 +1,95 @@
 import csv
-from typing import List, Dict, Any
+import hashlib
+from typing import List, Dict, Any, Iterator, Optional, Union
+from .ingest import ParallelReader, DEFAULT_CHUNK_SIZE
+from .record import Row, RowSchema, RESULT_COLUMNS, read_rows
 from .verifiers.base import BaseVerifier, VerificationResult
-from .verifiers import registry  # We will need a registry mechanism
+from .verifiers import registry
+from .verifiers.registry import DispatchIndex
+
+# Indexes built for plain verifier lists, keyed by the identity of the verifiers
+_index_cache: Dict[tuple, DispatchIndex] = {}
 
 class DataLoader:
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, processes: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE):
         self.csv_file_path = csv_file_path
+        self.schema: Optional[RowSchema] = None
+        # With more than one process, parsing is done by ingest.ParallelReader
+        self.reader = ParallelReader(csv_file_path, processes, chunk_size) if processes > 1 else None
 
-    def load_data(self) -> List[Dict[str, Any]]:
+    def load_data(self) -> List[Row]:
         """
-        Reads the CSV and returns a list of rows.
+        Reads the CSV and returns a list of rows (see record.Row).
         """
         data = []
         try:
-            with open(self.csv_file_path, mode='r', encoding='utf-8-sig') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    data.append(row)
+            if self.reader:
+                data.extend(self.iter_rows())
+            else:
+                with open(self.csv_file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+                    self.schema, rows = read_rows(csvfile)
+                    data.extend(rows)
         except Exception as e:
             print(f"Error reading CSV file: {e}")
             return []
         return data
 
+    def read_fieldnames(self) -> List[str]:
+        """
+        Reads only the header line of the CSV.
+        """
+        with open(self.csv_file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            return next(csv.reader(csvfile), [])
+
+    def iter_rows(self) -> Iterator[Row]:
+        """
+        Yields rows one at a time without materializing the whole file.
+        Unlike load_data, read errors propagate to the caller.
+        """
+        if self.reader:
+            for row in self.reader:
+                self.schema = self.reader.schema
+                yield row
+            return
+        with open(self.csv_file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            self.schema, rows = read_rows(csvfile)
+            yield from rows
+
+    def parse_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Parse throughput of the parallel reader, if one was used.
+        """
+        return self.reader.stats() if self.reader else None
+
+    @staticmethod
+    def row_hash(row: Dict[str, Any], fieldnames: List[str]) -> str:
+        """
+        Stable identity of an input row: a hash of its original column values
+        in header order. Result columns are ignored, so a row hashes the same
+        before and after verification.
+        """
+        if isinstance(row, Row):
+            return row.content_hash()
+        digest = hashlib.sha1()
+        for name in fieldnames:
+            if name in RESULT_COLUMNS:
+                continue
+            value = row.get(name)
+            digest.update(('' if value is None else str(value)).encode('utf-8'))
+            digest.update(b'\x1f')
+        return digest.hexdigest()
+
     @staticmethod
-    def get_verifier_for_row(row: Dict[str, Any], verifiers: List[BaseVerifier]) -> BaseVerifier:
-        """
-        Finds a matching verifier for the given row based on 'Rule Name' or 'Violation Type'
-        """
-        rule_name = row.get('Rule Name', '')
-        violation_type = row.get('Violation Type', '')
-        
-        # Simple matching logic - can be optimized
-        for verifier in verifiers:
-            if rule_name in verifier.ids or violation_type in verifier.ids:
-                return verifier
-        return None
+    def get_verifier_for_row(row: Dict[str, Any], verifiers: Union[DispatchIndex, List[BaseVerifier]]) -> BaseVerifier:
+        """
+        Finds a matching verifier for the given row based on 'Rule Name' or 'Violation Type'.
+        Accepts a prebuilt DispatchIndex (preferred) or a plain list of verifiers,
+        for which an index is built once and reused.
+        """
+        if not isinstance(verifiers, DispatchIndex):
+            key = tuple(id(v) for v in verifiers)
+            index = _index_cache.get(key)
+            if index is None:
+                index = _index_cache[key] = DispatchIndex(verifiers)
+            verifiers = index
+        return verifiers.route(row)
@@ -1,93 +1,832 @@
 import argparse
-import csv
+import os
+import sqlite3
 import sys
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
+import time
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
+from . import (async_engine, dns_cache, endpoints, incremental, metrics, portscan, probes, planner, process_engine,
+               scheduler, sessions, shard, thread_engine)
+from .cache import ResultCache, parse_duration, parse_ttls, COMMIT_EVERY, DEFAULT_MAX_ENTRIES
+from .checkpoint import CheckpointJournal, journal_path, load_journal
+from .ingest import DEFAULT_CHUNK_SIZE
 from .loader import DataLoader
-from .verifiers.registry import ALL_VERIFIERS
+from .record import RowSchema
+from .health import Health, DEFAULT_BREAKER_COOLDOWN, DEFAULT_TIMEOUT_FLOOR
+from .ratelimit import RateLimiter, parse_rates
+from .verifiers.registry import DISPATCH_INDEX, UNMATCHED, DispatchIndex
 from .verifiers.base import BaseVerifier, VerificationResult
+from .writer import ResultWriter, DEFAULT_FLUSH_INTERVAL, DEFAULT_FLUSH_ROWS, DEFAULT_REORDER_LIMIT
 
-# Lock for writing to CSV safely from multiple threads
-csv_lock = threading.Lock()
+def unmatched_result() -> VerificationResult:
+    return VerificationResult(
+        execution_status="Skipped",
+        exploit_status="Manual Check Required",
+        message="Manual Check Required"
+    )
 
-def process_row(row: Dict[str, Any], verifiers: List[BaseVerifier]) -> Dict[str, Any]:
+def unresolvable_result(verifier: BaseVerifier, row: Dict[str, Any]) -> Optional[VerificationResult]:
+    """
+    With DNS pre-resolution enabled, rows whose target hostnames are known
+    not to resolve finish here instead of waiting on a connection timeout.
+    """
+    if dns_cache.active is None:
+        return None
+    hosts = verifier.probe_hosts(row)
+    failure = dns_cache.active.unresolvable(hosts) if hosts else None
+    if not failure:
+        return None
+    return VerificationResult(
+        execution_status="Executed",
+        exploit_status="Unknown",
+        message=f"Target hostname does not resolve: {failure}. No network probe was made."
+    )
+
+def apply_result(row: Dict[str, Any], result: VerificationResult) -> Dict[str, Any]:
+    # Update row with results
+    row['Verify_Execution'] = result.execution_status
+    row['Verify_Exploit'] = result.exploit_status
+    row['Verify_Result'] = result.message
+    row['Verify_Timestamp'] = incremental.format_timestamp(result.checked_at or time.time())
+    
+    return row
+
+def carried_forward(row: Dict[str, Any]) -> bool:
+    """
+    True for rows whose results were carried forward from --incremental-from.
+    """
+    return getattr(row, 'results', None) is not None
+
+def record_row(verifier: Optional[BaseVerifier], result: VerificationResult, started: float):
+    name = type(verifier).__name__ if verifier else UNMATCHED
+    metrics.row_finished(name, f"{result.execution_status}/{result.exploit_status}", started)
+
+def process_row(row: Dict[str, Any], verifiers: DispatchIndex,
+                cache: Optional[ResultCache] = None, pulled: Optional[float] = None) -> Dict[str, Any]:
     """
     Finds the right verifier and executes it.
+    Cache hits are served without any network I/O.
     Returns the modified row with new columns.
+    `pulled` is when the engine took the row from the input, for the metrics.
     """
+    if carried_forward(row):
+        return row
+    started = metrics.row_started(pulled)
     verifier = DataLoader.get_verifier_for_row(row, verifiers)
     
     result = None
     if verifier:
-        result = verifier.verify(row)
+        key, result = cache.lookup(verifier, row) if cache else (None, None)
+        if result is None:
+            result = unresolvable_result(verifier, row)
+        if result is None:
+            result = verifier.verify(row)
+            if key:
+                cache.put(key, result)
     else:
-        result = VerificationResult(
-            execution_status="Skipped",
-            exploit_status="Manual Check Required",
-            message="Manual Check Required"
-        )
+        result = unmatched_result()
 
-    # Update row with results
-    row['Verify_Execution'] = result.execution_status
-    row['Verify_Exploit'] = result.exploit_status
-    row['Verify_Result'] = result.message
-    
-    return row
+    record_row(verifier, result, started)
+    return apply_result(row, result)
+
+async def process_row_async(row: Dict[str, Any], verifiers: DispatchIndex,
+                            cache: Optional[ResultCache] = None, pulled: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Coroutine counterpart of process_row used by the asyncio engine.
+    """
+    if carried_forward(row):
+        return row
+    started = metrics.row_started(pulled)
+    verifier = DataLoader.get_verifier_for_row(row, verifiers)
+    if verifier:
+        key, result = cache.lookup(verifier, row) if cache else (None, None)
+        if result is None:
+            result = unresolvable_result(verifier, row)
+        if result is None:
+            result = await verifier.verify_async(row)
+            if key:
+                cache.put(key, result)
+    else:
+        result = unmatched_result()
+
+    record_row(verifier, result, started)
+    return apply_result(row, result)
+
+def skip_completed(rows: Iterable[Dict[str, Any]], completed: Counter,
+                   fieldnames: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Drops rows recorded in the checkpoint journal, once per journal entry.
+    """
+    for row in rows:
+        key = DataLoader.row_hash(row, fieldnames)
+        if completed[key] > 0:
+            completed[key] -= 1
+            continue
+        yield row
+
+def carry_forward(items: Iterable[Tuple[int, Any]],
+                  previous: incremental.PreviousReport) -> Iterator[Tuple[int, Any]]:
+    """
+    Fills in the results of the (seq, row) pairs the previous report already has.
+    """
+    for item in items:
+        previous.carry(item[1])
+        yield item
+
+def probe_hosts_for(row: Dict[str, Any]) -> List[str]:
+    if carried_forward(row):
+        return []
+    verifier, plan = DISPATCH_INDEX.plan(row)
+    if not plan or not plan.probe_kind or plan.skip:
+        return []
+    return verifier.probe_hosts(row)
+
+def tcp_targets_for(row: Dict[str, Any], cache: Optional[ResultCache] = None) -> List[Tuple[str, int]]:
+    """
+    The (host, port) a row will connect to, unless the row will be answered
+    without probing (carried forward, cached result or non-resolving host).
+    """
+    if carried_forward(row):
+        return []
+    verifier, plan = DISPATCH_INDEX.plan(row)
+    # The rule's plan rules out most rows before any per-row extraction
+    if not plan or plan.probe_kind != "tcp" or plan.skip:
+        return []
+    target = verifier.probe_target(row)
+    if not target:
+        return []
+    if cache and cache.contains(cache.key_for(verifier, row)):
+        return []
+    if dns_cache.active and dns_cache.active.unresolvable([target[1]]):
+        return []
+    return [(target[1], target[2])]
+
+def row_urgency(row: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """
+    Scheduling key of a row (see scheduler.py), or None if verifying it
+    needs no network access.
+    """
+    if carried_forward(row):
+        return None
+    verifier, plan = DISPATCH_INDEX.plan(row)
+    if not plan or not plan.probe_kind or plan.skip or verifier.probe_target(row) is None:
+        return None
+    return scheduler.urgency(row.get('Severity'), plan.probe_kind)
+
+def merge_worker_stats(totals: Dict[str, Counter], stats: process_engine.WorkerStats):
+    """
+    Adds one --processes worker's counters (see setup_worker) to the run totals.
+    """
+    for section, counts in stats.items():
+        totals.setdefault(section, Counter()).update(counts)
+
+def print_routing_summary(index: DispatchIndex, workers: Optional[Dict[str, int]] = None):
+    counts = Counter(index.routing_counts())
+    if workers:
+        counts.update(workers)
+    if not counts:
+        return
+    print("Rows routed per verifier:")
+    for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {name}: {count}")
+
+def print_load_summary(index: DispatchIndex):
+    loaded = index.load_times()
+    if loaded:
+        print(f"Verifiers loaded on demand ({len(loaded)} of {len(index.specs)}): "
+              + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in loaded.items()))
+    if index.plugin_seconds is not None:
+        print(f"Verifier plugins: {len(index.plugins)} found in {index.plugin_seconds * 1000:.1f} ms"
+              + (f" ({', '.join(spec.name for spec in index.plugins)})" if index.plugins else "") + ".")
+    for error in index.plugin_errors:
+        print(f"Warning: {error}")
+    # Built-in verifiers cannot clash (see registry.py), so these are all plugin rules
+    for warning in index.describe_conflicts():
+        print(f"Warning: {warning}")
+
+def print_probe_summary(stats: Optional[Dict[str, int]] = None):
+    stats = stats or probes.probe_stats()
+    if not stats["executed"] and not stats["saved"]:
+        return
+    print(f"Network probes: {stats['executed']} executed, {stats['saved']} saved by deduplication "
+          f"({stats['coalesced']} joined an in-flight probe, {stats['reused']} reused a completed one).")
+
+def print_connection_summary(conn: Optional[Dict[str, int]] = None):
+    conn = conn or sessions.stats.snapshot()
+    if not conn["requests"]:
+        return
+    reuse = max(conn["requests"] - conn["new_connections"], 0) / conn["requests"]
+    print(f"HTTP connections: {conn['requests']} requests over {conn['new_connections']} new connections "
+          f"(reuse ratio {reuse:.0%}).")
+
+def print_parse_summary(loader: DataLoader):
+    stats = loader.parse_stats()
+    if not stats or not stats["megabytes"]:
+        return
+    print(f"Input parsing: {stats['megabytes']:.1f} MB with {stats['processes']} processes, "
+          f"{stats['mb_per_second']:.1f} MB/s per process ({stats['aggregate_mb_per_second']:.1f} MB/s combined).")
+
+def print_throttle_summary():
+    summary = probes.limiter.summary()
+    if not summary:
+        return
+    print("Rate limiting (final concurrency window per endpoint family):")
+    for family, state in summary.items():
+        print(f"  {family}: window {state['window']}, {state['backoffs']} back-offs, "
+              f"ceiling {state['rate']:g} req/s")
+
+def print_health_summary():
+    summary = probes.health.summary(probes.default_timeout)
+    if summary["timeouts"]:
+        print("Adaptive timeouts (current, per endpoint family): "
+              + ", ".join(f"{family} {seconds:g}s" for family, seconds in summary["timeouts"].items()))
+    if summary["breakers"]:
+        print("Circuit breakers tripped:")
+        for key, state in summary["breakers"].items():
+            print(f"  {key}: opened {state['trips']}x, {state['rejected']} probes failed fast"
+                  f"{' (still open)' if state['open'] else ''}")
+
+def format_duration(seconds: float) -> str:
+    if seconds < 10:
+        return f"{seconds:.2g}s"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds // 60 % 60:02d}m"
+
+def print_plan(plan: planner.RunPlan, args: argparse.Namespace, processes: int):
+    print(f"Plan for {plan.rows} rows (dry run, no network probes were made):")
+    print("Rows per verifier (distinct probe targets):")
+    for name, count in sorted(plan.verifier_rows.items(), key=lambda item: -item[1]):
+        targets = plan.verifier_targets.get(name)
+        print(f"  {name}: {count}" + (f" ({len(targets)} targets)" if targets else ""))
+    if plan.probing_rows:
+        print("Probes per type (rows -> distinct targets):")
+        for kind, count in sorted(plan.probing_rows.items(), key=lambda item: -item[1]):
+            print(f"  {kind}: {count} -> {len(plan.targets[kind])}")
+        print(f"Duplicate ratio: {plan.duplicate_ratio():.1%} of probing rows share a target with another row"
+              + (" (only in-flight duplicates are shared with --probe-memo 0)" if not args.probe_memo else ""))
+    if plan.no_probe:
+        print("Rows finished without a probe: "
+              + ", ".join(f"{count} {reason}" for reason, count in plan.no_probe.most_common()))
+    if plan.unroutable:
+        print(f"Rules no verifier handles ({len(plan.unroutable)}):")
+        for rule, count in plan.unroutable.most_common(20):
+            print(f"  {rule}: {count} rows")
+        if len(plan.unroutable) > 20:
+            print(f"  ... and {len(plan.unroutable) - 20} more")
+
+    if not plan.probing_rows:
+        print("No network probes are needed.")
+        return
+
+    if args.engine == "asyncio":
+        slots, how = args.concurrency, f"{args.concurrency} rows in flight"
+    else:
+        slots, how = processes * args.threads, f"{processes * args.threads} threads"
+    tcp_slots = args.tcp_batch if args.tcp_batch > 0 and not (args.adaptive or args.rate_limit) else 0
+    rates = parse_rates(args.rate_limit)[0] if args.adaptive or args.rate_limit else None
+
+    def timeout(family):
+        if args.adaptive_timeouts and args.timeout_ceiling:
+            return args.timeout_ceiling
+        return probes.default_timeout(family)
+
+    expected, worst = plan.estimate(max(1, slots), timeout, args.plan_latency, rates, tcp_slots)
+    print(f"Estimated probe time with {how}: about {format_duration(expected)} if probes answer in "
+          f"{args.plan_latency:g}s, up to {format_duration(worst)} if every probe runs to its timeout "
+          f"(HTTP {timeout(endpoints.HTTP):g}s, TCP {timeout(endpoints.TCP):g}s).")
+
+def print_incremental_summary(previous: incremental.PreviousReport):
+    verified = previous.new + previous.changed + previous.stale
+    print(f"Incremental run: {previous.carried} rows carried forward from {previous.path}, {verified} verified "
+          f"({previous.new} new, {previous.changed} changed, {previous.stale} with an Error or outdated result).")
+
+def configure_run(args: argparse.Namespace, share: int = 1) -> Tuple[Optional[RateLimiter], Optional[ResultCache]]:
+    """
+    Applies the probe settings from the command line to this process and
+    opens the result cache. With `share` > 1 this process is one of that
+    many workers, and takes that fraction of the --rate-limit ceilings.
+    """
+    limiter = None
+    if args.adaptive or args.rate_limit:
+        try:
+            family_rates, host_rate = parse_rates(args.rate_limit)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        family_rates = {family: rate / share for family, rate in family_rates.items()}
+        host_rate /= share
+        in_flight = args.concurrency if args.engine == "asyncio" else args.threads
+        limiter = RateLimiter(family_rates, host_rate, max_window=in_flight)
+    monitor = None
+    if args.adaptive_timeouts or args.circuit_breaker > 0:
+        monitor = Health(adaptive_timeouts=args.adaptive_timeouts, floor=args.timeout_floor,
+                         ceiling=args.timeout_ceiling, failures=args.circuit_breaker,
+                         cooldown=args.breaker_cooldown)
+    probes.configure(remember=args.probe_memo, rate_limiter=limiter, health_monitor=monitor,
+                     max_body=args.max_body_bytes)
+    if args.endpoint_map:
+        try:
+            endpoints.load_overrides(args.endpoint_map)
+        except (OSError, ValueError) as e:
+            print(f"Error loading endpoint map: {e}")
+            sys.exit(1)
+    if args.tcp_batch > 0:
+        async_engine.raise_fd_limit(args.tcp_batch + 256)
+        portscan.configure(max_in_flight=args.tcp_batch)
+    sessions.configure(workers=args.threads)
+
+    cache = None
+    if args.cache_dir:
+        try:
+            # Worker processes share the database file; each commits every write
+            # so none holds the write lock while the others wait
+            cache = ResultCache(args.cache_dir, parse_ttls(args.cache_ttl),
+                                max_entries=args.cache_max_entries, refresh=args.refresh,
+                                commit_every=1 if share > 1 else COMMIT_EVERY)
+        except (ValueError, OSError, sqlite3.Error) as e:
+            print(f"Error opening result cache: {e}")
+            sys.exit(1)
+    return limiter, cache
+
+def setup_worker(args: argparse.Namespace):
+    """
+    Runs once in each --processes worker, see process_engine.WorkerSetup.
+    """
+    limiter, cache = configure_run(args, share=max(1, args.processes))
+    resolver = None
+    if args.pre_resolve:
+        resolver = dns_cache.DNSCache()
+        dns_cache.install(resolver)
+
+    def prepare(rows):
+        # Same look-ahead stages as a single-process run, over one batch at a time
+        if resolver:
+            rows = dns_cache.resolve_ahead(rows, probe_hosts_for, resolver, batch_size=max(1, args.dns_batch))
+        if args.tcp_batch > 0 and limiter is None:
+            rows = probes.tcp_ahead(rows, lambda row: tcp_targets_for(row, cache), batch_size=args.tcp_batch)
+        return rows
+
+    def close():
+        sessions.pool.close()
+        conn = sessions.stats.snapshot()
+        stats = {
+            "routing": DISPATCH_INDEX.routing_counts(),
+            "probes": probes.probe_stats(),
+            "connections": {"requests": conn["requests"], "new_connections": conn["new_connections"]},
+        }
+        if resolver:
+            stats["dns"] = resolver.stats()
+        if cache:
+            evicted = cache.close()
+            stats["cache"] = {"hits": cache.hits, "misses": cache.misses, "stored": cache.stored, "evicted": evicted}
+        return stats
+
+    return prepare, lambda row: process_row(row, DISPATCH_INDEX, cache), close
+
+def merge_main(argv: List[str]):
+    parser = argparse.ArgumentParser(prog="iom_verifier merge",
+                                     description="Combine --shard outputs into one CSV in input order")
+    parser.add_argument("--input", required=True, help="The input CSV the shards were run on")
+    parser.add_argument("--output", required=True, help="Path to the merged output CSV")
+    parser.add_argument("shards", nargs="+", help="Shard output CSVs, in shard order 1..N")
+    args = parser.parse_args(argv)
+
+    try:
+        merged = shard.merge(args.input, args.shards, args.output)
+    except (shard.ShardMismatch, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for path, count in merged.items():
+        print(f"  {path}: {count} rows")
+    print(f"Merged {sum(merged.values())} rows from {len(merged)} shards into {args.output}.")
 
 def main():
-    parser = argparse.ArgumentParser(description="AWS IoM Verifier - External Attacker Perspective")
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        merge_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="AWS IoM Verifier - External Attacker Perspective",
+                                     epilog="Use 'merge --input IN --output OUT SHARD...' to combine --shard outputs.")
     parser.add_argument("--input", required=True, help="Path to the input CSV file")
-    parser.add_argument("--output", required=True, help="Path to the output CSV file")
-    parser.add_argument("--threads", type=int, default=5, help="Number of concurrent threads")
+    parser.add_argument("--output", help="Path to the output CSV file (required unless --plan)")
+    parser.add_argument("--threads", type=int, default=5, help="Number of concurrent threads (per process with --processes)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Verify rows in this many worker processes, each with --threads threads, so CPU work "
+                             "is not serialized on one GIL. The main process still reads the input and writes the "
+                             "output; --rate-limit ceilings are split between the processes")
+    parser.add_argument("--process-batch", type=int, default=process_engine.DEFAULT_BATCH_ROWS,
+                        help="Rows sent to (and results returned from) a worker process at a time")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                        help="Execution engine. 'asyncio' runs network probes on one event loop; "
+                             "--threads then only sizes the fallback pool for sync-only verifiers")
+    parser.add_argument("--concurrency", type=int, default=1000,
+                        help="Maximum rows in flight with --engine asyncio")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream rows from the input instead of loading the whole file first")
+    parser.add_argument("--window", type=int, default=None,
+                        help="Maximum rows submitted to the thread pool at once (default: 4 x --threads)")
+    parser.add_argument("--parse-processes", type=int, default=0,
+                        help="Parse the input in this many worker processes over a memory-mapped file "
+                             "(0 or 1 = parse on the main thread)")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_SIZE >> 20,
+                        help="Size of the input chunks handed to each parse process, in MiB")
+    parser.add_argument("--probe-memo", type=int, default=10000,
+                        help="Completed probe results remembered for duplicate targets (0 = only join in-flight probes)")
+    parser.add_argument("--max-body-bytes", type=int, default=probes.DEFAULT_BODY_LIMIT,
+                        help="Bytes of a public listing read for evidence in result messages (0 = status and headers only)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for a persistent result cache shared across runs (disabled if not set)")
+    parser.add_argument("--cache-ttl", default=None,
+                        help="Per-outcome cache TTLs, e.g. 'Exploitable=1h,Secure=2d,Unknown=6h' (Error results are not cached)")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Evict least recently used cache entries beyond this size (0 = unbounded)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached results (fresh results are still written to the cache)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Throttle probes per endpoint family and per host, backing off on 429/503/resets "
+                             "and ramping up while latency stays flat")
+    parser.add_argument("--rate-limit", default=None,
+                        help="Requests/second ceilings for --adaptive, e.g. 's3=200,gcs=100,azure-blob=100,"
+                             "http=50,tcp=1000,host=20' (0 = no ceiling)")
+    parser.add_argument("--adaptive-timeouts", action="store_true",
+                        help="Derive probe timeouts per endpoint family from observed latency (3 x p99), between "
+                             "--timeout-floor and --timeout-ceiling, instead of the fixed 5s HTTP / 3s TCP")
+    parser.add_argument("--timeout-floor", type=float, default=DEFAULT_TIMEOUT_FLOOR,
+                        help="Lowest timeout --adaptive-timeouts may pick, in seconds")
+    parser.add_argument("--timeout-ceiling", type=float, default=None,
+                        help="Highest timeout --adaptive-timeouts may pick, in seconds (default: the fixed timeouts)")
+    parser.add_argument("--circuit-breaker", type=int, default=0, metavar="FAILURES",
+                        help="Stop probing a host (or a bucket on a shared provider host) after this many consecutive "
+                             "connection failures, failing its rows fast, and retry one probe after a cooldown "
+                             "(0 = off). Refused and timed-out TCP ports are answers and do not count. Also "
+                             "stops a whole provider, /24 or family once nearly all of its recent probes failed "
+                             "across many hosts; there TCP connect timeouts do count")
+    parser.add_argument("--breaker-cooldown", type=float, default=DEFAULT_BREAKER_COOLDOWN,
+                        help="Seconds an open circuit breaker waits before a trial probe (doubles while it keeps failing)")
+    parser.add_argument("--pre-resolve", action="store_true",
+                        help="Resolve all target hostnames concurrently (dnspython) before verifying each batch; "
+                             "rows whose hosts do not exist finish without a network probe")
+    parser.add_argument("--dns-batch", type=int, default=dns_cache.DEFAULT_BATCH,
+                        help="Rows per DNS pre-resolution batch")
+    parser.add_argument("--tcp-batch", type=int, default=probes.DEFAULT_TCP_BATCH,
+                        help="Rows whose TCP port probes are started together on the non-blocking connect engine "
+                             "before the engine reaches them (0 = probe each row on its own; "
+                             "not used with --adaptive/--rate-limit)")
+    parser.add_argument("--lookahead", type=int, default=scheduler.DEFAULT_LOOKAHEAD,
+                        help="Rows read ahead to start the most urgent first (by Severity, then probe cost); "
+                             "0 = input order. Not used with --preserve-order")
+    parser.add_argument("--preserve-order", action="store_true",
+                        help="Write output rows in input order (bounded reorder buffer) instead of completion order")
+    parser.add_argument("--reorder-buffer", type=int, default=DEFAULT_REORDER_LIMIT,
+                        help="With --preserve-order, how far input reading may run ahead of the oldest unwritten row")
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS,
+                        help="Write the output once this many rows are buffered")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="... or once the oldest buffered row has waited this many seconds")
+    parser.add_argument("--endpoint-map", default=None,
+                        help="JSON file redirecting probes to other endpoints (used by the benchmark suite), "
+                             "see endpoints.load_overrides")
+    parser.add_argument("--metrics-json", default=None,
+                        help="Write per-verifier/outcome counts and latency histograms (row time, worker wait, "
+                             "probe DNS/connect/TLS/first-byte/queue phases) to this JSON file at the end of the run")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="Print a stats line (rate, workers busy, wait and phase latencies) every N seconds")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve the live metrics report as JSON on this localhost port")
+    parser.add_argument("--shard", default=None,
+                        help="Process only shard K of N (e.g. 2/8), chosen by a stable hash of each row, so N "
+                             "machines can split one input; implies --preserve-order. Combine the outputs with 'merge'")
+    parser.add_argument("--incremental-from", default=None, metavar="PREVIOUS_OUTPUT",
+                        help="Carry the results of unchanged rows forward from a previous output (matched on ID, "
+                             "Resource ID and Rule Name plus the row contents) and verify only new and changed rows")
+    parser.add_argument("--max-age", default=None,
+                        help="With --incremental-from, verify again results older than this, e.g. '12h' or '7d'")
+    parser.add_argument("--plan", action="store_true",
+                        help="Dry run: route every row and extract its targets without any network I/O, then "
+                             "report probes per verifier and type, duplicates, unhandled rules and a time estimate "
+                             "for the given --threads/--processes/--concurrency")
+    parser.add_argument("--plan-latency", type=float, default=0.25,
+                        help="Seconds an answered probe is assumed to take in the --plan estimate")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: skip rows recorded in the output's checkpoint journal "
+                             "and append to the existing output")
+    parser.add_argument("--fsync", action="store_true",
+                        help="fsync the output and the checkpoint journal after every batch (survives power loss, slower)")
     
     args = parser.parse_args()
-    
-    # Load Data
-    loader = DataLoader(args.input)
-    rows = loader.load_data()
-    
-    if not rows:
-        print("No data found or error reading input file.")
+    if not args.output and not args.plan:
+        parser.error("the following arguments are required: --output")
+
+    shard_spec = None
+    if args.shard:
+        try:
+            shard_spec = shard.parse_shard(args.shard)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        # merge relies on every shard output being in input order
+        args.preserve_order = True
+
+    if args.timeout_floor <= 0 or (args.timeout_ceiling is not None and args.timeout_ceiling < args.timeout_floor):
+        print("Error: --timeout-floor must be positive and not above --timeout-ceiling.")
         sys.exit(1)
-        
-    print(f"Loaded {len(rows)} IoMs. Starting verification with {args.threads} threads...")
+
+    max_age = None
+    if args.max_age:
+        try:
+            max_age = parse_duration(args.max_age)
+        except ValueError:
+            print(f"Error: invalid --max-age '{args.max_age}', expected e.g. 90m, 12h or 7d.")
+            sys.exit(1)
+
+    processes = max(1, args.processes)
+    if processes > 1 and not args.plan:
+        if args.engine != "threads":
+            print("Error: --processes runs the thread engine in each process; it cannot be combined with --engine asyncio.")
+            sys.exit(1)
+        if args.metrics_json or args.stats_interval > 0 or args.metrics_port is not None:
+            print("Error: run metrics are collected per process and are not available with --processes.")
+            sys.exit(1)
+        # Probes, caches and DNS live in the worker processes (see setup_worker);
+        # check their settings here so a typo fails before any work starts
+        try:
+            parse_rates(args.rate_limit)
+            parse_ttls(args.cache_ttl)
+            if args.endpoint_map:
+                endpoints.load_overrides(args.endpoint_map)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        limiter, cache = None, None
+    else:
+        limiter, cache = configure_run(args)
+
+    # Load Data
+    loader = DataLoader(args.input, processes=args.parse_processes, chunk_size=args.chunk_mb << 20)
+    if args.stream:
+        try:
+            fieldnames = loader.read_fieldnames()
+        except Exception as e:
+            print(f"Error reading CSV file: {e}")
+            fieldnames = []
+        rows = loader.iter_rows()
+        total = "?"
+        if not fieldnames:
+            print("No data found or error reading input file.")
+            sys.exit(1)
+    else:
+        rows = loader.load_data()
+        if not rows:
+            print("No data found or error reading input file.")
+            sys.exit(1)
+        fieldnames = list(rows[0].keys())
+        total = len(rows)
+
+    if shard_spec:
+        index, count = shard_spec
+        rows = shard.select(rows, index, count, fieldnames)
+        if args.stream:
+            print(f"Shard {index}/{count}: processing this shard's rows only.")
+        else:
+            rows = list(rows)
+            print(f"Shard {index}/{count}: {len(rows)} of {total} rows.")
+            total = len(rows)
+
+    previous = None
+    if args.incremental_from:
+        try:
+            previous = incremental.PreviousReport(args.incremental_from, max_age)
+        except (OSError, ValueError) as e:
+            print(f"Error reading previous output: {e}")
+            sys.exit(1)
+        print(f"Incremental: {len(previous)} findings indexed from {args.incremental_from}.")
+
+    if args.plan:
+        # The result cache is read to leave out rows it already answers; nothing is written
+        cached = (lambda verifier, row: cache.contains(cache.key_for(verifier, row))) if cache else None
+        plan = planner.RunPlan(DISPATCH_INDEX, cached, previous.carry if previous else None)
+        for row in rows:
+            plan.add(row)
+        print_plan(plan, args, processes)
+        print_load_summary(DISPATCH_INDEX)
+        if cache:
+            cache.close()
+        if previous:
+            previous.close()
+        return
+
+    # Checkpointing: the journal lists every row already flushed to the output
+    checkpoint_file = journal_path(args.output)
+    completed, resume_offset, journal_bytes = Counter(), 0, 0
+    if args.resume:
+        if os.path.exists(args.output):
+            completed, resume_offset, journal_bytes = load_journal(checkpoint_file, os.path.getsize(args.output))
+        done = sum(completed.values())
+        if done:
+            print(f"Resuming: {done} rows already completed in {args.output}.")
+            rows = skip_completed(rows, completed, fieldnames)
+            if isinstance(total, int):
+                total -= done
+        else:
+            print("No checkpoint found for this output. Starting from the beginning.")
+
+    source = "Streaming IoMs" if args.stream else f"Loaded {total} IoMs"
+    if args.engine == "asyncio":
+        print(f"{source}. Starting verification on the asyncio engine "
+              f"with up to {args.concurrency} rows in flight...")
+    elif processes > 1:
+        print(f"{source}. Starting verification in {processes} processes with {args.threads} threads each...")
+    else:
+        print(f"{source}. Starting verification with {args.threads} threads...")
     
-    # Prepare header
-    fieldnames = list(rows[0].keys())
-    # Add new columns if not present
-    for col in ['Verify_Execution', 'Verify_Exploit', 'Verify_Result']:
-        if col not in fieldnames:
-            fieldnames.append(col)
-            
+    resolver = None
+    if args.pre_resolve and processes == 1:
+        resolver = dns_cache.DNSCache()
+        dns_cache.install(resolver)
+
+    # Prepare header: the input columns, then the result columns
+    fieldnames = RowSchema(fieldnames).output_fieldnames
+
+    # The reorder buffer must at least cover the rows in flight
+    in_flight = args.concurrency if args.engine == "asyncio" else (args.window or args.threads * 4)
+    if processes > 1:
+        in_flight = process_engine.in_flight(processes, args.threads, args.window, args.process_batch)
+    # ... and the rows the look-ahead stages hold before the engine sees them
+    if args.pre_resolve and processes == 1:
+        in_flight += 2 * max(1, args.dns_batch)
+    if args.tcp_batch > 0 and processes == 1:
+        in_flight += args.tcp_batch
+    if args.engine == "asyncio":
+        in_flight += async_engine.read_ahead(args.concurrency)
+
+    # Instrumentation
+    reporter = None
+    metrics_server = None
+    if args.metrics_json or args.stats_interval > 0 or args.metrics_port is not None:
+        run_metrics = metrics.Metrics(workers=args.concurrency if args.engine == "asyncio" else args.threads)
+        metrics.install(run_metrics)
+        if args.stats_interval > 0:
+            reporter = metrics.StatsReporter(run_metrics, args.stats_interval)
+        if args.metrics_port is not None:
+            try:
+                metrics_server = metrics.serve(run_metrics, args.metrics_port)
+            except OSError as e:
+                print(f"Error starting metrics endpoint: {e}")
+                sys.exit(1)
+            print(f"Serving live metrics on http://127.0.0.1:{metrics_server.server_address[1]}/")
+
     # Open output file
+    journal = None
+    output = None
+    succeeded = False
+    worker_totals: Dict[str, Counter] = {}    # Counters sent back by --processes workers
     try:
-        with open(args.output, 'w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            with ThreadPoolExecutor(max_workers=args.threads) as executor:
-                future_to_row = {executor.submit(process_row, row, ALL_VERIFIERS): row for row in rows}
-                
-                completed_count = 0
-                for future in as_completed(future_to_row):
-                    processed_row = future.result()
-                    
-                    # Write immediately
-                    with csv_lock:
-                        writer.writerow(processed_row)
-                        outfile.flush()
-                        
-                    completed_count += 1
-                    if completed_count % 10 == 0:
-                        print(f"Processed {completed_count}/{len(rows)}...")
+        if resume_offset:
+            # Drop anything written after the last checkpoint (partial or unjournaled rows)
+            os.truncate(args.output, resume_offset)
+        journal = CheckpointJournal(checkpoint_file, keep_bytes=journal_bytes if resume_offset else 0,
+                                    fsync=args.fsync)
+        output = ResultWriter(args.output, fieldnames, append=bool(resume_offset), journal=journal,
+                              preserve_order=args.preserve_order,
+                              reorder_limit=max(args.reorder_buffer, in_flight),
+                              flush_rows=args.flush_rows, flush_interval=args.flush_interval)
+        completed_count = 0
+        # Rows finished inline by the scheduler arrive on the asyncio engine's reader thread
+        progress_lock = threading.Lock()
+
+        def write_row(item):
+            nonlocal completed_count
+            seq, processed_row = item
+            # The writer stage renders, writes and checkpoints in batches
+            output.submit(seq, processed_row)
+
+            with progress_lock:
+                completed_count += 1
+                count = completed_count
+            if count % 10 == 0:
+                print(f"Processed {count}/{total}...")
+
+        sequenced = output.sequence(rows)
+        if previous:
+            sequenced = carry_forward(sequenced, previous)
+        if not args.preserve_order:
+            # Rows needing no network access are written as soon as they are read, the
+            # rest reach the engine most urgent first. With --preserve-order every row
+            # goes through the engine, whose admission keeps the reorder buffer bounded.
+            sequenced = scheduler.schedule(
+                sequenced,
+                lambda item: row_urgency(item[1]),
+                lambda item: write_row((item[0], process_row(item[1], DISPATCH_INDEX, cache))),
+                lookahead=args.lookahead
+            )
+        if resolver:
+            sequenced = dns_cache.resolve_ahead(sequenced, lambda item: probe_hosts_for(item[1]), resolver,
+                                                batch_size=max(1, args.dns_batch))
+        # Batch prefetching bypasses the rate limiter, so it only runs unthrottled
+        if args.tcp_batch > 0 and limiter is None and processes == 1:
+            sequenced = probes.tcp_ahead(sequenced, lambda item: tcp_targets_for(item[1], cache),
+                                         batch_size=args.tcp_batch)
+
+        # Each row carries the time it was read, to measure how long it waits for a worker
+        items = ((seq, row, time.perf_counter()) for seq, row in sequenced)
+        if args.engine == "asyncio":
+            async def process_item(item):
+                seq, row, pulled = item
+                return seq, await process_row_async(row, DISPATCH_INDEX, cache, pulled)
+
+            async_engine.run(
+                items,
+                process_item,
+                write_row,
+                concurrency=args.concurrency,
+                threads=args.threads,
+                admit=output.admit
+            )
+        elif processes > 1:
+            process_engine.run(
+                sequenced,
+                write_row,
+                setup_worker,
+                args,
+                processes=processes,
+                threads=args.threads,
+                window=args.window,
+                batch_rows=args.process_batch,
+                admit=output.admit,
+                on_stats=lambda stats: merge_worker_stats(worker_totals, stats)
+            )
+        else:
+            thread_engine.run(
+                items,
+                lambda item: (item[0], process_row(item[1], DISPATCH_INDEX, cache, item[2])),
+                write_row,
+                threads=args.threads,
+                window=args.window,
+                admit=output.admit
+            )
+        output.close()
+        output = None
 
     except Exception as e:
         print(f"Error executing verification: {e}")
         sys.exit(1)
+    else:
+        succeeded = True
+    finally:
+        if output:
+            try:
+                output.close()
+            except Exception as e:
+                print(f"Error writing output: {e}")
+        if journal:
+            # A finished run needs no checkpoint; keep it if we are about to exit early
+            journal.close(remove=succeeded)
+        sessions.pool.close()
+        if cache:
+            evicted = cache.close()
+        if previous:
+            previous.close()
+        if reporter:
+            reporter.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        if args.metrics_json and metrics.active:
+            try:
+                metrics.write_report(metrics.active, args.metrics_json)
+            except OSError as e:
+                print(f"Error writing metrics report: {e}")
 
     print("Verification complete.")
+    print_parse_summary(loader)
+    print_routing_summary(DISPATCH_INDEX, worker_totals.get("routing"))
+    print_load_summary(DISPATCH_INDEX)
+    print_probe_summary(worker_totals.get("probes"))
+    print_connection_summary(worker_totals.get("connections"))
+    if processes > 1:
+        # Rate-limit windows and breakers are per worker process; only the counters above add up
+        if args.adaptive or args.rate_limit or args.adaptive_timeouts or args.circuit_breaker > 0:
+            print("Rate limiting and endpoint health are tracked per worker process and not summarized.")
+    else:
+        print_throttle_summary()
+        print_health_summary()
+    if previous:
+        print_incremental_summary(previous)
+    dns_stats = worker_totals.get("dns") or (dns_cache.active.stats() if dns_cache.active else None)
+    if dns_stats:
+        print(f"DNS pre-resolution: {dns_stats['resolved']} resolved, {dns_stats['negative']} non-existent, "
+              f"{dns_stats['failed']} inconclusive.")
+    if cache:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses, {cache.stored} stored, {evicted} evicted.")
+    elif "cache" in worker_totals:
+        totals = worker_totals["cache"]
+        print(f"Result cache: {totals['hits']} hits, {totals['misses']} misses, {totals['stored']} stored, "
+              f"{totals['evicted']} evicted.")
 
 if __name__ == "__main__":
     main()
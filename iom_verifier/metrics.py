@@ -0,0 +1,266 @@
+import bisect
+import json
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Run instrumentation. When enabled, every row records its verifier,
+# outcome, processing time and how long it waited for a worker, and every
+# network probe records the time spent in each phase:
+#
+#   queue    waiting for a rate-limiter slot or a free connect slot
+#   dns      resolving the target hostname
+#   connect  TCP handshake
+#   tls      TLS handshake
+#   ttfb     request sent until the response headers arrived
+#
+# Phases are filed under the destination family (s3, gcs, tcp, ...).
+# Connection code does not know which family it is serving, so probes set
+# `probe_family` before each request; it is a ContextVar, so threads and
+# asyncio tasks each see their own.
+
+PHASES = ("queue", "dns", "connect", "tls", "ttfb")
+
+# Latency buckets: 0.1 ms to ~100 s, 25% apart, so percentiles read from
+# the buckets are within 25% of the true value.
+BUCKET_BOUNDS = [0.0001 * 1.25 ** i for i in range(63)]
+
+probe_family: ContextVar[str] = ContextVar("probe_family", default="http")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Upper bound of the bucket holding the given fraction of samples,
+        capped at the largest sample seen.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p90_ms": round(self.percentile(0.90) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.rows: Counter = Counter()             # (verifier, outcome) -> rows
+        self.row_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.row_queue = Histogram()
+        self.probes: Counter = Counter()           # (family, outcome) -> probes
+        self.phases: Dict[Tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+        self._busy = 0.0             # Integral of in_flight over time, in worker-seconds
+        self._busy_since = self.started
+
+    def _histogram(self, table: Dict[Tuple[str, str], Histogram], key: Tuple[str, str]) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    # Recording
+
+    def _note_busy(self):
+        now = time.monotonic()
+        self._busy += self.in_flight * (now - self._busy_since)
+        self._busy_since = now
+
+    def row_started(self, waited: Optional[float]):
+        with self._lock:
+            self._note_busy()
+            self.in_flight += 1
+            if waited is not None:
+                self.row_queue.observe(waited)
+
+    def row_finished(self, verifier: str, outcome: str, seconds: float):
+        with self._lock:
+            self._note_busy()
+            self.in_flight -= 1
+            self.rows[verifier, outcome] += 1
+            self._histogram(self.row_latency, (verifier, outcome)).observe(seconds)
+
+    def phase(self, family: str, name: str, seconds: float):
+        with self._lock:
+            self._histogram(self.phases, (family, name)).observe(seconds)
+
+    def probe(self, family: str, outcome: str, seconds: float):
+        with self._lock:
+            self.probes[family, outcome] += 1
+            self._histogram(self.phases, (family, "total")).observe(seconds)
+
+    # Reporting
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            self._note_busy()
+            elapsed = self._busy_since - self.started
+            done = sum(self.rows.values())
+            verifiers: Dict[str, Any] = {}
+            for (verifier, outcome), count in sorted(self.rows.items()):
+                entry = verifiers.setdefault(verifier, {"rows": 0, "outcomes": {}})
+                entry["rows"] += count
+                entry["outcomes"][outcome] = dict(self.row_latency[verifier, outcome].snapshot(), rows=count)
+            families: Dict[str, Any] = {}
+            for (family, outcome), count in sorted(self.probes.items()):
+                families.setdefault(family, {"outcomes": {}, "phases": {}})["outcomes"][outcome] = count
+            for (family, name), histogram in sorted(self.phases.items()):
+                families.setdefault(family, {"outcomes": {}, "phases": {}})["phases"][name] = histogram.snapshot()
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "rows": done,
+                "rows_per_second": round(done / elapsed, 3) if elapsed else 0.0,
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                # Average share of workers busy with a row; near 1.0 means the run is worker-bound
+                "worker_utilization": round(self._busy / (elapsed * self.workers), 3) if elapsed else 0.0,
+                "row_queue": self.row_queue.snapshot(),
+                "verifiers": verifiers,
+                "probes": families,
+            }
+
+    def stats_line(self, previous: Optional[Tuple[float, int]] = None) -> Tuple[str, Tuple[float, int]]:
+        """
+        One-line progress summary, plus the state to pass in next time so
+        the rate covers only the interval since the last line.
+        """
+        report = self.report()
+        now, done = report["elapsed_seconds"], report["rows"]
+        since, before = previous or (0.0, 0)
+        rate = (done - before) / (now - since) if now > since else 0.0
+        phases = {}
+        timeouts = 0
+        for family in report["probes"].values():
+            timeouts += family["outcomes"].get("timeout", 0)
+            for name in PHASES:
+                snapshot = family["phases"].get(name)
+                if snapshot and snapshot["p50_ms"] > phases.get(name, -1):
+                    phases[name] = snapshot["p50_ms"]
+        phase_text = " ".join(f"{name} {phases[name]:.0f}" for name in PHASES if name in phases)
+        line = (f"[stats] {now:.0f}s: {done} rows ({rate:.1f}/s), {report['in_flight']}/{report['workers']} in flight, "
+                f"utilization {report['worker_utilization']:.0%}, row wait p50 {report['row_queue']['p50_ms']:.0f}ms, "
+                f"probe timeouts {timeouts}")
+        if phase_text:
+            line += f", slowest-family p50 ms: {phase_text}"
+        return line, (now, done)
+
+
+active: Optional[Metrics] = None
+
+
+def install(metrics: Optional[Metrics]):
+    global active
+    active = metrics
+
+
+# Cheap no-op wrappers for call sites, so instrumentation costs nothing when disabled
+
+def phase(name: str, started: float, family: Optional[str] = None):
+    """
+    Records the time since `started` (a perf_counter value) as a probe phase.
+    """
+    if active is not None:
+        active.phase(family or probe_family.get(), name, time.perf_counter() - started)
+
+
+def probe(outcome: str, started: float, family: Optional[str] = None):
+    if active is not None:
+        active.probe(family or probe_family.get(), outcome, time.perf_counter() - started)
+
+
+def row_started(pulled: Optional[float] = None) -> float:
+    started = time.perf_counter()
+    if active is not None:
+        active.row_started(None if pulled is None else started - pulled)
+    return started
+
+
+def row_finished(verifier: str, outcome: str, started: float):
+    if active is not None:
+        active.row_finished(verifier, outcome, time.perf_counter() - started)
+
+
+class StatsReporter:
+    """
+    Prints a stats line every `interval` seconds from a daemon thread.
+    """
+
+    def __init__(self, metrics: Metrics, interval: float, emit: Callable[[str], None] = print):
+        self.metrics = metrics
+        self.interval = interval
+        self.emit = emit
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stats-reporter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        previous = None
+        while not self._stop.wait(self.interval):
+            line, previous = self.metrics.stats_line(previous)
+            self.emit(line)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def serve(metrics: Metrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serves the live report as JSON on every GET path, from a daemon thread.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(metrics.report(), indent=2).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the progress output clean
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_report(metrics: Metrics, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics.report(), f, indent=2)
@@ -0,0 +1,133 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from . import endpoints
+from .verifiers.registry import UNMATCHED, DispatchIndex
+
+# Dry-run planning (--plan).
+#
+# Routes every row and extracts its probe target exactly as a run would,
+# without any network I/O, and adds up what the run would have to do:
+# distinct targets per verifier and probe type (duplicates are probed once,
+# see probes.SingleFlight), rows finished without a probe, and rules no
+# verifier claims. estimate() turns the distinct targets into a wall time
+# for a given concurrency.
+
+# Requests a single target of each probe kind can take at most: an S3
+# bucket is tried on its global and its regional endpoint
+REQUESTS_PER_TARGET = {"s3": 2}
+
+
+def target_family(target: Tuple) -> str:
+    """
+    Endpoint family (see endpoints.py) a probe target is throttled and timed out under.
+    """
+    if target[0] == "tcp":
+        return endpoints.TCP
+    if target[0] == "s3":
+        return endpoints.S3
+    return endpoints.url_destination(target[1])[0]
+
+
+class RunPlan:
+    def __init__(self, index: DispatchIndex, cached: Optional[Callable[[Any, Dict[str, Any]], bool]] = None,
+                 carried: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        """
+        `cached(verifier, row)` tells whether the result cache already holds
+        the row's result, and `carried(row)` whether it is carried forward
+        from a previous report (--incremental-from); neither needs a probe.
+        """
+        self.index = index
+        self.cached = cached
+        self.carried = carried
+        self.rows = 0
+        self.verifier_rows = Counter()
+        self.probing_rows = Counter()              # per probe kind
+        self.targets: Dict[str, Set[Tuple]] = {}   # per probe kind
+        self.verifier_targets: Dict[str, Set[Tuple]] = {}
+        self.family_targets = Counter()
+        self.no_probe = Counter()                  # rows finished without probing, by reason
+        self.unroutable = Counter()                # raw Rule Name -> rows
+
+    def add(self, row: Dict[str, Any]):
+        self.rows += 1
+        if self.carried and self.carried(row):
+            self.no_probe["carried forward"] += 1
+            return
+        verifier, plan = self.index.plan(row)
+        if verifier is None:
+            self.verifier_rows[UNMATCHED] += 1
+            self.no_probe["unroutable"] += 1
+            self.unroutable[row.get('Rule Name') or row.get('Violation Type') or "(no rule name)"] += 1
+            return
+        name = type(verifier).__name__
+        self.verifier_rows[name] += 1
+        if not plan.probe_kind:
+            self.no_probe["manual"] += 1
+            return
+        if plan.skip:
+            self.no_probe["skipped by rule"] += 1
+            return
+        target = verifier.probe_target(row)
+        if target is None:
+            self.no_probe["no target"] += 1
+            return
+        if self.cached and self.cached(verifier, row):
+            self.no_probe["cached"] += 1
+            return
+        kind = target[0]
+        self.probing_rows[kind] += 1
+        distinct = self.targets.setdefault(kind, set())
+        if target not in distinct:
+            distinct.add(target)
+            self.family_targets[target_family(target)] += 1
+        self.verifier_targets.setdefault(name, set()).add(target)
+
+    def distinct_targets(self) -> int:
+        return sum(len(targets) for targets in self.targets.values())
+
+    def duplicate_ratio(self) -> float:
+        """
+        Share of probing rows whose target an earlier row already has.
+        """
+        probing = sum(self.probing_rows.values())
+        return 1 - self.distinct_targets() / probing if probing else 0.0
+
+    def estimate(self, slots: int, timeout: Callable[[str], float], latency: float,
+                 rates: Optional[Dict[str, float]] = None, tcp_slots: int = 0) -> Tuple[float, float]:
+        """
+        Seconds the probes would take with `slots` running at once: if each
+        answers after `latency` seconds, and if each runs to `timeout(family)`.
+        TCP probes get max(slots, tcp_slots) (the batched connect engine).
+        With `rates` (requests/second per family) a family cannot finish
+        faster than its requests at that rate, and no run is shorter than
+        its slowest single probe.
+        """
+        from .verifiers.s3 import HEDGE_DELAY
+        busy_expected = {"tcp": 0.0, "other": 0.0}
+        busy_worst = {"tcp": 0.0, "other": 0.0}
+        requests = Counter()
+        longest_expected = longest_worst = 0.0
+        for kind, targets in self.targets.items():
+            pool = "tcp" if kind == "tcp" else "other"
+            for target in targets:
+                family = target_family(target)
+                per_target = REQUESTS_PER_TARGET.get(kind, 1)
+                requests[family] += per_target
+                # Hedged endpoints start HEDGE_DELAY apart and the last one may run to its timeout
+                worst = (per_target - 1) * HEDGE_DELAY + timeout(family)
+                busy_expected[pool] += latency
+                busy_worst[pool] += worst
+                longest_expected = max(longest_expected, latency)
+                longest_worst = max(longest_worst, worst)
+
+        tcp_slots = max(slots, tcp_slots)
+        floor_expected, floor_worst = longest_expected, longest_worst
+        for family, count in requests.items():
+            rate = (rates or {}).get(family)
+            if rate:
+                floor_expected = max(floor_expected, count / rate)
+                floor_worst = max(floor_worst, count / rate)
+        expected = max(busy_expected["tcp"] / tcp_slots + busy_expected["other"] / slots, floor_expected)
+        worst = max(busy_worst["tcp"] / tcp_slots + busy_worst["other"] / slots, floor_worst)
+        return expected, worst
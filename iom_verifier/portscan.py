@@ -0,0 +1,232 @@
+import errno
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from . import dns_cache, endpoints, metrics
+
+# Event-driven batch TCP connect engine.
+#
+# Probes are non-blocking sockets multiplexed by one selector thread
+# (epoll/kqueue where available), so thousands of SYNs can be in flight
+# without a thread each. Every probe has its own deadline; a filtered port
+# costs its timeout in wall time but no worker time.
+
+DEFAULT_MAX_IN_FLIGHT = 2000
+RESOLVER_THREADS = 16
+
+# connect() on a non-blocking socket reports "in progress" differently per platform
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", 10035)}
+
+
+class _Probe:
+    __slots__ = ("address", "port", "timeout", "future", "sock", "deadline", "since")
+
+    def __init__(self, address: str, port: int, timeout: float, future: Future):
+        self.address = address
+        self.port = port
+        self.timeout = timeout
+        self.future = future
+        self.sock = None
+        self.deadline = 0.0
+        self.since = 0.0  # When the probe entered its current phase (queue, connect)
+
+
+class BatchConnector:
+    """
+    Runs TCP connect probes on a background selector loop. submit() returns
+    a Future resolving to 0 when the port accepted the connection, otherwise
+    the socket error (ETIMEDOUT when the deadline passed first), matching
+    what connect_ex reports.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.max_in_flight = max(1, max_in_flight)
+        self._selector = selectors.DefaultSelector()
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._deadlines = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._closed = False
+        self._resolver = ThreadPoolExecutor(max_workers=RESOLVER_THREADS)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._loop, name="tcp-connect-loop", daemon=True)
+        self._thread.start()
+
+    # Submission
+
+    def submit(self, host: str, port: int, timeout: float) -> Future:
+        future = Future()
+        address = host if dns_cache.is_ip(host) else dns_cache.cached_address(host, ipv4=True)
+        if address:
+            self._enqueue(_Probe(address, port, timeout, future))
+        else:
+            # Resolve off the caller's thread so a batch submit never blocks on DNS
+            self._resolver.submit(self._resolve_and_enqueue, host, port, timeout, future)
+        return future
+
+    def scan(self, targets: Iterable[Tuple[str, int]], timeout: float) -> Dict[Tuple[str, int], Union[int, Exception]]:
+        """
+        Probes every (host, port) and returns the outcomes in bulk: the
+        connect result, or the exception raised while resolving the host.
+        """
+        futures = {target: self.submit(target[0], target[1], timeout) for target in set(targets)}
+        results = {}
+        for target, future in futures.items():
+            try:
+                results[target] = future.result()
+            except Exception as e:
+                results[target] = e
+        return results
+
+    def _resolve_and_enqueue(self, host: str, port: int, timeout: float, future: Future):
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)
+        except OSError as e:
+            future.set_exception(e)
+            return
+        finally:
+            metrics.phase("dns", started, endpoints.TCP)
+        self._enqueue(_Probe(infos[0][4][0], port, timeout, future))
+
+    def _enqueue(self, probe: _Probe):
+        probe.since = time.perf_counter()
+        with self._lock:
+            if self._closed:
+                probe.future.set_exception(RuntimeError("Connector is closed"))
+                return
+            self._queue.append(probe)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Already has a pending wake-up
+
+    # Event loop
+
+    def _start_queued(self):
+        while self._active < self.max_in_flight:
+            with self._lock:
+                if not self._queue:
+                    return
+                probe = self._queue.popleft()
+            self._start(probe)
+
+    def _start(self, probe: _Probe):
+        metrics.phase("queue", probe.since, endpoints.TCP)
+        probe.since = time.perf_counter()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except OSError as e:
+            probe.future.set_exception(e)
+            return
+        sock.setblocking(False)
+        try:
+            code = sock.connect_ex((probe.address, probe.port))
+        except OSError as e:
+            sock.close()
+            probe.future.set_exception(e)
+            return
+
+        if code not in _IN_PROGRESS:
+            sock.close()
+            metrics.phase("connect", probe.since, endpoints.TCP)
+            probe.future.set_result(code)
+            return
+
+        probe.sock = sock
+        probe.deadline = time.monotonic() + probe.timeout
+        self._selector.register(sock, selectors.EVENT_WRITE, probe)
+        heapq.heappush(self._deadlines, (probe.deadline, next(self._seq), probe))
+        self._active += 1
+
+    def _finish(self, probe: _Probe, code: int):
+        self._selector.unregister(probe.sock)
+        probe.sock.close()
+        probe.sock = None
+        self._active -= 1
+        metrics.phase("connect", probe.since, endpoints.TCP)
+        probe.future.set_result(code)
+
+    def _expire(self, now: float):
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, probe = heapq.heappop(self._deadlines)
+            if probe.sock is not None:
+                self._finish(probe, errno.ETIMEDOUT)
+
+    def _next_timeout(self) -> Optional[float]:
+        # Drop deadlines of probes that already finished
+        while self._deadlines and self._deadlines[0][2].sock is None:
+            heapq.heappop(self._deadlines)
+        if not self._deadlines:
+            return None
+        return max(0.0, self._deadlines[0][0] - time.monotonic())
+
+    def _loop(self):
+        while True:
+            self._start_queued()
+            with self._lock:
+                if self._closed and not self._active and not self._queue:
+                    break
+            for key, _ in self._selector.select(self._next_timeout()):
+                probe = key.data
+                if probe is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                code = probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                self._finish(probe, code)
+            self._expire(time.monotonic())
+
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def close(self):
+        """
+        Stops accepting probes; the loop exits once in-flight probes finish.
+        """
+        with self._lock:
+            self._closed = True
+        self._resolver.shutdown(wait=False)
+        self._wake()
+
+
+_connector: Optional[BatchConnector] = None
+_connector_lock = threading.Lock()
+
+
+def connector() -> BatchConnector:
+    """
+    The process-wide connector, started on first use.
+    """
+    global _connector
+    if _connector is None:
+        with _connector_lock:
+            if _connector is None:
+                _connector = BatchConnector()
+    return _connector
+
+
+def configure(max_in_flight: int):
+    global _connector
+    with _connector_lock:
+        if _connector is not None:
+            _connector.close()
+        _connector = BatchConnector(max_in_flight)
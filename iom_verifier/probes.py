@@ -0,0 +1,389 @@
+import asyncio
+import errno
+import socket
+import ssl
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar
+
+from . import async_http, endpoints, metrics, portscan, sessions
+from .health import NullHealth
+from .ratelimit import NullLimiter
+from .singleflight import SingleFlight
+
+# Every network call a verifier makes goes through this module, in a
+# blocking form for the thread engine and a coroutine form for the asyncio engine.
+
+HTTP_TIMEOUT = 5
+TCP_TIMEOUT = 3.0
+
+# Identical probes from different rows (same bucket flagged by several rules,
+# same host:port on many findings) share one network round trip.
+flight = SingleFlight()
+
+# Per-destination throttling, see ratelimit.py. Disabled unless configured.
+limiter = NullLimiter()
+
+# Adaptive timeouts and circuit breakers, see health.py. Disabled unless configured.
+health = NullHealth()
+
+# Statuses meaning "slow down" (S3 SlowDown, GCS/Azure throttling). When a
+# limiter is active these shrink the destination's window and are retried.
+THROTTLE_STATUSES = (429, 503)
+MAX_THROTTLE_RETRIES = 2
+MAX_RETRY_AFTER = 10.0
+
+DEFAULT_TCP_BATCH = portscan.DEFAULT_MAX_IN_FLIGHT
+
+# Responses are streamed. Probes read the status line and headers; the body
+# only when a verifier asks for it (read_body=True, e.g. for listing
+# evidence), and then only its first `body_limit` bytes. Unwanted bodies up
+# to DRAIN_BYTES are read to the end so the keep-alive connection can be
+# reused; longer ones are never downloaded, their connection is closed.
+DEFAULT_BODY_LIMIT = 16384
+DRAIN_BYTES = 65536
+BODY_CHUNK = 8192
+body_limit = DEFAULT_BODY_LIMIT
+
+# How connect_ex codes are counted in the metrics
+TCP_OUTCOMES = {0: "open", errno.ECONNREFUSED: "closed", errno.ETIMEDOUT: "timeout"}
+# connect_ex codes that mean the path to a host is broken. A timeout is not
+# one of them: it is how a filtered port answers, so it only counts toward
+# the host's group breaker (see health.py).
+TCP_PATH_FAILURES = {errno.ENETUNREACH, errno.EHOSTUNREACH, errno.ENETDOWN, errno.EHOSTDOWN, errno.ECONNRESET}
+
+T = TypeVar("T")
+
+
+@dataclass
+class ProbeResponse:
+    status_code: int
+    headers: Mapping[str, str]
+    url: str
+    body: bytes = b""            # The start of the body, if it was asked for
+    body_complete: bool = False  # `body` is the whole body
+
+
+class ProbeError(Exception):
+    """
+    Transport-level failure (DNS, connect, TLS, timeout) while probing a target.
+    """
+    pass
+
+
+class CircuitOpenError(ProbeError):
+    """
+    The probe was not sent because its destination's circuit breaker is open.
+    """
+    pass
+
+
+def configure(remember: Optional[int] = None, rate_limiter=None, health_monitor=None,
+              max_body: Optional[int] = None):
+    """
+    Adjusts how many completed probe results are remembered for reuse within
+    a run, installs a rate limiter and a health monitor, and caps the bytes
+    of a response body that are read.
+    """
+    global limiter, health, body_limit
+    if max_body is not None:
+        body_limit = max(0, max_body)
+    if remember is not None:
+        flight.remember = remember
+    if rate_limiter is not None:
+        limiter = rate_limiter
+    if health_monitor is not None:
+        health = health_monitor
+
+
+def default_timeout(family: str) -> float:
+    return TCP_TIMEOUT if family == endpoints.TCP else HTTP_TIMEOUT
+
+
+def probe_stats() -> Dict[str, int]:
+    return flight.stats()
+
+
+def http_get(url: str, timeout: float = HTTP_TIMEOUT, read_body: bool = False) -> ProbeResponse:
+    """
+    GET following redirects. The response carries the first `body_limit`
+    bytes of a 2xx body with read_body, otherwise no body.
+    """
+    limit = body_limit if read_body else 0
+    return flight.do(("http-get", url, limit), lambda: _http_request("GET", url, timeout, limit))
+
+
+async def http_get_async(url: str, timeout: float = HTTP_TIMEOUT, read_body: bool = False) -> ProbeResponse:
+    limit = body_limit if read_body else 0
+    return await flight.do_async(("http-get", url, limit), lambda: _http_request_async("GET", url, timeout, limit))
+
+
+def http_head(url: str, timeout: float = HTTP_TIMEOUT) -> ProbeResponse:
+    """
+    HEAD request without following redirects: the status and headers of
+    the URL itself, no body.
+    """
+    return flight.do(("http-head", url), lambda: _http_request("HEAD", url, timeout))
+
+
+async def http_head_async(url: str, timeout: float = HTTP_TIMEOUT) -> ProbeResponse:
+    return await flight.do_async(("http-head", url), lambda: _http_request_async("HEAD", url, timeout))
+
+
+def tcp_connect(host: str, port: int, timeout: float = TCP_TIMEOUT) -> int:
+    """
+    Attempts a TCP connection. Returns 0 when the port accepted the
+    connection, otherwise the errno reported by connect_ex.
+    """
+    return flight.do(("tcp", host.lower(), port), lambda: _tcp_connect(host, port, timeout))
+
+
+async def tcp_connect_async(host: str, port: int, timeout: float = TCP_TIMEOUT) -> int:
+    return await flight.do_async(("tcp", host.lower(), port), lambda: _tcp_connect_async(host, port, timeout))
+
+
+def _is_reset(exc: BaseException) -> bool:
+    """
+    True if a transport error was a connection reset, which we treat as push-back.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, ConnectionResetError) or "connection reset" in str(exc).lower():
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _is_connection_failure(exc: BaseException) -> bool:
+    """
+    True if a transport error means the network path failed (timeout,
+    refused, reset, unreachable). DNS and TLS errors are about the target
+    itself and do not count.
+    """
+    seen = set()
+    failure = False
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (socket.gaierror, ssl.SSLError)) or type(exc).__name__ in ("NameResolutionError", "SSLError"):
+            return False
+        # requests' Timeout and ConnectionError are OSErrors too
+        if isinstance(exc, (asyncio.TimeoutError, OSError)):
+            failure = True
+        cause = exc.__cause__ or exc.__context__
+        # urllib3's MaxRetryError keeps the underlying error in .reason
+        if cause is None and isinstance(getattr(exc, "reason", None), BaseException):
+            cause = exc.reason
+        exc = cause
+    return failure
+
+
+def _retry_delay(headers: Mapping[str, str], attempt: int) -> float:
+    try:
+        return min(float(headers.get('retry-after', '')), MAX_RETRY_AFTER)
+    except ValueError:
+        return min(0.5 * 2 ** attempt, MAX_RETRY_AFTER)
+
+
+def _read_body(response, limit: int, head: bool = False) -> Tuple[bytes, bool]:
+    """
+    Reads up to `limit` bytes of a streamed requests response and releases
+    it. Returns (body, whether that is the whole body).
+    """
+    try:
+        # The Content-Length of a HEAD response describes a body that is not sent
+        length = 0 if head else int(response.headers.get('content-length', ''))
+    except ValueError:
+        length = None
+    budget = max(limit, DRAIN_BYTES)
+    if length is not None and length > budget:
+        budget = limit  # Too long to drain: read what is wanted and drop the connection
+    parts, size, complete = [], 0, False
+    try:
+        # Even an empty body is iterated: reaching its end is what releases the connection
+        if budget:
+            for chunk in response.iter_content(BODY_CHUNK):
+                parts.append(chunk)
+                size += len(chunk)
+                if size >= budget:
+                    break
+            else:
+                complete = True
+        complete = complete or (length is not None and size >= length)
+    finally:
+        # A response read to the end goes back to the pool, anything else closes its connection
+        response.close()
+    return b"".join(parts)[:limit], complete and size <= limit
+
+
+def _http_request(method: str, url: str, timeout: float, max_body: int = 0) -> ProbeResponse:
+    import requests  # Loaded by the first blocking HTTP probe, see sessions.py
+    family, host = endpoints.url_destination(url)
+    metrics.probe_family.set(family)
+    blocked = health.check(family, host)
+    if blocked:
+        raise CircuitOpenError(f"Request to {url} skipped: {blocked}")
+    timeout = health.timeout(family, timeout)
+    send = sessions.head if method == "HEAD" else sessions.get
+    attempt = 0
+    while True:
+        queued = time.perf_counter()
+        ticket = limiter.acquire(family, host)
+        if limiter.enabled:
+            metrics.phase("queue", queued)
+        started = time.perf_counter()
+        try:
+            response = send(endpoints.rewrite_url(url), timeout=timeout, stream=True)
+            body, complete = _read_body(response, max_body if 200 <= response.status_code < 300 else 0,
+                                        head=method == "HEAD")
+        except requests.RequestException as e:
+            limiter.release(ticket, congested=_is_reset(e))
+            metrics.probe("timeout" if isinstance(e, requests.Timeout) else "error", started)
+            if _is_connection_failure(e):
+                health.failed(family, host)
+            raise ProbeError(str(e)) from e
+
+        metrics.probe(str(response.status_code), started)
+        health.succeeded(family, host, time.perf_counter() - started)
+        throttled = response.status_code in THROTTLE_STATUSES
+        limiter.release(ticket, congested=throttled)
+        if throttled and limiter.enabled and attempt < MAX_THROTTLE_RETRIES:
+            time.sleep(_retry_delay(response.headers, attempt))
+            attempt += 1
+            continue
+        return ProbeResponse(response.status_code, response.headers, response.url, body, complete)
+
+
+async def _http_request_async(method: str, url: str, timeout: float, max_body: int = 0) -> ProbeResponse:
+    family, host = endpoints.url_destination(url)
+    metrics.probe_family.set(family)
+    blocked = health.check(family, host)
+    if blocked:
+        raise CircuitOpenError(f"Request to {url} skipped: {blocked}")
+    timeout = health.timeout(family, timeout)
+    attempt = 0
+    while True:
+        queued = time.perf_counter()
+        ticket = await limiter.acquire_async(family, host)
+        if limiter.enabled:
+            metrics.phase("queue", queued)
+        started = time.perf_counter()
+        try:
+            status, headers, final_url, body, complete = await async_http.request(
+                method, endpoints.rewrite_url(url), timeout, follow_redirects=method != "HEAD", max_body=max_body
+            )
+        except asyncio.TimeoutError as e:
+            limiter.release(ticket)
+            metrics.probe("timeout", started)
+            health.failed(family, host)
+            raise ProbeError(f"Request to {url} timed out after {timeout:g}s") from e
+        except (OSError, async_http.HTTPError) as e:
+            limiter.release(ticket, congested=_is_reset(e))
+            metrics.probe("error", started)
+            if _is_connection_failure(e):
+                health.failed(family, host)
+            raise ProbeError(str(e)) from e
+
+        metrics.probe(str(status), started)
+        health.succeeded(family, host, time.perf_counter() - started)
+        throttled = status in THROTTLE_STATUSES
+        limiter.release(ticket, congested=throttled)
+        if throttled and limiter.enabled and attempt < MAX_THROTTLE_RETRIES:
+            await asyncio.sleep(_retry_delay(headers, attempt))
+            attempt += 1
+            continue
+        return ProbeResponse(status, headers, final_url, body, complete)
+
+
+def _submit_tcp(host: str, port: int, timeout: float) -> Future:
+    """
+    Hands the probe to the batch connector. The returned Future resolves
+    to the connect_ex code, or fails with ProbeError if the host does not resolve.
+    """
+    outcome = Future()
+    blocked = health.check(endpoints.TCP, host)
+    if blocked:
+        outcome.set_exception(CircuitOpenError(f"Connection to {host}:{port} skipped: {blocked}"))
+        return outcome
+    timeout = health.timeout(endpoints.TCP, timeout)
+    started = time.perf_counter()
+
+    def done(connect: Future):
+        try:
+            code = connect.result()
+            metrics.probe(TCP_OUTCOMES.get(code, "error"), started, endpoints.TCP)
+            if code in (0, errno.ECONNREFUSED):
+                health.succeeded(endpoints.TCP, host, time.perf_counter() - started)
+            elif code in TCP_PATH_FAILURES:
+                health.failed(endpoints.TCP, host)
+            elif code == errno.ETIMEDOUT:
+                health.timed_out(endpoints.TCP, host)
+            outcome.set_result(code)
+        except Exception as e:
+            metrics.probe("error", started, endpoints.TCP)
+            error = ProbeError(str(e))
+            error.__cause__ = e
+            outcome.set_exception(error)
+
+    portscan.connector().submit(*endpoints.rewrite_tcp(host, port), timeout).add_done_callback(done)
+    return outcome
+
+
+def _tcp_connect(host: str, port: int, timeout: float) -> int:
+    queued = time.perf_counter()
+    ticket = limiter.acquire(endpoints.TCP, host)
+    if limiter.enabled:
+        metrics.phase("queue", queued, endpoints.TCP)
+    result = None
+    try:
+        result = _submit_tcp(host, port, timeout).result()
+        return result
+    finally:
+        limiter.release(ticket, congested=result == errno.ECONNRESET)
+
+
+async def _tcp_connect_async(host: str, port: int, timeout: float) -> int:
+    queued = time.perf_counter()
+    ticket = await limiter.acquire_async(endpoints.TCP, host)
+    if limiter.enabled:
+        metrics.phase("queue", queued, endpoints.TCP)
+    result = None
+    try:
+        result = await asyncio.wrap_future(_submit_tcp(host, port, timeout))
+        return result
+    finally:
+        limiter.release(ticket, congested=result == errno.ECONNRESET)
+
+
+def prefetch_tcp(targets: Iterable[Tuple[str, int]], timeout: float = TCP_TIMEOUT) -> int:
+    """
+    Starts connect probes for a batch of (host, port) targets at once. Rows
+    probing the same targets later through tcp_connect pick up these
+    outcomes instead of connecting again. Returns how many probes started.
+    """
+    started = 0
+    for (host, port), claims in Counter((host.lower(), port) for host, port in targets).items():
+        if flight.prefetch(("tcp", host, port), lambda: _submit_tcp(host, port, timeout), claims):
+            started += 1
+    return started
+
+
+def tcp_ahead(rows: Iterable[T], targets_for: Callable[[T], List[Tuple[str, int]]],
+              batch_size: int = DEFAULT_TCP_BATCH) -> Iterator[T]:
+    """
+    Passes rows through unchanged, starting the TCP probes of each batch of
+    `batch_size` rows together before any row of that batch is released,
+    so the whole batch's SYNs are in flight while the engine works through it.
+    """
+    batch: List[T] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            prefetch_tcp(target for item in batch for target in targets_for(item))
+            yield from batch
+            batch = []
+    if batch:
+        prefetch_tcp(target for item in batch for target in targets_for(item))
+        yield from batch
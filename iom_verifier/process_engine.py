@@ -0,0 +1,199 @@
+import itertools
+import multiprocessing
+import queue
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import thread_engine
+from .record import Row, RowSchema
+
+# Multi-process execution. Parsing, rule routing, regex extraction and
+# response handling are CPU work that all threads of one process serialize
+# on the GIL, so past a few dozen threads adding more stops helping.
+#
+# Here the main process keeps reading the input and writing the output
+# (the only writer), and ships rows in packed batches (RowSchema.pack) to
+# `processes` worker processes. Each worker runs its own thread pool over
+# the rows it receives and sends back just the result columns, also in
+# batches. Workers share one task queue, so a busy worker simply takes
+# fewer batches. When a worker is done it sends its counters (probes,
+# connections, cache, ...) so the parent can report totals for the run.
+#
+# Worker processes are started with "spawn": the parent already runs
+# threads (connect loop, resolver pools) that a forked child would inherit
+# in a broken state.
+
+DEFAULT_BATCH_ROWS = 256
+RESULT_FLUSH_INTERVAL = 0.2
+POLL_INTERVAL = 1.0
+
+# Builds a worker's row pipeline from the run configuration. Called once in
+# each worker process, it returns (prepare, process, close): `prepare` may
+# wrap the rows of one batch (e.g. pre-resolve their hosts), `process`
+# verifies one row and `close` runs when the worker is done and returns the
+# worker's counters, {section: {name: count}}, to be passed to `on_stats`.
+WorkerStats = Dict[str, Dict[str, int]]
+WorkerSetup = Callable[[Any], Tuple[Callable[[List[Row]], Iterable[Row]], Callable[[Row], Row],
+                                    Callable[[], WorkerStats]]]
+
+
+def _worker(setup: WorkerSetup, config: Any, threads: int, window: Optional[int], batch_rows: int,
+            tasks: multiprocessing.Queue, results: multiprocessing.Queue):
+    prepare, process, close = setup(config)
+    schemas: Dict[Tuple[str, ...], RowSchema] = {}
+    done: List[Tuple[int, List[str]]] = []
+    oldest = 0.0
+
+    def flush():
+        if done:
+            results.put(list(done))
+            done.clear()
+
+    def incoming():
+        while True:
+            try:
+                task = tasks.get_nowait()
+            except queue.Empty:
+                # Hand back what is finished before waiting, or the parent may be waiting on it
+                flush()
+                task = tasks.get()
+            if task is None:
+                return
+            fieldnames, seqs, packed = task
+            schema = schemas.get(fieldnames)
+            if schema is None:
+                schema = schemas[fieldnames] = RowSchema(list(fieldnames))
+            yield from zip(seqs, prepare(schema.unpack(*packed)))
+
+    def collect(item):
+        nonlocal oldest
+        seq, row = item
+        if not done:
+            oldest = time.monotonic()
+        done.append((seq, row.results))
+        if len(done) >= batch_rows or time.monotonic() - oldest >= RESULT_FLUSH_INTERVAL:
+            flush()
+
+    try:
+        thread_engine.run(incoming(), lambda item: (item[0], process(item[1])), collect,
+                          threads=threads, window=window)
+        flush()
+    finally:
+        stats = close()
+    # Sent after the last results; a dict rather than a list of results
+    results.put(stats or {})
+
+
+def _check_workers(workers: List[multiprocessing.Process]):
+    failed = [worker for worker in workers if worker.exitcode not in (None, 0)]
+    if failed:
+        raise RuntimeError(f"Worker process {failed[0].name} exited with code {failed[0].exitcode}")
+
+
+def run(rows: Iterable[Tuple[int, Row]],
+        on_result: Callable[[Tuple[int, Row]], None],
+        setup: WorkerSetup,
+        config: Any,
+        processes: int,
+        threads: int = 5,
+        window: Optional[int] = None,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        admit: Optional[Callable[[], bool]] = None,
+        on_stats: Optional[Callable[[WorkerStats], None]] = None):
+    """
+    Runs (seq, row) pairs through `processes` worker processes of `threads`
+    threads each, calling `on_result` with (seq, row) from the calling
+    thread as results come back. `window` is the per-worker thread engine
+    window; at most in_flight(...) rows are out at once. While `admit`
+    returns False no new rows are sent. Each worker's counters are passed
+    to `on_stats` when it finishes.
+
+    `setup` and `config` must be picklable (a module-level function and
+    plain data), see WorkerSetup.
+    """
+    processes = max(1, processes)
+    batch_rows = max(1, batch_rows)
+    limit = in_flight(processes, threads, window, batch_rows)
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, name=f"verify-worker-{i}", daemon=True,
+                        args=(setup, config, threads, window, batch_rows, tasks, results))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    iterator = iter(rows)
+    pending: Dict[int, Row] = {}
+    exhausted = False
+    reported = 0
+
+    def worker_done(stats: WorkerStats):
+        nonlocal reported
+        reported += 1
+        if on_stats:
+            on_stats(stats)
+
+    try:
+        while True:
+            while not exhausted and len(pending) < limit and (admit is None or admit() or not pending):
+                batch = list(itertools.islice(iterator, batch_rows))
+                if not batch:
+                    exhausted = True
+                    for _ in workers:
+                        tasks.put(None)
+                    break
+                # Rows that already have their results (carried forward) need no worker
+                for item in [item for item in batch if item[1].results is not None]:
+                    on_result(item)
+                batch = [item for item in batch if item[1].results is None]
+                if not batch:
+                    continue
+                schema = batch[0][1].schema
+                for seq, row in batch:
+                    pending[seq] = row
+                packed = schema.pack([row for _, row in batch])
+                tasks.put((tuple(schema.fieldnames), [seq for seq, _ in batch], packed))
+
+            if not pending:
+                break
+
+            try:
+                done = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                _check_workers(workers)
+                continue
+            if isinstance(done, dict):
+                worker_done(done)
+                continue
+            for seq, result in done:
+                row = pending.pop(seq)
+                row.results = result
+                on_result((seq, row))
+
+        while reported < len(workers):
+            try:
+                worker_done(results.get(timeout=POLL_INTERVAL))
+            except queue.Empty:
+                _check_workers(workers)
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        # Batches nobody will read must not keep this process from exiting
+        tasks.cancel_join_thread()
+        tasks.close()
+        results.close()
+
+
+def in_flight(processes: int, threads: int, window: Optional[int], batch_rows: int = DEFAULT_BATCH_ROWS) -> int:
+    """
+    Rows sent to workers but not yet returned, at most: a full thread
+    engine window per worker plus two batches queued for each.
+    """
+    per_worker = max(window or threads * 4, threads, 1) + 2 * max(1, batch_rows)
+    return max(1, processes) * per_worker
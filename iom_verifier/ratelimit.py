@@ -0,0 +1,226 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Per-destination throttling for outbound probes.
+#
+# Every probe takes a slot from two destinations: its endpoint family
+# (s3, gcs, azure-blob, http, tcp) and its target, the host or, on a shared
+# path-style provider host, the bucket (see endpoints.url_destination).
+# Each destination has an optional token bucket (a hard requests/second
+# ceiling) and an AIMD concurrency window: the window grows by roughly one
+# slot per window's worth of successes while latency stays near the best
+# seen, and is halved when the destination pushes back (429/503, connection
+# resets), at most once per round trip: only requests sent after the last
+# halving can trigger the next one.
+#
+# Callers waiting on a full window are woken when a slot is released.
+
+DEFAULT_FAMILY_RATES = {"s3": 100.0, "gcs": 100.0, "azure-blob": 100.0, "http": 50.0, "tcp": 500.0}
+DEFAULT_HOST_RATE = 20.0
+INITIAL_WINDOW = 8.0
+MIN_WINDOW = 1.0
+# Latency counts as "flat" while the smoothed latency stays under this multiple of the best observed
+LATENCY_TOLERANCE = 2.0
+# Longest a waiter sleeps without being woken before it checks again
+MAX_WAIT = 1.0
+MAX_IDLE_HOSTS = 10000
+
+
+def parse_rates(spec: Optional[str]):
+    """
+    Parses a --rate-limit value like 's3=200,tcp=1000,host=10' into
+    (family rates, per-host rate). Unspecified entries keep their defaults.
+    """
+    rates = dict(DEFAULT_FAMILY_RATES)
+    host_rate = DEFAULT_HOST_RATE
+    if not spec:
+        return rates, host_rate
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        if '=' not in item:
+            raise ValueError(f"Invalid rate limit '{item}', expected NAME=REQUESTS_PER_SECOND")
+        name, value = item.split('=', 1)
+        name = name.strip().lower()
+        if name == "host":
+            host_rate = float(value)
+        else:
+            rates[name] = float(value)
+    return rates, host_rate
+
+
+class Destination:
+    def __init__(self, rate: float, max_window: float):
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = time.monotonic()
+        self.window = min(INITIAL_WINDOW, max_window)
+        self.max_window = max_window
+        self.in_flight = 0
+        self.best_latency = None
+        self.avg_latency = None
+        self.backoffs = 0
+        self.backed_off = float("-inf")   # When the window was last halved
+        self.last_used = self.updated
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until a request may start, 0 if it may start now, infinite
+        if it has to wait for a slot to be released.
+        """
+        self._refill(now)
+        if self.in_flight >= self.window:
+            return math.inf
+        if self.rate > 0 and self.tokens < 1.0:
+            return (1.0 - self.tokens) / self.rate
+        return 0.0
+
+    def take(self, now: float):
+        if self.rate > 0:
+            self.tokens -= 1.0
+        self.in_flight += 1
+        self.last_used = now
+
+    def finish(self, started: float, latency: float, congested: bool):
+        self.in_flight -= 1
+        if congested:
+            # Requests already in flight when the window was halved report the same congestion
+            if started > self.backed_off:
+                self.window = max(MIN_WINDOW, self.window / 2)
+                self.backed_off = time.monotonic()
+                self.backoffs += 1
+            return
+
+        self.best_latency = latency if self.best_latency is None else min(self.best_latency, latency)
+        self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+        if self.avg_latency <= self.best_latency * LATENCY_TOLERANCE + 0.001:
+            self.window = min(self.max_window, self.window + 1.0 / self.window)
+
+
+class Ticket:
+    __slots__ = ("family", "host", "started")
+
+    def __init__(self, family: str, host: str, started: float):
+        self.family = family
+        self.host = host
+        self.started = started
+
+
+class RateLimiter:
+    enabled = True
+
+    def __init__(self, family_rates: Dict[str, float], host_rate: float, max_window: int):
+        self.family_rates = family_rates
+        self.host_rate = host_rate
+        self.max_window = max(float(max_window), MIN_WINDOW)
+        self._families: Dict[str, Destination] = {}
+        self._hosts: Dict[str, Destination] = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _destinations(self, family: str, host: str):
+        # Caller holds the lock
+        fam = self._families.get(family)
+        if fam is None:
+            fam = self._families[family] = Destination(self.family_rates.get(family, 0.0), self.max_window)
+        dest = self._hosts.get(host)
+        if dest is None:
+            if len(self._hosts) >= MAX_IDLE_HOSTS:
+                self._prune_hosts()
+            dest = self._hosts[host] = Destination(self.host_rate, self.max_window)
+        return fam, dest
+
+    def _prune_hosts(self):
+        idle = [name for name, dest in self._hosts.items() if dest.in_flight == 0]
+        idle.sort(key=lambda name: self._hosts[name].last_used)
+        for name in idle[:len(idle) // 2 + 1]:
+            del self._hosts[name]
+
+    def _try_take(self, family: str, host: str) -> float:
+        """
+        Takes a slot if both destinations allow it and returns 0, otherwise
+        returns how long to wait (infinite: until a release). Caller holds the lock.
+        """
+        now = time.monotonic()
+        fam, dest = self._destinations(family, host)
+        delay = max(fam.wait_time(now), dest.wait_time(now))
+        if delay == 0:
+            fam.take(now)
+            dest.take(now)
+        return delay
+
+    def acquire(self, family: str, host: str) -> Ticket:
+        with self._released:
+            while True:
+                delay = self._try_take(family, host)
+                if not delay:
+                    return Ticket(family, host, time.monotonic())
+                self._released.wait(min(delay, MAX_WAIT))
+
+    async def acquire_async(self, family: str, host: str) -> Ticket:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                delay = self._try_take(family, host)
+                if not delay:
+                    return Ticket(family, host, time.monotonic())
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, min(delay, MAX_WAIT))
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, ticket: Ticket, congested: bool = False):
+        latency = time.monotonic() - ticket.started
+        with self._lock:
+            fam, dest = self._destinations(ticket.family, ticket.host)
+            fam.finish(ticket.started, latency, congested)
+            dest.finish(ticket.started, latency, congested)
+            # A slot is free: let the waiters check again
+            self._released.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {"window": round(dest.window, 1), "backoffs": dest.backoffs, "rate": dest.rate}
+                for name, dest in sorted(self._families.items())
+            }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class NullLimiter:
+    """
+    Stand-in used when throttling is disabled.
+    """
+
+    enabled = False
+
+    def acquire(self, family: str, host: str) -> Ticket:
+        return Ticket(family, host, 0.0)
+
+    async def acquire_async(self, family: str, host: str) -> Ticket:
+        return Ticket(family, host, 0.0)
+
+    def release(self, ticket: Ticket, congested: bool = False):
+        pass
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {}
@@ -0,0 +1,219 @@
+import csv
+import hashlib
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Compact in-memory row. Verifiers only read a handful of columns, so those
+# are kept as attributes and everything else stays as the raw bytes of the
+# original CSV record, which is written back verbatim with the result
+# columns appended. Other columns are still readable through get(), by
+# re-parsing the raw record.
+
+# Columns the verifiers and the engine read, mapped to their attribute
+PROJECTED_COLUMNS = {
+    'Resource ID': 'resource_id',
+    'Rule Name': 'rule_name',
+    'Violation Type': 'violation_type',
+    'Region': 'region',
+    'Findings': 'findings',
+    'Severity': 'severity',
+}
+
+# Low-cardinality columns whose values are shared between rows
+INTERNED_COLUMNS = ('Rule Name', 'Violation Type', 'Region', 'Severity')
+
+# Columns the verifier adds to every output row. Verify_Timestamp is when
+# the result was established (UTC), kept as is when it is carried forward
+# or served from the result cache.
+RESULT_COLUMNS = ['Verify_Execution', 'Verify_Exploit', 'Verify_Result', 'Verify_Timestamp']
+
+_MISSING = object()
+# Row.extracted before the row's verifier has looked at it, see BaseVerifier.extracted
+NOT_EXTRACTED = object()
+
+
+class CSVLine:
+    """
+    Renders a list of values as one CSV record, the way csv.writer would.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._writer = csv.writer(self)
+
+    def write(self, text: str):
+        self._parts.append(text)
+
+    def render(self, values: Iterable[Any]) -> str:
+        self._writer.writerow(values)
+        text = "".join(self._parts)
+        self._parts.clear()
+        return text
+
+
+class RowSchema:
+    """
+    Column layout shared by every row of one input file.
+    """
+
+    def __init__(self, fieldnames: List[str]):
+        self.input_fieldnames = list(fieldnames)
+        # Result columns already present in the input (re-verifying an
+        # output file) are dropped and written fresh at the end.
+        self.dropped = [i for i, name in enumerate(fieldnames) if name in RESULT_COLUMNS]
+        self.fieldnames = [name for name in fieldnames if name not in RESULT_COLUMNS]
+        self.output_fieldnames = self.fieldnames + RESULT_COLUMNS
+        self.positions = {name: i for i, name in enumerate(self.fieldnames)}
+        self.projected = [(self.positions[name], attr, name in INTERNED_COLUMNS)
+                          for name, attr in PROJECTED_COLUMNS.items() if name in self.positions]
+
+    def make_row(self, values: List[str], raw: str, line: Optional[CSVLine] = None) -> "Row":
+        if self.dropped or len(values) != len(self.input_fieldnames):
+            # Normalize to exactly the kept columns so results line up in the output
+            if self.dropped:
+                values = [value for i, value in enumerate(values) if i not in self.dropped]
+            values = (values + [''] * len(self.fieldnames))[:len(self.fieldnames)]
+            raw = (line or CSVLine()).render(values)
+        row = Row(self, raw.rstrip('\r\n').encode('utf-8'))
+        for index, attr, interned in self.projected:
+            setattr(row, attr, sys.intern(values[index]) if interned else values[index])
+        return row
+
+
+    def pack(self, rows: List["Row"]) -> Tuple[List[bytes], List[List[Optional[str]]]]:
+        """
+        Column-wise form of rows for sending between processes; much
+        cheaper to pickle than the Row objects themselves.
+        """
+        return [row.raw for row in rows], [[getattr(row, attr) for row in rows] for attr in PROJECTED_COLUMNS.values()]
+
+    def unpack(self, raws: List[bytes], columns: List[List[Optional[str]]]) -> List["Row"]:
+        columns = [
+            [value if value is None else sys.intern(value) for value in column] if name in INTERNED_COLUMNS
+            else column
+            for name, column in zip(PROJECTED_COLUMNS, columns)
+        ]
+        return [Row(self, *fields) for fields in zip(raws, *columns)]
+
+
+class Row:
+    __slots__ = ('schema', 'raw', 'resource_id', 'rule_name', 'violation_type', 'region', 'findings',
+                 'severity', 'results', 'extracted')
+
+    def __init__(self, schema: RowSchema, raw: bytes, resource_id: Optional[str] = None,
+                 rule_name: Optional[str] = None, violation_type: Optional[str] = None,
+                 region: Optional[str] = None, findings: Optional[str] = None,
+                 severity: Optional[str] = None):
+        # Attribute order matches PROJECTED_COLUMNS
+        self.schema = schema
+        self.raw = raw
+        self.resource_id = resource_id
+        self.rule_name = rule_name
+        self.violation_type = violation_type
+        self.region = region
+        self.findings = findings
+        self.severity = severity
+        self.results = None
+        self.extracted = NOT_EXTRACTED
+
+    def values(self) -> List[str]:
+        """
+        All input column values, parsed from the raw record.
+        """
+        return next(csv.reader([self.raw.decode('utf-8')]), [])
+
+    def get(self, name: str, default: Any = None) -> Any:
+        attr = PROJECTED_COLUMNS.get(name)
+        if attr is not None and name in self.schema.positions:
+            return getattr(self, attr)
+        if name in RESULT_COLUMNS:
+            if self.results is None:
+                return default
+            return self.results[RESULT_COLUMNS.index(name)]
+        position = self.schema.positions.get(name)
+        if position is None:
+            return default
+        return self.values()[position]
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Any):
+        # Input columns are read-only, only results are filled in
+        if name not in RESULT_COLUMNS:
+            raise KeyError(f"Column '{name}' is read-only")
+        if self.results is None:
+            self.results = [''] * len(RESULT_COLUMNS)
+        self.results[RESULT_COLUMNS.index(name)] = value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.schema.positions or name in RESULT_COLUMNS
+
+    def keys(self) -> List[str]:
+        return self.schema.output_fieldnames
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = dict(zip(self.schema.fieldnames, self.values()))
+        for name in RESULT_COLUMNS:
+            row[name] = self.get(name)
+        return row
+
+    def content_hash(self) -> str:
+        """
+        Same value as DataLoader.row_hash of the equivalent dict row.
+        """
+        return values_hash(self.values())
+
+    def render(self, line: CSVLine) -> bytes:
+        """
+        The output record: the original bytes, then the result columns.
+        """
+        results = line.render(self.results or [''] * len(RESULT_COLUMNS))
+        return self.raw + b',' + results.encode('utf-8')
+
+
+def values_hash(values: Iterable[str]) -> str:
+    """
+    Hash of a record's input column values, the row identity used by the
+    checkpoint journal and by sharding.
+    """
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Tuple[List[str], str]]:
+    """
+    Parses CSV text, yielding (values, raw record text) per record.
+    Records spanning several lines (quoted newlines) come back whole.
+    """
+    consumed: List[str] = []
+
+    def feed():
+        for text in lines:
+            consumed.append(text)
+            yield text
+
+    for values in csv.reader(feed()):
+        raw = "".join(consumed)
+        consumed.clear()
+        if values:  # Blank lines, as DictReader skips them
+            yield values, raw
+
+
+def read_rows(lines: Iterable[str]) -> Tuple[Optional[RowSchema], Iterator[Row]]:
+    """
+    Reads the header and returns (schema, lazy iterator of rows).
+    """
+    records = read_records(lines)
+    header = next(records, None)
+    if header is None:
+        return None, iter(())
+    schema = RowSchema(header[0])
+    line = CSVLine()
+    return schema, (schema.make_row(values, raw, line) for values, raw in records)
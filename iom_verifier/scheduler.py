@@ -0,0 +1,69 @@
+import heapq
+import itertools
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+# Order in which rows reach the engine.
+#
+# Rows that need no network access (manual checks, unmatched rules, rows
+# whose target cannot be extracted) are finished as soon as they are read
+# instead of taking a worker slot. The rest are held in a window of
+# `lookahead` rows and released most urgent first: by Severity, then by
+# how expensive their probe tends to be, then in input order. A long run
+# therefore writes its Critical and High results in the first seconds
+# rather than wherever they happen to sit in the export.
+
+DEFAULT_LOOKAHEAD = 2000
+
+SEVERITY_RANK = {
+    "critical": 0,
+    "high": 1,
+    "medium": 2,
+    "moderate": 2,
+    "low": 3,
+    "informational": 4,
+    "info": 4,
+}
+UNKNOWN_SEVERITY = 5
+
+# Relative cost of a probe kind: one HTTP round trip, S3 endpoint races that
+# may follow a region redirect, TCP connects that run to the timeout on filtered ports
+PROBE_COST = {"http-get": 1, "s3": 2, "tcp": 3}
+UNKNOWN_COST = 3
+
+T = TypeVar("T")
+
+
+def severity_rank(severity: Optional[str]) -> int:
+    return SEVERITY_RANK.get((severity or "").strip().lower(), UNKNOWN_SEVERITY)
+
+
+def urgency(severity: Optional[str], probe_kind: Optional[str]) -> Tuple[int, int]:
+    """
+    Sort key of a network row; lower goes first.
+    """
+    return severity_rank(severity), PROBE_COST.get(probe_kind, UNKNOWN_COST)
+
+
+def schedule(items: Iterable[T], key: Callable[[T], Optional[Tuple[int, int]]],
+             inline: Callable[[T], None], lookahead: int = DEFAULT_LOOKAHEAD) -> Iterator[T]:
+    """
+    Yields the items that need network work, lowest `key` first within a
+    window of `lookahead` items (ties in input order). Items whose key is
+    None need no network access and are passed to `inline` as soon as they
+    are read. With a lookahead of 1 or less the input order is kept.
+    """
+    window = []
+    order = itertools.count()
+    for item in items:
+        rank = key(item)
+        if rank is None:
+            inline(item)
+            continue
+        if lookahead <= 1:
+            yield item
+            continue
+        heapq.heappush(window, (rank, next(order), item))
+        if len(window) >= lookahead:
+            yield heapq.heappop(window)[2]
+    while window:
+        yield heapq.heappop(window)[2]
@@ -0,0 +1,106 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# Shared keep-alive HTTP layer for the blocking verifiers. One Session owns
+# a per-host urllib3 pool; all worker threads borrow connections from it
+# instead of opening (and TLS-handshaking) a new one per probe.
+#
+# requests (and http_adapter.py, built on it) is imported with the first
+# session, so runs that make no blocking HTTP request never load it.
+
+DEFAULT_HOST_POOLS = 256
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def note_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def note_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused": reused,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0,
+            }
+
+
+stats = ConnectionStats()
+
+
+class SessionPool:
+    """
+    Owns the process-wide requests.Session. Each target host gets its own
+    connection pool of `workers` keep-alive connections. Cookies are
+    rejected so the session holds no per-request mutable state and can be
+    shared safely by every worker thread.
+    """
+
+    def __init__(self, workers: int = 5, host_pools: int = DEFAULT_HOST_POOLS):
+        self.workers = max(1, workers)
+        self.host_pools = host_pools
+        self._session: Optional["requests.Session"] = None
+        self._lock = threading.Lock()
+
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from .http_adapter import PooledAdapter
+                    session = requests.Session()
+                    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                    adapter = PooledAdapter(pool_connections=self.host_pools,
+                                            pool_maxsize=self.workers)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        return self.session().get(url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> "requests.Response":
+        return self.session().head(url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+pool = SessionPool()
+
+
+def configure(workers: int):
+    """
+    Resizes the shared pool to the number of concurrent workers.
+    Must be called before the first request.
+    """
+    global pool
+    pool.close()
+    pool = SessionPool(workers)
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return pool.get(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> "requests.Response":
+    return pool.head(url, **kwargs)
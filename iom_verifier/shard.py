@@ -0,0 +1,148 @@
+import csv
+import itertools
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .loader import DataLoader
+from .record import RowSchema, read_records, values_hash
+
+# Splitting one input across several machines.
+#
+# `--shard K/N` keeps only the rows whose stable row hash (the same hash the
+# checkpoint journal uses) falls in shard K, so N independent runs over the
+# same input file cover every row exactly once without coordinating.
+# Identical rows hash alike and always land in the same shard.
+#
+# Shard runs write their rows in input order, so merge() can rebuild the
+# full output in one streaming pass: it walks the original input, works out
+# which shard each row belongs to and takes that shard's next output row,
+# checking the two are the same row.
+
+
+class ShardMismatch(Exception):
+    """Shard outputs do not cover the input exactly once."""
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parses "K/N" (shards numbered 1..N) into (K, N).
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected K/N, e.g. 2/8")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}': K must be between 1 and N")
+    return index, count
+
+
+def shard_of(row_hash: str, count: int) -> int:
+    """
+    The shard (1..count) a row with this hash belongs to.
+    """
+    return int(row_hash[:16], 16) % count + 1
+
+
+def select(rows: Iterable, index: int, count: int, fieldnames: List[str]) -> Iterator:
+    """
+    Yields only the rows of shard `index` out of `count`.
+    """
+    for row in rows:
+        if shard_of(DataLoader.row_hash(row, fieldnames), count) == index:
+            yield row
+
+
+class _ShardReader:
+    """
+    Output rows of one shard as (row hash, raw output record).
+    """
+
+    def __init__(self, index: int, path: str, expected_header: List[str]):
+        self.index = index
+        self.path = path
+        self.rows = 0
+        self._file: TextIO = open(path, mode='r', encoding='utf-8-sig', newline='')
+        self._records = read_records(self._file)
+        header = next(self._records, None)
+        if header is None or header[0] != expected_header:
+            self._file.close()
+            raise ShardMismatch(f"{path} does not have the output header for this input")
+        self._schema = RowSchema(header[0])
+        self.pending: Optional[Tuple[str, str]] = self._read()
+
+    def _read(self) -> Optional[Tuple[str, str]]:
+        record = next(self._records, None)
+        if record is None:
+            return None
+        values, raw = record
+        # Result columns are not part of the row identity
+        kept = [value for i, value in enumerate(values) if i not in self._schema.dropped]
+        kept = (kept + [''] * len(self._schema.fieldnames))[:len(self._schema.fieldnames)]
+        if not raw.endswith('\n'):
+            raw += '\r\n'
+        return values_hash(kept), raw
+
+    def take(self) -> Optional[Tuple[str, str]]:
+        current = self.pending
+        if current is not None:
+            self.rows += 1
+            self.pending = self._read()
+        return current
+
+    def close(self):
+        self._file.close()
+
+
+def merge(input_path: str, shard_paths: List[str], output_path: str) -> Dict[str, int]:
+    """
+    Combines the outputs of shards 1..N (given in that order) into one CSV
+    in input order. Raises ShardMismatch if any input row is missing,
+    duplicated or found in the wrong shard. Returns rows merged per shard path.
+    """
+    loader = DataLoader(input_path)
+    rows = loader.iter_rows()
+    first = next(rows, None)
+    if loader.schema is None:
+        raise ShardMismatch(f"No data found in {input_path}")
+    fieldnames = loader.schema.input_fieldnames
+    count = len(shard_paths)
+
+    readers: List[_ShardReader] = []
+    try:
+        for index, path in enumerate(shard_paths, start=1):
+            readers.append(_ShardReader(index, path, loader.schema.output_fieldnames))
+
+        with open(output_path, mode='w', encoding='utf-8', newline='') as output:
+            csv.writer(output).writerow(loader.schema.output_fieldnames)
+            position = 0
+            for row in itertools.chain([first] if first is not None else [], rows):
+                position += 1
+                key = DataLoader.row_hash(row, fieldnames)
+                reader = readers[shard_of(key, count) - 1]
+                found = reader.take()
+                if found is None:
+                    raise ShardMismatch(
+                        f"Input row {position} is missing from shard {reader.index}/{count} ({reader.path}); "
+                        f"that shard has only {reader.rows} rows")
+                if found[0] != key:
+                    raise ShardMismatch(
+                        f"Shard {reader.index}/{count} ({reader.path}) does not match input row {position}: "
+                        f"a row is missing, duplicated or out of order there (was it run with --shard "
+                        f"{reader.index}/{count} on this input?)")
+                output.write(found[1])
+
+        for reader in readers:
+            if reader.pending is not None:
+                extra = sum(1 for _ in iter(reader.take, None))
+                raise ShardMismatch(
+                    f"Shard {reader.index}/{count} ({reader.path}) has {extra} rows beyond the input "
+                    f"(duplicates or rows from another input)")
+        return {reader.path: reader.rows for reader in readers}
+    except ShardMismatch:
+        # Never leave a partial merge behind that looks like a complete output
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        for reader in readers:
+            reader.close()
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Prefetched probes nobody claimed (e.g. the row failed before probing) are
+# dropped oldest-first past this many.
+MAX_UNCLAIMED = 100000
+
+
+class _Prefetch:
+    __slots__ = ("future", "claims", "claimed")
+
+    def __init__(self, future: Future, claims: int):
+        self.future = future
+        self.claims = claims
+        self.claimed = False
+
+
+class SingleFlight:
+    """
+    Coalesces identical probes. The first caller for a key runs the probe;
+    callers arriving while it is in flight wait on it and share its outcome,
+    result or exception. Successful results are also kept in a bounded LRU
+    for the rest of the run, so a duplicate that arrives just after the
+    probe finished does not repeat it either.
+
+    Probes can also be started ahead of time with prefetch(); the rows they
+    were started for pick up the outcome from do()/do_async().
+    """
+
+    def __init__(self, remember: int = 10000):
+        self.remember = remember
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_async: Dict[Hashable, asyncio.Future] = {}
+        self._recent: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._prefetched: "OrderedDict[Hashable, _Prefetch]" = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0
+        self.reused = 0
+
+    def _recall(self, key: Hashable):
+        # Caller holds the lock
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            self.reused += 1
+            return True, self._recent[key]
+        return False, None
+
+    def _claim(self, key: Hashable):
+        # Caller holds the lock. The first claim of a prefetched probe is the
+        # row it was started for; only later ones count as deduplicated.
+        entry = self._prefetched.get(key)
+        if entry is None:
+            return None
+        if entry.claimed:
+            self.coalesced += 1
+        entry.claimed = True
+        entry.claims -= 1
+        if entry.claims <= 0:
+            del self._prefetched[key]
+        return entry.future
+
+    def prefetch(self, key: Hashable, start: Callable[[], Future], claims: int = 1) -> bool:
+        """
+        Starts a probe without waiting for it. `start` returns a
+        concurrent Future; the next `claims` callers of do()/do_async()
+        for the key receive its outcome. Returns False if the key is
+        already prefetched, in flight or remembered.
+        """
+        with self._lock:
+            if key in self._prefetched or key in self._inflight or key in self._inflight_async \
+                    or (self.remember > 0 and key in self._recent):
+                return False
+            future = start()
+            self._prefetched[key] = _Prefetch(future, claims)
+            self.executed += 1
+            while len(self._prefetched) > MAX_UNCLAIMED:
+                self._prefetched.popitem(last=False)
+
+        def remember(done: Future):
+            if not done.cancelled() and done.exception() is None:
+                self._store(key, done.result())
+        future.add_done_callback(remember)
+        return True
+
+    def _store(self, key: Hashable, value: Any):
+        if self.remember <= 0:
+            return
+        with self._lock:
+            self._recent[key] = value
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.remember:
+                self._recent.popitem(last=False)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            prefetched = self._claim(key)
+            if prefetched is None:
+                found, value = self._recall(key)
+                if found:
+                    return value
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight[key] = Future()
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+
+        if prefetched is not None:
+            return prefetched.result()
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            prefetched = self._claim(key)
+            if prefetched is None:
+                found, value = self._recall(key)
+                if found:
+                    return value
+                future = self._inflight_async.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+
+        if prefetched is not None:
+            return await asyncio.shield(asyncio.wrap_future(prefetched))
+        if not leader:
+            # Shield so a cancelled follower does not cancel the shared probe
+            return await asyncio.shield(future)
+
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight_async[key]
+
+    @property
+    def saved(self) -> int:
+        return self.coalesced + self.reused
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "reused": self.reused,
+                "saved": self.coalesced + self.reused,
+            }
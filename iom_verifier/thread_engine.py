@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def run(rows: Iterable[Dict[str, Any]],
+        process: Callable[[Dict[str, Any]], Dict[str, Any]],
+        on_result: Callable[[Dict[str, Any]], None],
+        threads: int = 5,
+        window: Optional[int] = None,
+        admit: Optional[Callable[[], bool]] = None):
+    """
+    Runs `process` over every row on a thread pool, calling `on_result`
+    from the calling thread as rows complete.
+
+    Rows are pulled from `rows` lazily and at most `window` of them are
+    submitted at once, so memory depends on the concurrency level rather
+    than on the input size. While `admit` returns False no new rows are
+    pulled, but completed ones are still handed to `on_result`.
+    """
+    window = max(window or threads * 4, threads, 1)
+    iterator = iter(rows)
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window and (admit is None or admit() or not pending):
+                row = next(iterator, None)
+                if row is None:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(process, row))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_result(future.result())
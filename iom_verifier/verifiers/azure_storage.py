@@ -1,16 +1,45 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple, Union
 from .base import BaseVerifier, VerificationResult
+from . import manifest
+from .. import listing, probes
 
 class AzureStorageVerifier(BaseVerifier):
-    ids = [
-        "Storage Account blob container configured with public access",
-        "Storage Account container storing activity logs is publicly accessible",
-        "Azure Disk configured with PUBLIC network access enabled", # Sometimes related to SAS/Snapshot URLs
-        "Azure Disk public network access is enabled"
-    ]
+    probe_kind = "http-get"
+
+    ids = manifest.AZURE_STORAGE
 
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+
+        try:
+            response = probes.http_get(target, read_body=True)
+        except Exception as e:
+            return self._connection_failed(e)
+        return self._interpret(target, response.status_code, response.body)
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+
+        try:
+            response = await probes.http_get_async(target, read_body=True)
+        except Exception as e:
+            return self._connection_failed(e)
+        return self._interpret(target, response.status_code, response.body)
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return None
+        return ("http-get", target)
+
+    def extract(self, row: Dict[str, Any]) -> Union[str, VerificationResult]:
+        """
+        Returns the container listing URL, or a Skipped result if it cannot be built.
+        """
         resource_id = row.get('Resource ID', '') 
         # Azure ID: /subscriptions/.../resourceGroups/.../providers/Microsoft.Storage/storageAccounts/NAME/blobServices/default/containers/CONTAINER
         
@@ -42,11 +71,10 @@ class AzureStorageVerifier(BaseVerifier):
         # If we don't have a container name, we can't easily verify container public access 
         # without guessing names or brute forcing.
         
-        target_url = ""
         if container_name:
             # Check container public access (listing blobs)
             # URL: https://<account>.blob.core.windows.net/<container>?restype=container&comp=list
-            target_url = f"https://{account_name}.blob.core.windows.net/{container_name}?restype=container&comp=list"
+            return f"https://{account_name}.blob.core.windows.net/{container_name}?restype=container&comp=list"
         else:
              # Just check if the account endpoint resolves? Not very useful for "Public Access"
              # Might be "Blob public access is enabled" at account level, but that doesn't mean data is leaked yet.
@@ -56,38 +84,37 @@ class AzureStorageVerifier(BaseVerifier):
                 message="Specific Container name not found in Resource ID. Cannot verify Container Public Access."
             )
 
-        try:
-            response = requests.get(target_url, timeout=5)
-            
-            if response.status_code == 200:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Exploitable",
-                    message=f"Container is publicly listable. GET {target_url} returned 200 OK."
-                )
-            elif response.status_code == 404:
-                # Container doesn't exist
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Unknown",
-                    message=f"Container not found (404). URL: {target_url}"
-                )
-            elif response.status_code == 403:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Secure",
-                    message=f"Access Denied (403). Public access likely disabled. URL: {target_url}"
-                )
-            else:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Unknown",
-                    message=f"Received unexpected status {response.status_code}. URL: {target_url}"
-                )
-
-        except Exception as e:
+    def _interpret(self, target_url: str, status_code: int, body: bytes = b"") -> VerificationResult:
+        if status_code == 200:
              return VerificationResult(
                 execution_status="Executed",
-                exploit_status="Error",
-                message=f"Connection failed: {str(e)}"
+                exploit_status="Exploitable",
+                message=f"Container is publicly listable. GET {target_url} returned 200 OK.{listing.evidence(body)}"
             )
+        elif status_code == 404:
+            # Container doesn't exist
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Unknown",
+                message=f"Container not found (404). URL: {target_url}"
+            )
+        elif status_code == 403:
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Secure",
+                message=f"Access Denied (403). Public access likely disabled. URL: {target_url}"
+            )
+        else:
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Unknown",
+                message=f"Received unexpected status {status_code}. URL: {target_url}",
+                transient=status_code >= 500 or status_code in probes.THROTTLE_STATUSES
+            )
+
+    def _connection_failed(self, e: Exception) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Executed",
+            exploit_status="Error",
+            message=f"Connection failed: {str(e)}"
+        )
@@ -1,21 +1,40 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..record import NOT_EXTRACTED
 
 @dataclass
 class VerificationResult:
     execution_status: str  # "Executed", "Skipped", "Error"
     exploit_status: str    # "Exploitable", "Secure", "Unknown", "N/A"
     message: str           # Verbose details
+    checked_at: Optional[float] = None  # When the result was established (epoch seconds), if not just now
+    transient: bool = False             # Came from a transport failure or a server error, not from the target; never cached
+
+@dataclass(frozen=True)
+class RulePlan:
+    """
+    The parts of a row's verification that depend only on its rule name,
+    worked out once per distinct rule (see BaseVerifier.plan).
+    """
+    probe_kind: Optional[str]                   # "tcp", "http-get", "s3", or None when rows need no network access
+    ports: Tuple[int, ...] = ()                 # TCP ports the rule names; the first one is probed
+    skip: Optional[VerificationResult] = None   # Set when no row of this rule can be probed
 
 class BaseVerifier(ABC):
     """
     Abstract Base Class for all IoM Verifiers.
     """
-    
+
     # List of Rule Names or Violation Types this verifier supports
     ids: list[str] = []
 
+    # Probe kind of every rule of this verifier, unless compile_plan() says otherwise
+    probe_kind: Optional[str] = None
+
     @abstractmethod
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
         """
@@ -23,3 +42,76 @@ class BaseVerifier(ABC):
         Returns a VerificationResult object.
         """
         pass
+
+    def compile_plan(self, rule_name: str) -> RulePlan:
+        """
+        Works out the rule-level part of verifying rows of `rule_name`.
+        Verifiers whose behaviour depends on the rule override this.
+        """
+        return RulePlan(self.probe_kind)
+
+    def plan(self, rule_name: str) -> RulePlan:
+        """
+        compile_plan() memoized per rule name. An export only holds a few
+        dozen distinct rules, so millions of rows share a handful of plans.
+        """
+        plans = self.__dict__.get('_plans')
+        if plans is None:
+            plans = self._plans = {}
+        plan = plans.get(rule_name)
+        if plan is None:
+            plan = plans[rule_name] = self.compile_plan(rule_name)
+        return plan
+
+    def extract(self, row: Dict[str, Any]) -> Any:
+        """
+        Pulls what this verifier probes out of a row (host and port, URL,
+        bucket name), or a Skipped result. Verifiers that probe override
+        this; everything else calls extracted().
+        """
+        return None
+
+    def extracted(self, row: Dict[str, Any]) -> Any:
+        """
+        extract() once per row: the scheduler, the planner, the TCP
+        prefetch, the result cache and verify() all look at the same row,
+        so the first caller keeps the result on it (Row.extracted).
+        """
+        found = getattr(row, 'extracted', NOT_EXTRACTED)
+        if found is NOT_EXTRACTED:
+            found = self.extract(row)
+            if hasattr(row, 'extracted'):
+                row.extracted = found
+        return found
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        """
+        Describes the network target verify() would probe for this row, as a
+        hashable tuple starting with the probe kind (e.g. ("tcp", host, port)).
+        Must not perform any I/O. Returns None when the row needs no network access.
+        """
+        return None
+
+    def probe_hosts(self, row: Dict[str, Any]) -> List[str]:
+        """
+        Hostnames verify() will contact for this row, for DNS pre-resolution.
+        Derived from probe_target() for the "tcp" and "http-get" probe kinds.
+        """
+        target = self.probe_target(row)
+        if not target:
+            return []
+        if target[0] == "tcp":
+            return [target[1]]
+        if target[0] == "http-get":
+            host = urlsplit(target[1]).hostname
+            return [host] if host else []
+        return []
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        """
+        Coroutine variant of verify() used by the asyncio engine.
+        Verifiers without a native implementation run verify() in the
+        event loop's default executor so they never block the loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.verify, row)
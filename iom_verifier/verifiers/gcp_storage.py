@@ -1,15 +1,40 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from .base import BaseVerifier, VerificationResult
+from . import manifest
+from .. import listing, probes
 
 class GCPStorageVerifier(BaseVerifier):
-    ids = [
-        "Cloud Storage policy configured with 'allUsers' access",
-        "Cloud Storage policy configured with 'allAuthenticatedUsers' access",
-        "Cloud Storage policy configured with 'allUsers' access" # Duplicate in list usually handled by sets but explicit is fine
-    ]
+    probe_kind = "http-get"
+
+    ids = manifest.GCP_STORAGE
 
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
+        url = self.extracted(row)
+        if not url:
+            return self._no_bucket_result()
+
+        try:
+            response = probes.http_get(url, read_body=True)
+        except Exception as e:
+            return self._connection_failed(e)
+        return self._interpret(url, response.status_code, response.body)
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        url = self.extracted(row)
+        if not url:
+            return self._no_bucket_result()
+
+        try:
+            response = await probes.http_get_async(url, read_body=True)
+        except Exception as e:
+            return self._connection_failed(e)
+        return self._interpret(url, response.status_code, response.body)
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        url = self.extracted(row)
+        return ("http-get", url) if url else None
+
+    def extract(self, row: Dict[str, Any]) -> Optional[str]:
         resource_id = row.get('Resource ID', '')
 
         # Standard GCP Storage ID: //storage.googleapis.com/BUCKET_NAME
@@ -24,47 +49,49 @@ class GCPStorageVerifier(BaseVerifier):
             bucket_name = resource_id
             
         if not bucket_name:
-             return VerificationResult(
-                execution_status="Skipped",
-                exploit_status="Unknown",
-                message="Could not extract bucket name from Resource ID."
-            )
+            return None
 
         # Public URL: https://storage.googleapis.com/<bucket>/
-        url = f"https://storage.googleapis.com/{bucket_name}/"
-        
-        try:
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                # Returns XML listing if keys are public
-                return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Exploitable",
-                    message=f"Bucket is publicly listable. GET {url} returned 200 OK."
-                )
-            elif response.status_code == 403:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Secure",
-                    message=f"Access Denied (403). Buckets with 'allAuthenticatedUsers' might still require auth token, so this is Secure from Unauthenticated perspective."
-                )
-            elif response.status_code == 404:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Unknown",
-                    message=f"Bucket not found (404). URL: {url}"
-                )
-            else:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Unknown",
-                    message=f"Received unexpected status {response.status_code}."
-                )
+        return f"https://storage.googleapis.com/{bucket_name}/"
 
-        except Exception as e:
+    def _interpret(self, url: str, status_code: int, body: bytes = b"") -> VerificationResult:
+        if status_code == 200:
+            # Returns XML listing if keys are public
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Exploitable",
+                message=f"Bucket is publicly listable. GET {url} returned 200 OK.{listing.evidence(body)}"
+            )
+        elif status_code == 403:
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Secure",
+                message=f"Access Denied (403). Buckets with 'allAuthenticatedUsers' might still require auth token, so this is Secure from Unauthenticated perspective."
+            )
+        elif status_code == 404:
              return VerificationResult(
                 execution_status="Executed",
-                exploit_status="Error",
-                message=f"Connection failed: {str(e)}"
+                exploit_status="Unknown",
+                message=f"Bucket not found (404). URL: {url}"
             )
+        else:
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Unknown",
+                message=f"Received unexpected status {status_code}.",
+                transient=status_code >= 500 or status_code in probes.THROTTLE_STATUSES
+            )
+
+    def _no_bucket_result(self) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Skipped",
+            exploit_status="Unknown",
+            message="Could not extract bucket name from Resource ID."
+        )
+
+    def _connection_failed(self, e: Exception) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Executed",
+            exploit_status="Error",
+            message=f"Connection failed: {str(e)}"
+        )
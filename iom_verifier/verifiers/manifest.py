@@ -0,0 +1,186 @@
+# Rule Names / Violation Types handled by each built-in verifier. The
+# registry routes rows on these lists without importing any verifier module,
+# and imports a verifier the first time a row is routed to it. The verifier
+# classes take their `ids` from here, so a rule is only ever listed once.
+#
+# Keep this module free of imports: it is loaded on every start.
+
+S3 = [
+    "S3 bucket policy with global write, read, or delete permissions",
+    "S3 bucket configured for public access",
+    "S3 bucket with Sensitive Data configured for public access",
+    "S3 bucket with Sensitive Data configured for any authenticated user access",
+    "S3 bucket with Block Public Access setting disabled",
+    "S3 Bucket ACL allows READ access to ANY authenticated user",
+    "S3 bucket policy allows public write access",
+    "S3 bucket policy allows public read access",
+    "S3 bucket configured for any authenticated user access"
+]
+
+NETWORKING = [
+    "AWS - Security Group allowing ingress to port 22",
+    "AWS - Security Group allowing ingress to port 3389",
+    "NLB/ALB global access configured to one or more administrative ports.",
+    "NLB/ALB global access configured to one or more administrative ports",
+    "ELB global access configured to one or more administrative ports",
+    "MQ Broker is publicly accessible",
+    "AWS - RDS Instance is Publicly Accessible",
+    "AWS - Redshift Cluster is Publicly Accessible",
+    "AWS - Elasticsearch Domain is Publicly Accessible",
+    "EKS node(s) are publicly accessible via inbound security group rule",
+    # Azure - Networking
+    "Firewall instance TCP or UDP port 3389 is open to the public",
+    "Firewall instance TCP/UDP port 3389 is open to the public",
+    "Network Security Group rule allows ingress traffic from any source on high risk ports",
+    "Firewall instance TCP port 2375 or 2376 is open to the public",
+    "Firewall instance UDP port 137 or 138 is open to the public",
+    "Network Security Group rule allows HTTP(S) access from any source",
+    "Firewall instance TCP port 1433 or UDP port 1434 is open to the public",
+    "SQL server configured with firewall rule to allow access from all networks",
+    "Firewall instance TCP or UDP port 53 is open to the public",
+    "Firewall instance UDP or TCP port 445 is open to the public",
+    "Firewall instance UDP/TCP port 445 is open to the public",
+    "Azure App Service web apps configured with public network access",
+    "Azure App Service web application with public network access",
+    "Azure Logic app configured as publicly accessible",
+    "Firewall instance TCP port 135 is open to the public",
+    "Virtual Machine allows public internet access via non-web ports while running",
+    "Virtual Machine allows public internet access to non-web ports while running",
+    "Firewall instance allow all source IPs to all destination IPs",
+    "Cosmos DB allows traffic from public Azure datacenters",
+    "Firewall instance TCP port 50070 and 50470 is open to the public",
+    "Network Security Group rule allows ingress traffic from any source on port not commonly used",
+    "Azure OpenAI service has public network access enabled",
+    "OpenAI service public network access is enabled",
+    "Firewall instance TCP port 4333 or 3306 is open to the public",
+    "Firewall instance TCP port 5500 is open to the public",
+    "Network Security Group rule allows SSH access from any source",
+    "Network Security Group rule allows UDP access from any source",
+    "Load Balancer rule allow high risk port",
+    "Load Balancer rule allows inbound traffic from the internet on high risk ports",
+    "Firewall instance TCP port 5900 is open to the public",
+    "Network Security Group rule allows ingress traffic from any source on any protocol",
+    "Firewall instance TCP port 23 is open to the public",
+    "Firewall instance TCP port 20 or 21 is open to the public",
+    "PostgreSQL Flexible Server allows access from all IPv4",
+    "Firewall instance TCP port 22 is open to the public",
+    "Firewall instance publicly configured allows global public IP in ingress rule(s) on non-web ports",
+    "PostgreSQL Flexible Server allowing public network access",
+    "PostgreSQL flex server public network access allowed",
+    "Azure Container Apps environment configured with public access",
+    "MySQL Flexible Server has public network access enabled",
+    "MySQL database flexible server public network access is enabled",
+    "PostgreSQL Flexible Server allowing public access from ANY Azure service",
+    "Virtual Machine allows public internet access via SSH on port 22 while running",
+    "Virtual Machine allows public internet access to SSH port 22 while running",
+    "Firewall instance TCP port 1522 is open to the public",
+    "Virtual Machine allows inbound traffic from the internet on a high risk port",
+    "Virtual Machine allows inbound from any source in security group rules",
+    "Network Security Group rule overly permissive to inbound traffic over any protocol and port",
+    "Network Security Group rule overly permissive to inbound traffic over any protocol",
+    "AKS authorized IP range is not configured.",
+    "AKS authorized IP range is not configured",
+    "Azure OpenAI service public network access should be restricted",
+    "OpenAI service public network access should be restricted",
+    "Virtual Machine allows inbound from internet on any port from any source",
+    "Azure Machine Learning workspace configured with overly permissive network access",
+    "Azure Machine Learning workspace with overly permissive network",
+    "Network Security Group rule allows ingress traffic from any source on all ports",
+    "Firewall instance TCP port 5601 is open to the public",
+    "Cosmos DB account is configured with public access from all networks",
+    "CosmosDB is configured with public access from all networks",
+    "Virtual Machine allows public internet access via RDP on port 3389 while running",
+    "Virtual Machine allows public internet access to RDP port 3389 while running",
+    "Firewall instance TCP port 9200 is open to the public",
+    "Firewall instance TCP port 8020 is open to the public",
+    "Firewall instance TCP port 1521 is open to the public",
+    "Virtual Machine allows public internet access to Docker (port 2375/2376)",
+    "Virtual Machine allows inbound from any source on any protocol",
+    "Firewall instance TCP port 5432 is open to the public",
+    "Firewall instance TCP ports 4505 or 4506 are open to the public",
+    "Network Security Group rule allows RDP access from any source",
+    "Cosmos DB Account allows public network access without firewall rules",
+    "CosmosDB account with public access has no firewall rules",
+    "Firewall instance TCP port 25 is open to the public",
+    "Azure Machine Learning compute instance configured with public IP",
+    "Azure Machine Learning compute instance configured with public IP",
+    "Azure Machine Learning compute instance with public IP",
+    # GCP - Networking
+    "Cloud SQL instance is open to public",
+    "Cloud SQL PostgreSQL Instance IP assignment is not set to private",
+    "Cloud SQL instance assigned public IP",
+    "Compute Engine instance configured with public IP",
+    "GKE Cluster inbound firewall rule allows all traffic"
+]
+
+SERVICES = [
+    "AWS - ECR Repository is Publicly Accessible",
+    "ECR repository is configured to be publicly exposed",
+    "AWS - Lambda Function with Public Access", # Only if it has a function URL or we can guess it?
+    "Lambda function is configured to be publicly exposed",
+    "Cloud Run Service is accessible by any users or any authenticated user"
+]
+
+MANUAL = [
+    "EMR cluster security group allows all traffic on port 8088",
+    "API Gateway method does not require authorization or api key",
+    "MSK Cluster configured for public accessibility",
+    "MSK Cluster should not be publicly accessible",
+    "AWS OpenSearch Domain policy is overly permissive",
+    "OpenSearch Domain policy should not be overly permissive",
+    "EKS cluster with open VPC CIDR range for public access",
+    "NLB/ALB configured as publicly accessible on non-web ports",
+    "SageMaker Domain not configured for VPC Only Traffic",
+    "S3 bucket policy allows public access to CloudTrail logs",
+    "Lambda Function is Configured to be publicly accessible",
+    "EKS cluster VPC endpoint access is publicly enabled",
+    "AWS EventBridge EventBus exposed to the public",
+    "SageMaker Notebook instance configured with Direct Internet Access",
+    "AWS OpenSearch Domain allows anonymous access",
+    "OpenSearch Domain should not allow anonymous access",
+    "EKS Cluster endpoint access should not allow all IP addresses",
+    "ELB configured as publicly accessible on non-web ports",
+    "NLB configured with listener over high-risk ports with target groups over ports.",
+    "NLB configured with listener over high-risk ports with target groups over ports",
+    "API Gateway is accessible through public API endpoints",
+    "SageMaker Notebook instance is not placed in vpc",
+    "SageMaker Notebook instance not placed in vpc",
+    "AWS Network Firewall without stateless rule group",
+    "Network Firewall without stateless rule group",
+    # GCP - Manual
+    "BigQuery policy configured with 'allUsers' access",
+    "GKE Cluster has the User 'allAuthenticatedUsers' Added as a Container Admin or Cluster Admin",
+    "GKE Cluster has the user allAuthenticatedUsers added as a container admin or cluster admin",
+    "KMS Cryptokey configured with 'allAuthenticatedUsers' access",
+    "KMS crypto key configured with 'allAuthenticatedUsers' access",
+    "BigQuery policy configured with 'allAuthenticatedUsers' access",
+    "KMS policy binding roles overly permissive",
+    "Cloud Storage uniform bucket-level access is disabled",
+    "Compute Image configured with 'allAuthenticatedUsers' access",
+    "KMS Cryptokey configured with 'allUsers' access",
+    "KMS crypto key configured with 'allUsers' access"
+]
+
+AZURE_STORAGE = [
+    "Storage Account blob container configured with public access",
+    "Storage Account container storing activity logs is publicly accessible",
+    "Azure Disk configured with PUBLIC network access enabled", # Sometimes related to SAS/Snapshot URLs
+    "Azure Disk public network access is enabled"
+]
+
+GCP_STORAGE = [
+    "Cloud Storage policy configured with 'allUsers' access",
+    "Cloud Storage policy configured with 'allAuthenticatedUsers' access",
+    "Cloud Storage policy configured with 'allUsers' access" # Duplicate in list usually handled by sets but explicit is fine
+]
+
+# Built-in verifiers in precedence order ("module:Class", rule names): when
+# two claim the same rule, the one listed first handles it.
+BUILTIN = [
+    ("iom_verifier.verifiers.s3:S3Verifier", S3),
+    ("iom_verifier.verifiers.networking:NetworkingVerifier", NETWORKING),
+    ("iom_verifier.verifiers.services:ServicesVerifier", SERVICES),
+    ("iom_verifier.verifiers.manual:ManualVerifier", MANUAL),
+    ("iom_verifier.verifiers.azure_storage:AzureStorageVerifier", AZURE_STORAGE),
+    ("iom_verifier.verifiers.gcp_storage:GCPStorageVerifier", GCP_STORAGE),
+]
@@ -1,106 +1,18 @@
-import socket
 import re
-from typing import Dict, Any, List
-from .base import BaseVerifier, VerificationResult
+from typing import Dict, Any, Optional, Tuple, Union
+from .base import BaseVerifier, RulePlan, VerificationResult
+from . import manifest
+from .. import probes
+
+# Resource ID that is already an IP address or a domain name
+IP_PATTERN = re.compile(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$")
+DOMAIN_PATTERN = re.compile(r"^([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$")
+# IP address anywhere in free text, e.g. "Public IP: x.x.x.x" in Findings
+IP_IN_TEXT = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
 
 class NetworkingVerifier(BaseVerifier):
-    ids = [
-        "AWS - Security Group allowing ingress to port 22",
-        "AWS - Security Group allowing ingress to port 3389",
-        "NLB/ALB global access configured to one or more administrative ports.",
-        "NLB/ALB global access configured to one or more administrative ports",
-        "ELB global access configured to one or more administrative ports",
-        "NLB/ALB configured as publicly accessible on non-web ports.",
-        "ELB configured as publicly accessible on non-web ports.",
-        "MQ Broker is publicly accessible",
-        "AWS - RDS Instance is Publicly Accessible",
-        "AWS - Redshift Cluster is Publicly Accessible",
-        "AWS - Elasticsearch Domain is Publicly Accessible",
-        "EKS node(s) are publicly accessible via inbound security group rule",
-        # Azure - Networking
-        "Firewall instance TCP or UDP port 3389 is open to the public",
-        "Firewall instance TCP/UDP port 3389 is open to the public",
-        "Network Security Group rule allows ingress traffic from any source on high risk ports",
-        "Firewall instance TCP port 2375 or 2376 is open to the public",
-        "Firewall instance UDP port 137 or 138 is open to the public",
-        "Network Security Group rule allows HTTP(S) access from any source",
-        "Firewall instance TCP port 1433 or UDP port 1434 is open to the public",
-        "SQL server configured with firewall rule to allow access from all networks",
-        "Firewall instance TCP or UDP port 53 is open to the public",
-        "Firewall instance UDP or TCP port 445 is open to the public",
-        "Firewall instance UDP/TCP port 445 is open to the public",
-        "Azure App Service web apps configured with public network access",
-        "Azure App Service web application with public network access",
-        "Azure Logic app configured as publicly accessible",
-        "Firewall instance TCP port 135 is open to the public",
-        "Virtual Machine allows public internet access via non-web ports while running",
-        "Virtual Machine allows public internet access to non-web ports while running",
-        "Firewall instance allow all source IPs to all destination IPs",
-        "Cosmos DB allows traffic from public Azure datacenters",
-        "Firewall instance TCP port 50070 and 50470 is open to the public",
-        "Network Security Group rule allows ingress traffic from any source on port not commonly used",
-        "Azure OpenAI service has public network access enabled",
-        "OpenAI service public network access is enabled",
-        "Firewall instance TCP port 4333 or 3306 is open to the public",
-        "Firewall instance TCP port 5500 is open to the public",
-        "Network Security Group rule allows SSH access from any source",
-        "Network Security Group rule allows UDP access from any source",
-        "Load Balancer rule allow high risk port",
-        "Load Balancer rule allows inbound traffic from the internet on high risk ports",
-        "Firewall instance TCP port 5900 is open to the public",
-        "Network Security Group rule allows ingress traffic from any source on any protocol",
-        "Firewall instance TCP port 23 is open to the public",
-        "Firewall instance TCP port 20 or 21 is open to the public",
-        "PostgreSQL Flexible Server allows access from all IPv4",
-        "Firewall instance TCP port 22 is open to the public",
-        "Firewall instance publicly configured allows global public IP in ingress rule(s) on non-web ports",
-        "PostgreSQL Flexible Server allowing public network access",
-        "PostgreSQL flex server public network access allowed",
-        "Azure Container Apps environment configured with public access",
-        "MySQL Flexible Server has public network access enabled",
-        "MySQL database flexible server public network access is enabled",
-        "PostgreSQL Flexible Server allowing public access from ANY Azure service",
-        "Virtual Machine allows public internet access via SSH on port 22 while running",
-        "Virtual Machine allows public internet access to SSH port 22 while running",
-        "Firewall instance TCP port 1522 is open to the public",
-        "Virtual Machine allows inbound traffic from the internet on a high risk port",
-        "Virtual Machine allows inbound from any source in security group rules",
-        "Network Security Group rule overly permissive to inbound traffic over any protocol and port",
-        "Network Security Group rule overly permissive to inbound traffic over any protocol",
-        "AKS authorized IP range is not configured.",
-        "AKS authorized IP range is not configured",
-        "Azure OpenAI service public network access should be restricted",
-        "OpenAI service public network access should be restricted",
-        "Virtual Machine allows inbound from internet on any port from any source",
-        "Azure Machine Learning workspace configured with overly permissive network access",
-        "Azure Machine Learning workspace with overly permissive network",
-        "Network Security Group rule allows ingress traffic from any source on all ports",
-        "Firewall instance TCP port 5601 is open to the public",
-        "Cosmos DB account is configured with public access from all networks",
-        "CosmosDB is configured with public access from all networks",
-        "Virtual Machine allows public internet access via RDP on port 3389 while running",
-        "Virtual Machine allows public internet access to RDP port 3389 while running",
-        "Firewall instance TCP port 9200 is open to the public",
-        "Firewall instance TCP port 8020 is open to the public",
-        "Firewall instance TCP port 1521 is open to the public",
-        "Virtual Machine allows public internet access to Docker (port 2375/2376)",
-        "Virtual Machine allows inbound from any source on any protocol",
-        "Firewall instance TCP port 5432 is open to the public",
-        "Firewall instance TCP ports 4505 or 4506 are open to the public",
-        "Network Security Group rule allows RDP access from any source",
-        "Cosmos DB Account allows public network access without firewall rules",
-        "CosmosDB account with public access has no firewall rules",
-        "Firewall instance TCP port 25 is open to the public",
-        "Azure Machine Learning compute instance configured with public IP",
-        "Azure Machine Learning compute instance configured with public IP",
-        "Azure Machine Learning compute instance with public IP",
-        # GCP - Networking
-        "Cloud SQL instance is open to public",
-        "Cloud SQL PostgreSQL Instance IP assignment is not set to private",
-        "Cloud SQL instance assigned public IP",
-        "Compute Engine instance configured with public IP",
-        "GKE Cluster inbound firewall rule allows all traffic"
-    ]
+    probe_kind = "tcp"
+    ids = manifest.NETWORKING
     
     # Mapping of service/IoM types to likely ports
     DEFAULT_PORTS = {
@@ -157,7 +69,41 @@ class NetworkingVerifier(BaseVerifier):
     }
 
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
-        rule_name = row.get('Rule Name', '').lower()
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+        return self._check_connection(*target)
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+        return await self._check_connection_async(*target)
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return None
+        host, port = target
+        return ("tcp", host.lower(), port)
+
+    def compile_plan(self, rule_name: str) -> RulePlan:
+        # Every port whose keyword appears in the rule name, in DEFAULT_PORTS order
+        lowered = rule_name.lower()
+        ports = tuple(dict.fromkeys(port for key, port in self.DEFAULT_PORTS.items() if key in lowered))
+        if not ports:
+            return RulePlan(self.probe_kind, skip=VerificationResult(
+                execution_status="Skipped",
+                exploit_status="Unknown",
+                message=f"Could not determine target port from Rule Name: {rule_name}"
+            ))
+        return RulePlan(self.probe_kind, ports=ports)
+
+    def extract(self, row: Dict[str, Any]) -> Union[Tuple[str, int], VerificationResult]:
+        """
+        Returns (host, port) to probe, or a Skipped result if either cannot be determined.
+        """
+        plan = self.plan(row.get('Rule Name', ''))
         resource_id = row.get('Resource ID', '')
         
         # 1. Determine Target Host
@@ -169,26 +115,15 @@ class NetworkingVerifier(BaseVerifier):
                 message=f"Could not determine target hostname/IP from Resource ID: {resource_id}"
             )
 
-        # 2. Determine Target Port
-        target_port = self._determine_port(rule_name, row)
-        if not target_port:
-             return VerificationResult(
-                execution_status="Skipped",
-                exploit_status="Unknown",
-                message=f"Could not determine target port from Rule Name: {row.get('Rule Name')}"
-            )
+        # 2. Target Port, from the rule's plan
+        if plan.skip:
+            return plan.skip
             
-        # 3. Perform Check
-        return self._check_connection(target_host, target_port)
+        return target_host, plan.ports[0]
 
     def _extract_host(self, resource_id: str, row: Dict[str, Any]) -> str:
         # If Resource ID looks like a domain or IP, use it.
-        # Regex for IP
-        ip_pattern = r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$"
-        # Regex for generic domain (simplified)
-        domain_pattern = r"^([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$"
-        
-        if re.match(ip_pattern, resource_id) or re.match(domain_pattern, resource_id):
+        if IP_PATTERN.match(resource_id) or DOMAIN_PATTERN.match(resource_id):
             return resource_id
             
         # Try to find something in Findings or Description? 
@@ -202,40 +137,43 @@ class NetworkingVerifier(BaseVerifier):
         # Fallback: Check 'Findings' column for text like "Public IP: x.x.x.x" (common in some tools)
         findings = row.get('Findings', '')
         # Search for IP in findings
-        ip_match = re.search(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", findings)
+        ip_match = IP_IN_TEXT.search(findings)
         if ip_match:
             return ip_match.group(0)
         
         return None
 
-    def _determine_port(self, rule_name: str, row: Dict[str, Any]) -> int:
-        for key, port in self.DEFAULT_PORTS.items():
-            if key in rule_name:
-                return port
-        return None
-
     def _check_connection(self, host: str, port: int) -> VerificationResult:
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3.0) # 3 seconds timeout
-            result = sock.connect_ex((host, port))
-            sock.close()
-            
-            if result == 0:
-                return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Exploitable",
-                    message=f"Connection to {host}:{port} succeeded. Port is OPEN."
-                )
-            else:
-                 return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Secure",
-                    message=f"Connection to {host}:{port} failed (Code: {result}). Port is CLOSED or FILTERED."
-                )
+            result = probes.tcp_connect(host, port)
         except Exception as e:
+            return self._socket_error(host, port, e)
+        return self._interpret(host, port, result)
+
+    async def _check_connection_async(self, host: str, port: int) -> VerificationResult:
+        try:
+            result = await probes.tcp_connect_async(host, port)
+        except Exception as e:
+            return self._socket_error(host, port, e)
+        return self._interpret(host, port, result)
+
+    def _interpret(self, host: str, port: int, result: int) -> VerificationResult:
+        if result == 0:
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Exploitable",
+                message=f"Connection to {host}:{port} succeeded. Port is OPEN."
+            )
+        else:
              return VerificationResult(
                 execution_status="Executed",
-                exploit_status="Error",
-                message=f"Socket error connecting to {host}:{port}: {str(e)}"
+                exploit_status="Secure",
+                message=f"Connection to {host}:{port} failed (Code: {result}). Port is CLOSED or FILTERED."
             )
+
+    def _socket_error(self, host: str, port: int, e: Exception) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Executed",
+            exploit_status="Error",
+            message=f"Socket error connecting to {host}:{port}: {str(e)}"
+        )
@@ -1,16 +1,223 @@
-from .s3 import S3Verifier
-from .networking import NetworkingVerifier
-from .services import ServicesVerifier
-from .manual import ManualVerifier
-from .azure_storage import AzureStorageVerifier
-from .gcp_storage import GCPStorageVerifier
-
-# Instantiate checks
-ALL_VERIFIERS = [
-    S3Verifier(),
-    NetworkingVerifier(),
-    ServicesVerifier(),
-    ManualVerifier(),
-    AzureStorageVerifier(),
-    GCPStorageVerifier()
-]
+import importlib
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from .base import BaseVerifier, RulePlan
+from . import manifest
+
+# Third-party verifiers register an entry point in this group naming a
+# BaseVerifier subclass, e.g. in pyproject.toml:
+#   [project.entry-points."iom_verifier.verifiers"]
+#   cdn = "acme_checks.cdn:CDNVerifier"
+# Looking entry points up means scanning every installed distribution, so
+# it only happens once a row's rule matches no built-in verifier. Built-in
+# verifiers take precedence; plugins are ordered by entry point name.
+ENTRY_POINT_GROUP = "iom_verifier.verifiers"
+
+UNMATCHED = "Unmatched"
+
+# Distinct (Rule Name, Violation Type) pairs whose routing is remembered
+MAX_ROUTES = 10000
+
+
+def normalize_rule(name: str) -> str:
+    """
+    Canonical form of a Rule Name / Violation Type used as the dispatch key.
+    Exports are inconsistent about case, spacing and trailing periods, e.g.
+    "AKS authorized IP range is not configured." vs "... not configured".
+    """
+    if not name:
+        return ""
+    return " ".join(name.split()).rstrip(".").rstrip().lower()
+
+
+class VerifierSpec:
+    """
+    A verifier known by name and rule names, imported and instantiated the
+    first time a row is routed to it (see load()).
+    """
+
+    def __init__(self, target: str, ids: List[str], instance: Optional[BaseVerifier] = None):
+        self.target = target  # "module:Class"
+        self.name = target.rpartition(':')[2]
+        self.ids = list(ids)
+        self.load_seconds: Optional[float] = None  # Import and instantiation time, once loaded
+        self._instance = instance
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, verifier: BaseVerifier) -> "VerifierSpec":
+        return cls(f"{type(verifier).__module__}:{type(verifier).__name__}", verifier.ids, verifier)
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def load(self) -> BaseVerifier:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                module, _, attr = self.target.partition(':')
+                self._instance = getattr(importlib.import_module(module), attr)()
+                self.load_seconds = time.perf_counter() - started
+            return self._instance
+
+
+def discover_plugins(errors: Optional[List[str]] = None) -> List[VerifierSpec]:
+    """
+    Verifiers registered under ENTRY_POINT_GROUP, loaded (a plugin's rule
+    names are only known once its class is imported). Plugins that fail to
+    load are left out and described in `errors`.
+    """
+    from importlib.metadata import entry_points
+    found = entry_points()
+    if hasattr(found, 'select'):
+        found = found.select(group=ENTRY_POINT_GROUP)
+    else:  # Python < 3.10
+        found = found.get(ENTRY_POINT_GROUP, [])
+    specs = []
+    for entry in sorted(found, key=lambda entry: entry.name):
+        started = time.perf_counter()
+        try:
+            verifier = entry.load()()
+        except Exception as e:
+            if errors is not None:
+                errors.append(f"Verifier plugin '{entry.name}' ({entry.value}) failed to load: {e}")
+            continue
+        spec = VerifierSpec.of(verifier)
+        spec.load_seconds = time.perf_counter() - started
+        specs.append(spec)
+    return specs
+
+
+class DispatchIndex:
+    """
+    Hash index from normalized Rule Name / Violation Type to verifier.
+    Built once at startup so routing a row is a dict lookup instead of a
+    scan over every verifier's id list.
+
+    Built from VerifierSpecs (or verifier instances), so a verifier is only
+    imported once a row is routed to it. With `plugins`, entry point
+    verifiers are added the first time a rule matches nothing else.
+
+    When the same rule is claimed by more than one verifier, the verifier
+    listed first wins (same precedence as the old linear scan) and the
+    clash is recorded in `conflicts`. Clashes between built-in verifiers
+    are refused when the registry is imported, so only plugins can add one.
+    """
+
+    def __init__(self, verifiers: List[Union[VerifierSpec, BaseVerifier]], plugins: bool = False):
+        self.specs = [spec if isinstance(spec, VerifierSpec) else VerifierSpec.of(spec) for spec in verifiers]
+        self.table: Dict[str, VerifierSpec] = {}
+        # (rule name, verifier name that keeps it, verifier name that is ignored)
+        self.conflicts: List[Tuple[str, str, str]] = []
+        for spec in self.specs:
+            self._add(spec)
+
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        # Routing per raw (Rule Name, Violation Type), so each distinct pair
+        # is normalized once rather than once per row
+        self._routes: Dict[Tuple[str, str], Optional[BaseVerifier]] = {}
+        self._plugins_pending = plugins
+        self.plugin_seconds: Optional[float] = None  # Time spent discovering plugins, once done
+        self.plugins: List[VerifierSpec] = []
+        self.plugin_errors: List[str] = []
+
+    def _add(self, spec: VerifierSpec):
+        for rule in spec.ids:
+            key = normalize_rule(rule)
+            owner = self.table.get(key)
+            if owner is None:
+                self.table[key] = spec
+            elif owner is not spec:
+                self.conflicts.append((rule, owner.name, spec.name))
+
+    def _find(self, rule_name: str, violation_type: str) -> Optional[VerifierSpec]:
+        spec = self.table.get(normalize_rule(rule_name))
+        if spec is None and violation_type:
+            spec = self.table.get(normalize_rule(violation_type))
+        return spec
+
+    def _load_plugins(self) -> bool:
+        """
+        Adds the entry point verifiers, once. Returns True if any were found.
+        """
+        with self._lock:
+            if not self._plugins_pending:
+                return False
+            self._plugins_pending = False
+            started = time.perf_counter()
+            plugins = discover_plugins(self.plugin_errors)
+            for spec in plugins:
+                self.specs.append(spec)
+                self.plugins.append(spec)
+                self._add(spec)
+            self.plugin_seconds = time.perf_counter() - started
+            # Rules routed nowhere so far may belong to a plugin now
+            self._routes = {key: verifier for key, verifier in self._routes.items() if verifier is not None}
+            return bool(plugins)
+
+    def lookup(self, rule_name: str, violation_type: str = "") -> Optional[BaseVerifier]:
+        key = (rule_name, violation_type)
+        try:
+            return self._routes[key]
+        except KeyError:
+            pass
+        spec = self._find(rule_name, violation_type)
+        if spec is None and self._plugins_pending and self._load_plugins():
+            spec = self._find(rule_name, violation_type)
+        verifier = spec.load() if spec else None
+        if len(self._routes) < MAX_ROUTES:
+            self._routes[key] = verifier
+        return verifier
+
+    def plan(self, row: Dict[str, Any]) -> Tuple[Optional[BaseVerifier], Optional[RulePlan]]:
+        """
+        The verifier for a row and its plan for the row's rule, without
+        touching the routing counts.
+        """
+        rule_name = row.get('Rule Name', '')
+        verifier = self.lookup(rule_name, row.get('Violation Type', ''))
+        return verifier, verifier.plan(rule_name) if verifier else None
+
+    def route(self, row: Dict[str, Any]) -> Optional[BaseVerifier]:
+        """
+        Finds the verifier for a row and records it in the routing counts.
+        """
+        verifier = self.lookup(row.get('Rule Name', ''), row.get('Violation Type', ''))
+        name = type(verifier).__name__ if verifier else UNMATCHED
+        with self._lock:
+            self._counts[name] += 1
+        return verifier
+
+    def routing_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def describe_conflicts(self) -> List[str]:
+        return [
+            f"Rule '{rule}' is claimed by {owner} and {other}; routing to {owner}."
+            for rule, owner, other in self.conflicts
+        ]
+
+    def load_times(self) -> Dict[str, float]:
+        """
+        Seconds each verifier loaded so far took to import and instantiate.
+        """
+        return {spec.name: spec.load_seconds for spec in self.specs if spec.load_seconds is not None}
+
+
+# Built at import from the manifest alone, so duplicate claims between
+# built-in verifiers are caught when the registry loads, without importing them.
+# Those are manifest bugs (two lists normalizing to the same rule), not
+# something to warn about on every run.
+DISPATCH_INDEX = DispatchIndex([VerifierSpec(target, ids) for target, ids in manifest.BUILTIN], plugins=True)
+if DISPATCH_INDEX.conflicts:
+    raise ImportError("Built-in verifier manifest lists a rule twice: "
+                      + " ".join(DISPATCH_INDEX.describe_conflicts()))
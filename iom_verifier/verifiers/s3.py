@@ -1,80 +1,262 @@
-import requests
-from typing import Dict, Any
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Tuple
 from .base import BaseVerifier, VerificationResult
+from . import manifest
+from .. import probes, sessions
+
+# Seconds to wait on one endpoint before racing the next
+HEDGE_DELAY = 0.3
+REGION_HEADER = 'x-amz-bucket-region'
+WRONG_REGION_CODES = (301, 307, 400)
+# Endpoints one row can have in flight at once: global, export region, reported region
+HEDGE_WIDTH = 3
+MIN_HEDGE_THREADS = 8
+
+
+class BucketRegions:
+    """
+    Regions S3 reported for buckets during this run (bounded LRU).
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._regions: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket_name: str) -> Optional[str]:
+        with self._lock:
+            return self._regions.get(bucket_name)
+
+    def put(self, bucket_name: str, region: str):
+        with self._lock:
+            self._regions[bucket_name] = region
+            self._regions.move_to_end(bucket_name)
+            while len(self._regions) > self.max_entries:
+                self._regions.popitem(last=False)
+
+
+bucket_regions = BucketRegions()
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    # The blocking path races endpoints on threads of its own. Every worker
+    # (sessions.configure) may be racing HEDGE_WIDTH of them, so a smaller
+    # pool would quietly cap S3 concurrency below --threads.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(MIN_HEDGE_THREADS, sessions.pool.workers * HEDGE_WIDTH),
+                                           thread_name_prefix="s3-hedge")
+    return _pool
+
 
 class S3Verifier(BaseVerifier):
-    ids = [
-        "S3 bucket policy with global write, read, or delete permissions",
-        "S3 bucket configured for public access",
-        "S3 bucket with Sensitive Data configured for public access",
-        "S3 bucket with Sensitive Data configured for any authenticated user access",
-        "S3 bucket with Block Public Access setting disabled",
-        "S3 Bucket ACL allows READ access to ANY authenticated user",
-        "S3 bucket policy allows public write access",
-        "S3 bucket policy allows public read access",
-        "S3 bucket configured for any authenticated user access"
-    ]
+    probe_kind = "s3"
+
+    ids = manifest.S3
 
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
+        bucket_name, urls_to_test = self.extracted(row)
+        if not bucket_name:
+            return self._no_bucket_result()
+
+        # Race the endpoints: the next one starts when the previous has not
+        # answered within HEDGE_DELAY, or answered inconclusively.
+        queue, tried, pending = list(urls_to_test), [], {}
+        blocked = None
+        failed = False
+        hedge = True
+        while queue or pending:
+            if queue and (hedge or not pending):
+                url = queue.pop(0)
+                tried.append(url)
+                pending[_hedge_pool().submit(probes.http_head, url)] = url
+            done, _ = wait(pending, timeout=HEDGE_DELAY if queue else None, return_when=FIRST_COMPLETED)
+            hedge = not done
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    response = future.result()
+                except probes.CircuitOpenError as e:
+                    blocked = e
+                    continue
+                except probes.ProbeError:
+                    failed = True
+                    continue # Try next URL
+                result = self._conclude(bucket_name, url, response, row)
+                if result:
+                    return result
+                if self._queue_learned_region(bucket_name, queue, tried):
+                    hedge = True # No reason to wait before asking the right region
+
+        return self._unreachable_result(tried, blocked, failed)
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        bucket_name, urls_to_test = self.extracted(row)
+        if not bucket_name:
+            return self._no_bucket_result()
+
+        queue, tried, pending = list(urls_to_test), [], {}
+        blocked = None
+        failed = False
+        hedge = True
+        while queue or pending:
+            if queue and (hedge or not pending):
+                url = queue.pop(0)
+                tried.append(url)
+                task = asyncio.ensure_future(probes.http_head_async(url))
+                # Losing probes keep running (other rows may share them); retrieve their errors
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                pending[task] = url
+            done, _ = await asyncio.wait(pending, timeout=HEDGE_DELAY if queue else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            hedge = not done
+            for task in done:
+                url = pending.pop(task)
+                try:
+                    response = task.result()
+                except probes.CircuitOpenError as e:
+                    blocked = e
+                    continue
+                except probes.ProbeError:
+                    failed = True
+                    continue
+                result = self._conclude(bucket_name, url, response, row)
+                if result:
+                    return result
+                if self._queue_learned_region(bucket_name, queue, tried):
+                    hedge = True
+
+        return self._unreachable_result(tried, blocked, failed)
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        bucket_name, _ = self.extracted(row)
+        if not bucket_name:
+            return None
+        # The outcome does not depend on the (often wrong) Region column
+        return ("s3", bucket_name)
+
+    def probe_hosts(self, row: Dict[str, Any]) -> List[str]:
+        _, urls_to_test = self.extracted(row)
+        # The URLs are all built as "http://<host>", so no parsing is needed
+        return [url[len("http://"):] for url in urls_to_test]
+
+    def extract(self, row: Dict[str, Any]) -> Tuple[Optional[str], List[str]]:
         resource_id = row.get('Resource ID', '') # Assuming Resource ID contains bucket name for S3
         # Fallback to finding bucket name in Findings if Resource ID is an ARN
         bucket_name = resource_id
         if resource_id.startswith("arn:aws:s3:::"):
             bucket_name = resource_id.split(":::")[1]
-        
+
         if not bucket_name:
-             return VerificationResult(
-                execution_status="Skipped",
-                exploit_status="Unknown",
-                message="Could not extract bucket name from Resource ID."
-            )
+            return None, []
+
+        # Once a response has told us the bucket's region, go straight there
+        learned = bucket_regions.get(bucket_name)
+        if learned:
+            return bucket_name, [self._regional_url(bucket_name, learned)]
 
-        # Construct Public URL
-        # Trying standard regions and global
-        # A more robust way would be to deduce region from 'Region' column
+        # Otherwise try global first, then the region from the export
         region = row.get('Region', 'us-east-1')
-        
-        urls_to_test = [
+
+        return bucket_name, [
             f"http://{bucket_name}.s3.amazonaws.com",
-            f"http://{bucket_name}.s3.{region}.amazonaws.com"
+            self._regional_url(bucket_name, region)
         ]
 
-        for url in urls_to_test:
-            try:
-                # We use a short timeout. We strictly look for public accessibility.
-                response = requests.get(url, timeout=5)
-                
-                if response.status_code == 200:
-                    return VerificationResult(
-                        execution_status="Executed",
-                        exploit_status="Exploitable",
-                        message=f"Bucket is publicly accessible. GET {url} returned 200 OK."
-                    )
-                elif response.status_code == 403:
-                    # 403 means it exists but is private (or requires auth).
-                    # For the purpose of 'Public Access', 403 usually means it's NOT public (secure).
-                    # However, some misconfigurations might allow specific files but not listing.
-                    # Without an object key, checking root 403 is a strong indicator of 'Not Publicly Listable'.
-                    return VerificationResult(
-                        execution_status="Executed",
-                        exploit_status="Secure", 
-                        message=f"Bucket exists but returned 403 Forbidden on root (Access Denied). Endpoint: {url}"
-                    )
-                elif response.status_code == 404:
-                    # NoSuchBucket
-                    continue
-                else:
-                     return VerificationResult(
-                        execution_status="Executed",
-                        exploit_status="Unknown",
-                        message=f"Received unexpected status code {response.status_code} from {url}"
-                    )
+    @staticmethod
+    def _regional_url(bucket_name: str, region: str) -> str:
+        return f"http://{bucket_name}.s3.{region}.amazonaws.com"
+
+    def _conclude(self, bucket_name: str, url: str, response: probes.ProbeResponse,
+                  row: Dict[str, Any]) -> Optional[VerificationResult]:
+        """
+        Records the bucket region S3 reported and interprets the response.
+        Returns None when another endpoint should be tried.
+        """
+        region = response.headers.get(REGION_HEADER)
+        if region:
+            bucket_regions.put(bucket_name, region)
+            # Wrong-region endpoints answer with a redirect (or 400) naming the right one
+            if response.status_code in WRONG_REGION_CODES and url != self._regional_url(bucket_name, region):
+                return None
 
-            except requests.RequestException as e:
-                pass # Try next URL
+        result = self._interpret(url, response.status_code)
+        if result and region and region != row.get('Region'):
+            result.message += f" Bucket region is {region} (export says {row.get('Region') or 'nothing'})."
+        return result
 
+    def _queue_learned_region(self, bucket_name: str, queue: List[str], tried: List[str]) -> bool:
+        """
+        Puts the endpoint of the bucket's reported region next in line.
+        Returns True if it had not been tried yet.
+        """
+        region = bucket_regions.get(bucket_name)
+        if not region:
+            return False
+        url = self._regional_url(bucket_name, region)
+        if url in tried:
+            return False
+        if url in queue:
+            queue.remove(url)
+        queue.insert(0, url)
+        return True
+
+    def _interpret(self, url: str, status_code: int) -> Optional[VerificationResult]:
+        """
+        Maps a response status to a result. Returns None when the next URL should be tried.
+        """
+        if status_code == 200:
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Exploitable",
+                message=f"Bucket is publicly accessible. HEAD {url} returned 200 OK."
+            )
+        elif status_code == 403:
+            # 403 means it exists but is private (or requires auth).
+            # For the purpose of 'Public Access', 403 usually means it's NOT public (secure).
+            # However, some misconfigurations might allow specific files but not listing.
+            # Without an object key, checking root 403 is a strong indicator of 'Not Publicly Listable'.
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Secure", 
+                message=f"Bucket exists but returned 403 Forbidden on root (Access Denied). Endpoint: {url}"
+            )
+        elif status_code == 404:
+            # NoSuchBucket
+            return None
+        else:
+             return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Unknown",
+                message=f"Received unexpected status code {status_code} from {url}"
+            )
+
+    def _no_bucket_result(self) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Skipped",
+            exploit_status="Unknown",
+            message="Could not extract bucket name from Resource ID."
+        )
+
+    def _unreachable_result(self, urls_to_test: List[str], blocked: Optional[Exception] = None,
+                            failed: bool = False) -> VerificationResult:
+        if blocked:
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Error",
+                message=f"S3 endpoints not probed: {blocked}"
+            )
         return VerificationResult(
             execution_status="Executed",
             exploit_status="Unknown", 
-            message=f"Could not connect to bucket endpoint or bucket does not exist. URLs tested: {urls_to_test}"
+            message=f"Could not connect to bucket endpoint or bucket does not exist. URLs tested: {urls_to_test}",
+            transient=failed  # A reset or a DNS timeout may not happen next run
         )
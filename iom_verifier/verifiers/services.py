@@ -1,29 +1,54 @@
-import requests
-from typing import Dict, Any
-from .base import BaseVerifier, VerificationResult
+import re
+from typing import Dict, Any, Optional, Tuple, Union
+from .base import BaseVerifier, RulePlan, VerificationResult
+from . import manifest
+from .. import probes
+
+# Simple URL extractor for the Findings column
+URL_PATTERN = re.compile(r"(https?://[^\s]+)")
 
 class ServicesVerifier(BaseVerifier):
-    ids = [
-        "AWS - ECR Repository is Publicly Accessible",
-        "ECR repository is configured to be publicly exposed",
-        "AWS - Lambda Function with Public Access", # Only if it has a function URL or we can guess it?
-        "Lambda function is configured to be publicly exposed",
-        "Cloud Run Service is accessible by any users or any authenticated user"
-    ]
+    probe_kind = "http-get"
+
+    ids = manifest.SERVICES
 
     def verify(self, row: Dict[str, Any]) -> VerificationResult:
-        rule_name = row.get('Rule Name', '')
-        resource_id = row.get('Resource ID', '')
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+        return self._check_http(target)
+
+    async def verify_async(self, row: Dict[str, Any]) -> VerificationResult:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return target
+        return await self._check_http_async(target)
+
+    def probe_target(self, row: Dict[str, Any]) -> Optional[Tuple]:
+        target = self.extracted(row)
+        if isinstance(target, VerificationResult):
+            return None
+        return ("http-get", target)
 
+    def compile_plan(self, rule_name: str) -> RulePlan:
         if "ECR" in rule_name:
-            return self._verify_ecr(resource_id)
+            return RulePlan(self.probe_kind, skip=self._verify_ecr())
+        return RulePlan(self.probe_kind)
+
+    def extract(self, row: Dict[str, Any]) -> Union[str, VerificationResult]:
+        """
+        Returns the endpoint to probe, or a Skipped result if there is none.
+        """
+        plan = self.plan(row.get('Rule Name', ''))
+        if plan.skip:
+            return plan.skip
         
         # Lambda is tricky without the URL. 
         # If the 'Findings' column contains a URL, we can test it.
         findings = row.get('Findings', '')
         url_match = self._extract_url(findings)
         if url_match:
-            return self._check_http(url_match)
+            return url_match
             
         return VerificationResult(
                 execution_status="Skipped",
@@ -31,7 +56,7 @@ class ServicesVerifier(BaseVerifier):
                 message="Verifier requires known public endpoint/URL which could not be found in Resource ID or Findings."
             )
 
-    def _verify_ecr(self, resource_id: str) -> VerificationResult:
+    def _verify_ecr(self) -> VerificationResult:
         # Resource ID for ECR usually is 'repo-name' or ARN.
         # Public ECR URLs: public.ecr.aws/namespace/repo
         # We assume if it's public, we might not know the namespace just from the repo name easily 
@@ -51,32 +76,42 @@ class ServicesVerifier(BaseVerifier):
         )
 
     def _extract_url(self, text: str) -> str:
-        import re
-        # Simple URL extractor
-        url_regex = r"(https?://[^\s]+)"
-        found = re.search(url_regex, text)
+        found = URL_PATTERN.search(text)
         if found:
             return found.group(0)
         return None
 
     def _check_http(self, url: str) -> VerificationResult:
         try:
-            response = requests.get(url, timeout=5)
-            if response.status_code < 400:
-                return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Exploitable",
-                    message=f"Endpoint {url} returned {response.status_code}. Publicly accessible."
-                )
-            else:
-                return VerificationResult(
-                    execution_status="Executed",
-                    exploit_status="Secure", 
-                    message=f"Endpoint {url} returned {response.status_code}."
-                )
+            response = probes.http_get(url)
+        except Exception as e:
+            return self._connection_failed(url, e)
+        return self._interpret(url, response.status_code)
+
+    async def _check_http_async(self, url: str) -> VerificationResult:
+        try:
+            response = await probes.http_get_async(url)
         except Exception as e:
+            return self._connection_failed(url, e)
+        return self._interpret(url, response.status_code)
+
+    def _interpret(self, url: str, status_code: int) -> VerificationResult:
+        if status_code < 400:
+            return VerificationResult(
+                execution_status="Executed",
+                exploit_status="Exploitable",
+                message=f"Endpoint {url} returned {status_code}. Publicly accessible."
+            )
+        else:
             return VerificationResult(
                 execution_status="Executed",
-                exploit_status="Error",
-                message=f"Failed to connect to {url}: {e}"
+                exploit_status="Secure", 
+                message=f"Endpoint {url} returned {status_code}."
             )
+
+    def _connection_failed(self, url: str, e: Exception) -> VerificationResult:
+        return VerificationResult(
+            execution_status="Executed",
+            exploit_status="Error",
+            message=f"Failed to connect to {url}: {e}"
+        )
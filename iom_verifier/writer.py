@@ -0,0 +1,178 @@
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .checkpoint import CheckpointJournal
+from .loader import DataLoader
+from .record import Row, CSVLine
+
+# Dedicated output stage. Engines hand finished rows to submit() and move
+# on; one writer thread renders them and writes them out in batches, with
+# one write() and one journal append per batch instead of per row.
+#
+# With preserve_order, rows are tagged with their input position and held
+# in a reorder buffer until every earlier row has been written. The buffer
+# is bounded by admit(): engines stop pulling new input while the oldest
+# unwritten row is `reorder_limit` rows behind the newest one read.
+
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_BYTES = 1 << 20
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_REORDER_LIMIT = 10000
+
+_CLOSE = object()
+
+
+class ResultWriter:
+    def __init__(self, path: str, fieldnames: List[str], append: bool = False,
+                 journal: Optional[CheckpointJournal] = None, preserve_order: bool = False,
+                 reorder_limit: int = DEFAULT_REORDER_LIMIT, flush_rows: int = DEFAULT_FLUSH_ROWS,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.fieldnames = fieldnames
+        self.journal = journal
+        self.preserve_order = preserve_order
+        self.reorder_limit = max(1, reorder_limit)
+        self.flush_rows = max(1, flush_rows)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.flushes = 0
+
+        self._file = open(path, 'ab' if append else 'wb')
+        self._offset = self._file.tell()
+        self._buffer = io.StringIO()
+        self._csv = csv.DictWriter(self._buffer, fieldnames=fieldnames)
+        self._line = CSVLine()
+        if not append:
+            self._csv.writeheader()
+            self._write([(None, self._take_rendered())])
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._reorder: Dict[int, Dict[str, Any]] = {}
+        self._next_seq = 0   # Next input position to write (preserve_order)
+        self._read_seq = 0   # Input positions handed out so far
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    # Producer side
+
+    def admit(self) -> bool:
+        """
+        Whether engines may read another input row. Always True unless
+        the reorder buffer is full.
+        """
+        return not self.preserve_order or self._read_seq - self._next_seq < self.reorder_limit
+
+    def sequence(self, rows):
+        """
+        Tags rows with their input position: yields (seq, row).
+        """
+        for row in rows:
+            seq = self._read_seq
+            self._read_seq += 1
+            yield seq, row
+
+    def submit(self, seq: int, row: Dict[str, Any]):
+        if self._error:
+            raise self._error
+        self._queue.put((seq, row))
+
+    def close(self):
+        """
+        Writes everything still buffered and stops the writer thread.
+        """
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        if self._error:
+            raise self._error
+
+    # Writer thread
+
+    def _take_rendered(self) -> bytes:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text.encode('utf-8')
+
+    def _write(self, batch: List[Tuple[Optional[str], bytes]]):
+        # One write for the batch, then one journal append with each row's exact end offset
+        self._file.write(b"".join(data for _, data in batch))
+        self._file.flush()
+        if self.journal and self.journal.fsync:
+            # The rows must be durable before the journal says they are
+            os.fsync(self._file.fileno())
+        entries = []
+        for key, data in batch:
+            self._offset += len(data)
+            if key is not None:
+                entries.append((key, self._offset))
+        if self.journal and entries:
+            self.journal.record_many(entries)
+        self.rows_written += len(entries)
+        self.flushes += 1
+
+    def _render(self, row: Dict[str, Any]) -> Tuple[str, bytes]:
+        if isinstance(row, Row):
+            # Original bytes go out verbatim, only the results are rendered
+            return row.content_hash(), row.render(self._line)
+        self._csv.writerow(row)
+        return DataLoader.row_hash(row, self.fieldnames), self._take_rendered()
+
+    def _ready(self, seq: int, row: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        The rows that can be written now that `row` has finished.
+        """
+        if not self.preserve_order:
+            return [row]
+        self._reorder[seq] = row
+        ready = []
+        while self._next_seq in self._reorder:
+            ready.append(self._reorder.pop(self._next_seq))
+            self._next_seq += 1
+        return ready
+
+    def _run(self):
+        batch: List[Tuple[str, bytes]] = []
+        size = 0
+        deadline = None
+        closing = False
+        try:
+            while not closing:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _CLOSE:
+                    closing = True
+                    # Anything still held back (an earlier row failed) goes out in input order
+                    ready = [self._reorder[seq] for seq in sorted(self._reorder)]
+                    self._reorder.clear()
+                elif item is not None:
+                    ready = self._ready(*item)
+                else:
+                    ready = []
+
+                for row in ready:
+                    rendered = self._render(row)
+                    batch.append(rendered)
+                    size += len(rendered[1])
+                if batch and deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+                if batch and (closing or len(batch) >= self.flush_rows or size >= self.flush_bytes
+                              or time.monotonic() >= deadline):
+                    self._write(batch)
+                    batch, size, deadline = [], 0, None
+        except BaseException as e:
+            self._error = e
+            # Keep draining until close() so producers never wait on a dead writer
+            while not closing and self._queue.get() is not _CLOSE:
+                pass